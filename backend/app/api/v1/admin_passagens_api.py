@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/api/v1/admin_passagens_api.py
+API Administrativa de Passagens de Serviço - porte de /api/admin/passagens (legado/server.js)
+Listagem com filtros, ordenação whitelisted e paginação por keyset
+"""
+
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Query, Request, Response
+from typing import List, Optional
+from pydantic import BaseModel
+from datetime import date, datetime
+import logging
+
+from app.services.passagem_service import passagem_service
+from app.services.autosave_service import autosave_service
+from app.services.storage_service import storage_service
+from app.services.audit_service import audit_service
+from app.services.painel_service import painel_service
+from app.models.auditoria import AuditoriaEvento
+from app.utils.paginacao import (
+    LIMITE_PADRAO,
+    LIMITE_MAXIMO,
+    encode_cursor,
+    decode_cursor,
+    cursor_datetime,
+    cabecalhos_paginacao
+)
+from app.utils.streaming import formato_streaming, resposta_streaming
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/admin/passagens", tags=["Admin Passagens"])
+
+# Chaves de ordenação aceitas → coluna SQL (nunca interpolar valor vindo do cliente)
+ORDENACOES = {
+    "inicio": "p.PeriodoInicio",
+    "fim": "p.PeriodoFim",
+    "embarcacao": "e.Nome",
+    "status": "p.Status",
+    "id": "p.PassagemId",
+}
+
+# === MODELS ===
+class AdminPassagemResponse(BaseModel):
+    PassagemId: int
+    EmbarcacaoId: int
+    EmbarcacaoNome: Optional[str] = None
+    PeriodoInicio: str
+    PeriodoFim: str
+    Status: str
+    NumeroPS: Optional[str] = None
+    DataEmissao: Optional[str] = None
+    FiscalEmbarcandoId: Optional[int] = None
+    FiscalEmbarcandoNome: Optional[str] = None
+    FiscalDesembarcandoId: Optional[int] = None
+    FiscalDesembarcandoNome: Optional[str] = None
+
+# Colunas e junções da listagem ({coluna} = chave de ordenação, usada no cursor)
+SELECAO_LISTAGEM = """
+               p.PassagemId, p.EmbarcacaoId, e.Nome AS EmbarcacaoNome,
+               p.PeriodoInicio, p.PeriodoFim,
+               p.Status, p.NumeroPS, p.DataEmissao,
+               p.FiscalEmbarcandoId, fe.Nome AS FiscalEmbarcandoNome,
+               p.FiscalDesembarcandoId, fd.Nome AS FiscalDesembarcandoNome,
+               {coluna} AS ChaveOrdenacao
+        FROM PASSAGENS p
+        JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
+        LEFT JOIN FISCAIS fe ON fe.FiscalId = p.FiscalEmbarcandoId
+        LEFT JOIN FISCAIS fd ON fd.FiscalId = p.FiscalDesembarcandoId
+        """
+
+# === BUSINESS LOGIC FUNCTIONS ===
+def linha_admin_passagem(row) -> dict:
+    """Linha de SELECAO_LISTAGEM → campos de AdminPassagemResponse (JSON e streaming)"""
+    return {
+        "PassagemId": row[0],
+        "EmbarcacaoId": row[1],
+        "EmbarcacaoNome": row[2],
+        "PeriodoInicio": str(row[3]),
+        "PeriodoFim": str(row[4]),
+        "Status": row[5],
+        "NumeroPS": row[6],
+        "DataEmissao": str(row[7]) if row[7] else None,
+        "FiscalEmbarcandoId": row[8],
+        "FiscalEmbarcandoNome": row[9],
+        "FiscalDesembarcandoId": row[10],
+        "FiscalDesembarcandoNome": row[11]
+    }
+
+async def exigir_admin():
+    """REGRA DE NEGÓCIO: rotas /api/admin exigem perfil ADMIN (USERNAME global)"""
+    from app.services.auth_service import is_current_user_admin
+
+    if not await is_current_user_admin():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso restrito a administradores"
+        )
+
+def montar_filtros(embarcacao_id: Optional[int], fiscal_id: Optional[int], status_ps: Optional[str],
+                   inicio: Optional[date], fim: Optional[date]):
+    """
+    Filtros da listagem ADMIN sobre PASSAGENS p (usados também na exportação)
+
+    Returns:
+        (where, params)
+    """
+    where = " WHERE 1=1"
+    params = []
+
+    if embarcacao_id is not None:
+        where += " AND p.EmbarcacaoId = ?"
+        params.append(embarcacao_id)
+
+    if fiscal_id is not None:
+        where += " AND (p.FiscalEmbarcandoId = ? OR p.FiscalDesembarcandoId = ?)"
+        params.extend([fiscal_id, fiscal_id])
+
+    if status_ps:
+        where += " AND p.Status = ?"
+        params.append(status_ps.upper())
+
+    if inicio:
+        where += " AND p.PeriodoInicio >= ?"
+        params.append(inicio)
+
+    if fim:
+        where += " AND p.PeriodoFim <= ?"
+        params.append(fim)
+
+    return where, params
+
+# === API ENDPOINTS ===
+@router.get("", response_model=List[AdminPassagemResponse])
+async def list_admin_passagens(
+    request: Request,
+    response: Response,
+    embarcacao_id: Optional[int] = None,
+    fiscal_id: Optional[int] = None,
+    status_ps: Optional[str] = Query(None, alias="status"),
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    ordenar: str = "inicio",
+    ordem: str = "desc",
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    total: bool = False
+):
+    """
+    Lista todas as PS (ADMIN) com filtros por embarcação, fiscal (embarcando ou
+    desembarcando), status e período. Próxima página via cabeçalho X-Next-Cursor
+    Accept: text/csv ou application/x-ndjson → todas as linhas do filtro em streaming
+    """
+    try:
+        from app.config.database import db
+
+        await exigir_admin()
+
+        if ordenar not in ORDENACOES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Ordenação inválida. Use: {', '.join(ORDENACOES)}"
+            )
+        if ordem not in ("asc", "desc"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Ordem inválida. Use: asc, desc"
+            )
+
+        coluna = ORDENACOES[ordenar]
+        cursor_valores = decode_cursor(cursor, 2)
+
+        where, params = montar_filtros(embarcacao_id, fiscal_id, status_ps, inicio, fim)
+        ordem_sql = ordem.upper()
+        ordenacao = f"ORDER BY {coluna} {ordem_sql}, p.PassagemId {ordem_sql}"
+
+        formato = formato_streaming(request)
+        if formato:
+            logger.info(f"ADMIN: listagem de passagens em streaming ({formato}, ordenar={ordenar} {ordem})")
+            return resposta_streaming(
+                formato, list(AdminPassagemResponse.model_fields),
+                f"SELECT {SELECAO_LISTAGEM.format(coluna=coluna)}{where} {ordenacao}",
+                params, linha_admin_passagem, "passagens"
+            )
+
+        total_registros = None
+        if total:
+            sql_total = f"SELECT COUNT(*) FROM PASSAGENS p JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId{where}"
+            rows_total = await db.execute_query(sql_total, params)
+            total_registros = rows_total[0][0] if rows_total else 0
+
+        # Keyset: (coluna, PassagemId) estritamente após a última linha entregue
+        op = "<" if ordem == "desc" else ">"
+        if cursor_valores:
+            if coluna == "p.PassagemId":
+                where += f" AND p.PassagemId {op} ?"
+                params.append(cursor_valores[1])
+            else:
+                where += f" AND ({coluna} {op} ? OR ({coluna} = ? AND p.PassagemId {op} ?))"
+                params.extend([cursor_valores[0], cursor_valores[0], cursor_valores[1]])
+
+        sql = f"SELECT FIRST {limit + 1} {SELECAO_LISTAGEM.format(coluna=coluna)}{where} {ordenacao}"
+
+        rows = await db.execute_query(sql, params)
+
+        proximo_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            proximo_cursor = encode_cursor([rows[-1][12], rows[-1][0]])
+
+        response.headers.update(cabecalhos_paginacao(proximo_cursor, total_registros))
+
+        passagens = [AdminPassagemResponse(**linha_admin_passagem(row)) for row in rows]
+
+        logger.info(f"ADMIN: listadas {len(passagens)} passagens (ordenar={ordenar} {ordem})")
+        return passagens
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao listar passagens (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao listar passagens"
+        )
+
+@router.delete("/{passagem_id}")
+async def delete_admin_passagem(passagem_id: int, background_tasks: BackgroundTasks):
+    """Exclui PS e todas as dependências em uma única transação (ADMIN)"""
+    try:
+        from app.config.database import db
+
+        await exigir_admin()
+
+        async with db.transaction() as cursor:
+            excluida = passagem_service.excluir_passagem(cursor, passagem_id)
+
+        if not excluida:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Passagem não encontrada"
+            )
+
+        autosave_service.descartar(passagem_id)
+        background_tasks.add_task(storage_service.limpar_passagem, passagem_id)
+
+        logger.info(f"ADMIN: PS {passagem_id} excluída")
+        return {"ok": True}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao excluir PS {passagem_id} (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao excluir passagem"
+        )
+
+@router.get("/{passagem_id}/pdf")
+async def download_admin_pdf(passagem_id: int):
+    """PDF de qualquer PS (ADMIN) - mesmo cache por conteúdo da rota do fiscal"""
+    try:
+        from app.api.v1.passagens_api import responder_pdf
+
+        await exigir_admin()
+        return await responder_pdf(passagem_id)
+
+    except HTTPException:
+        raise
+    except LookupError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Passagem não encontrada"
+        )
+    except Exception as e:
+        logger.error(f"Erro ao obter PDF da PS {passagem_id} (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao obter PDF da passagem"
+        )
+
+@router.get("/relatorio/periodos")
+async def relatorio_periodos(
+    embarcacao_id: Optional[int] = None,
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None
+):
+    """Lacunas e sobreposições de período das PS, por embarcação, em toda a frota (ADMIN)"""
+    try:
+        await exigir_admin()
+        relatorio = await passagem_service.relatorio_periodos(embarcacao_id, inicio, fim)
+        logger.info(f"ADMIN: relatório de períodos ({len(relatorio)} embarcações)")
+        return relatorio
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório de períodos (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao gerar relatório de períodos"
+        )
+
+@router.get("/painel")
+async def painel_admin():
+    """Painel da home ADMIN: PS por status, embarcação e mês + rascunhos atrasados"""
+    try:
+        await exigir_admin()
+        return await painel_service.resumo()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao montar painel (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao montar painel"
+        )
+
+@router.post("/painel/reconstruir")
+async def reconstruir_painel():
+    """Recalcula os agregados do painel a partir de PASSAGENS (ADMIN)"""
+    try:
+        await exigir_admin()
+        chaves = await painel_service.reconstruir()
+        logger.info("ADMIN: agregados do painel reconstruídos manualmente")
+        return {"ok": True, "chaves": chaves}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir painel (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao reconstruir painel"
+        )
+
+@router.get("/storage/relatorio")
+async def relatorio_storage():
+    """Espaço ocupado no storage por tipo e por PS, a partir do índice (ADMIN)"""
+    try:
+        await exigir_admin()
+        return await storage_service.relatorio()
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao gerar relatório do storage: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao gerar relatório do storage"
+        )
+
+@router.post("/storage/varredura")
+async def varrer_storage():
+    """Executa a varredura de órfãos agora, sem esperar o agendamento (ADMIN)"""
+    try:
+        await exigir_admin()
+        resumo = await storage_service.varrer()
+        logger.info("ADMIN: varredura do storage executada manualmente")
+        return {"ok": True, "resumo": resumo}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na varredura do storage (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha na varredura do storage"
+        )
+
+@router.get("/auditoria", response_model=List[AuditoriaEvento])
+async def buscar_auditoria(
+    response: Response,
+    passagem_id: Optional[int] = None,
+    evento: Optional[str] = Query(None, description="Um ou mais eventos separados por vírgula"),
+    autor: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None
+):
+    """
+    Busca em toda a auditoria (ADMIN) por PS, evento, autor e período
+    Mais recente primeiro; próxima página via cabeçalho X-Next-Cursor
+    """
+    try:
+        await exigir_admin()
+
+        cursor_valores = decode_cursor(cursor, 2)
+        if cursor_valores:
+            cursor_valores[0] = cursor_datetime(cursor_valores[0])
+
+        eventos, proximo = await audit_service.consultar(
+            limit, cursor_valores, passagem_id=passagem_id,
+            eventos=[e.strip().upper() for e in evento.split(",") if e.strip()] if evento else None,
+            autor=autor, desde=desde, ate=ate
+        )
+
+        response.headers.update(cabecalhos_paginacao(encode_cursor(proximo) if proximo else None))
+        return eventos
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na busca de auditoria (admin): {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao buscar auditoria"
+        )
+
+@router.get("/export.xlsx")
+async def exportar_xlsx(
+    embarcacao_id: Optional[int] = None,
+    fiscal_id: Optional[int] = None,
+    status_ps: Optional[str] = Query(None, alias="status"),
+    inicio: Optional[date] = None,
+    fim: Optional[date] = None,
+    secoes: Optional[str] = None
+):
+    """
+    Exporta as PS filtradas (mesmos filtros da listagem) em XLSX (ADMIN)
+    secoes=chave1,chave2 → uma aba extra por seção (porto ou registro de seções)
+    """
+    try:
+        import asyncio
+        from pathlib import Path
+        from fastapi.responses import FileResponse
+        from starlette.background import BackgroundTask
+        from app.services.export_service import export_service
+
+        await exigir_admin()
+
+        try:
+            chaves = export_service.secoes_exportacao(secoes)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+
+        where, params = montar_filtros(embarcacao_id, fiscal_id, status_ps, inicio, fim)
+
+        loop = asyncio.get_running_loop()
+        arquivo = await loop.run_in_executor(None, export_service.gerar_xlsx, where, params, chaves)
+
+        logger.info(f"ADMIN: exportação XLSX gerada ({arquivo.stat().st_size} bytes)")
+        return FileResponse(
+            arquivo,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            filename=export_service.nome_arquivo(),
+            background=BackgroundTask(Path(arquivo).unlink, missing_ok=True)
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao exportar passagens em XLSX: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao exportar passagens"
+        )
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/api/v1/busca_api.py
+API de Busca textual nas PS - observações e descrições das seções do Porto e do registro (4, 6, 7)
+Consulta no índice invertido (ver busca_service), sem LIKE '%x%' nas tabelas
+"""
+
+from fastapi import APIRouter, HTTPException, status, Query
+from typing import List, Optional
+from pydantic import BaseModel
+import logging
+
+from app.services.busca_service import busca_service
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/busca", tags=["Busca"])
+
+# === MODELS ===
+class BuscaResultado(BaseModel):
+    PassagemId: int
+    NumeroPS: Optional[str] = None
+    EmbarcacaoNome: Optional[str] = None
+    PeriodoInicio: str
+    PeriodoFim: str
+    Secao: str
+    SecaoTitulo: str
+    Pontuacao: float
+    Trecho: str  # HTML escapado com os termos em <mark>
+
+# === API ENDPOINTS ===
+@router.get("", response_model=List[BuscaResultado])
+async def buscar(
+    q: str = Query(..., min_length=2, max_length=200),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """
+    Busca PS pelo texto das seções, da mais relevante para a menos
+    Fiscal: só as PS em que participa; ADMIN: todas
+    """
+    try:
+        from app.services.auth_service import is_current_user_admin
+        from app.api.v1.passagens_api import get_current_fiscal_dados_bd
+
+        fiscal_id = None
+        if not await is_current_user_admin():
+            fiscal_dados = await get_current_fiscal_dados_bd()
+            fiscal_id = fiscal_dados["FiscalId"]
+
+        resultados = await busca_service.buscar(q, fiscal_id, limit)
+        logger.info(f"Busca '{q}': {len(resultados)} PS")
+        return resultados
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na busca '{q}': {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha na busca"
+        )
+
+@router.post("/reindexar")
+async def reindexar():
+    """Reconstrói o índice de busca de todas as PS (ADMIN)"""
+    try:
+        from app.services.auth_service import is_current_user_admin
+
+        if not await is_current_user_admin():
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Acesso restrito a administradores"
+            )
+
+        total = await busca_service.reconstruir()
+        logger.info(f"ADMIN: índice de busca reconstruído manualmente ({total} PS)")
+        return {"ok": True, "passagens": total}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao reconstruir índice de busca: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao reconstruir índice de busca"
+        )
@@ -4,10 +4,11 @@
 API de Embarcações - REFATORADO para usar Service Layer
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from typing import List
 from app.models.embarcacao import Embarcacao, EmbarcacaoCreate, EmbarcacaoUpdate
 from app.services.embarcacao_service import embarcacao_service
+from app.utils.streaming import formato_streaming, resposta_streaming
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,9 +16,20 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/embarcacoes", tags=["Embarcações"])
 
 @router.get("/", response_model=List[Embarcacao])
-async def list_embarcacoes():
-    """Lista todas embarcações - USA SERVICE LAYER"""
+async def list_embarcacoes(request: Request):
+    """
+    Lista todas embarcações - USA SERVICE LAYER
+    Accept: text/csv ou application/x-ndjson → streaming direto do cursor
+    """
     try:
+        formato = formato_streaming(request)
+        if formato:
+            logger.info(f"Listagem de embarcações em streaming ({formato})")
+            return resposta_streaming(
+                formato, ["EmbarcacaoId", "Nome", "PrimeiraEntradaPorto", "TipoEmbarcacao"],
+                embarcacao_service.SQL_LISTAGEM, None, embarcacao_service.linha_embarcacao, "embarcacoes"
+            )
+
         embarcacoes = await embarcacao_service.get_all_embarcacoes()
         logger.info(f"Listadas {len(embarcacoes)} embarcações")
         return embarcacoes
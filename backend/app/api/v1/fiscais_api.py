@@ -5,11 +5,13 @@ API de Fiscais - TODAS as regras de negócio e validações
 Baseado no server.js linha por linha
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request
 from typing import List, Optional
 from pydantic import BaseModel, Field, validator
 import logging
 
+from app.utils.streaming import formato_streaming, resposta_streaming
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/fiscais", tags=["Fiscais"])
@@ -116,23 +118,34 @@ async def resolve_fiscal_by_name(nome: str):
     return None
 
 # === API ENDPOINTS ===
+def linha_fiscal(row) -> dict:
+    """Linha do SELECT de fiscais → campos de FiscalResponse (JSON e streaming)"""
+    return {
+        "FiscalId": row[0],
+        "Nome": row[1],
+        "Chave": row[2],
+        "Telefone": row[3]
+    }
+
 @router.get("/", response_model=List[FiscalResponse])
-async def list_fiscais():
-    """Lista todos os fiscais - MESMA LÓGICA DO server.js"""
+async def list_fiscais(request: Request):
+    """
+    Lista todos os fiscais - MESMA LÓGICA DO server.js
+    Accept: text/csv ou application/x-ndjson → streaming direto do cursor
+    """
     try:
         from app.config.database import db
         
         sql = "SELECT FiscalId, Nome, Chave, Telefone FROM FISCAIS ORDER BY Nome"
+
+        formato = formato_streaming(request)
+        if formato:
+            logger.info(f"Listagem de fiscais em streaming ({formato})")
+            return resposta_streaming(formato, list(FiscalResponse.model_fields), sql, None, linha_fiscal, "fiscais")
+
         rows = await db.execute_query(sql)
         
-        fiscais = []
-        for row in rows:
-            fiscais.append(FiscalResponse(
-                FiscalId=row[0],
-                Nome=row[1],
-                Chave=row[2], 
-                Telefone=row[3]
-            ))
+        fiscais = [FiscalResponse(**linha_fiscal(row)) for row in rows]
         
         logger.info(f"Listados {len(fiscais)} fiscais")
         return fiscais
@@ -215,6 +228,7 @@ async def update_fiscal(fiscal_id: int, fiscal_data: FiscalUpdate):
     """Atualiza fiscal - TODAS AS VALIDAÇÕES DO server.js"""
     try:
         from app.config.database import db
+        from app.api.v1.passagens_api import invalidar_identidade
         
         # REGRA DE NEGÓCIO: Verifica duplicatas (excluindo o próprio)
         if await check_fiscal_duplicates(fiscal_data.Nome, fiscal_data.Chave, fiscal_id):
@@ -244,6 +258,9 @@ async def update_fiscal(fiscal_id: int, fiscal_data: FiscalUpdate):
         sql_select = "SELECT FIRST 1 FiscalId, Nome, Chave, Telefone FROM FISCAIS WHERE FiscalId=?"
         rows = await db.execute_query(sql_select, [fiscal_id])
         
+        # Identidade em cache pode ser deste fiscal (nome/chave mudaram)
+        invalidar_identidade()
+        
         if rows:
             row = rows[0]
             logger.info(f"Fiscal {fiscal_id} atualizado")
@@ -273,6 +290,7 @@ async def delete_fiscal(fiscal_id: int):
     """Exclui fiscal - REGRA DE NEGÓCIO: Bloqueia se há PS vinculadas"""
     try:
         from app.config.database import db
+        from app.api.v1.passagens_api import invalidar_identidade
         
         # REGRA DE NEGÓCIO: Verifica vínculos com PS
         if await check_fiscal_ps_vinculos(fiscal_id):
@@ -291,6 +309,7 @@ async def delete_fiscal(fiscal_id: int):
                 detail="Fiscal não encontrado"
             )
         
+        invalidar_identidade()
         logger.info(f"Fiscal {fiscal_id} excluído")
         return {"ok": True}
         
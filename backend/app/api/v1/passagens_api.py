@@ -5,13 +5,40 @@ API de Passagens de Serviço - CORREÇÃO: USERNAME global → busca fiscal no B
 Localização: backend/app/api/v1/passagens_api.py
 """
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, BackgroundTasks, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import FileResponse, JSONResponse
 from typing import List, Optional
 from pydantic import BaseModel, Field, validator
 from datetime import date, datetime, timedelta
 import logging
 import time
 
+from app.utils.paginacao import (
+    LIMITE_PADRAO,
+    LIMITE_MAXIMO,
+    encode_cursor,
+    decode_cursor,
+    cursor_datetime,
+    cabecalhos_paginacao
+)
+from app.utils.streaming import formato_streaming, resposta_streaming
+from app.config.database import conflito_concorrencia
+from app.utils.cache_http import (
+    etag_passagem,
+    etag_confere,
+    cabecalhos_cache,
+    resposta_nao_modificada
+)
+from app.services.passagem_service import passagem_service, PeriodoSobreposto
+from app.services.porto_service import porto_service, SECOES_PORTO, LISTAS_PORTO
+from app.services.pdf_service import pdf_service
+from app.services.autosave_service import autosave_service
+from app.services.storage_service import storage_service
+from app.services.audit_service import audit_service
+from app.services.busca_service import busca_service
+from app.services.secao_service import secao_service, GRUPOS
+from app.models.auditoria import AuditoriaEvento
+
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/passagens", tags=["Passagens"])
@@ -41,6 +68,20 @@ class PassagemUpdate(BaseModel):
     EmbarcacaoId: int
     FiscalEmbarcandoId: Optional[int] = None
 
+class CopiaPassagemRequest(BaseModel):
+    secoes: Optional[List[str]] = None  # None → seções padrão (ver SECOES_COPIAVEIS)
+
+class AnexoPorHashRequest(BaseModel):
+    sha256: str = Field(..., min_length=64, max_length=64)
+    filename: str = Field(..., min_length=1, max_length=255)
+
+    @validator('sha256')
+    def validar_sha256(cls, v):
+        v = v.lower()
+        if any(c not in '0123456789abcdef' for c in v):
+            raise ValueError('sha256 deve ser hexadecimal')
+        return v
+
 class PassagemResponse(BaseModel):
     PassagemId: int
     NumeroPS: Optional[str] = None
@@ -58,6 +99,16 @@ class PassagemResponse(BaseModel):
     OwnerUser: Optional[str] = None
 
 # === BUSINESS LOGIC FUNCTIONS ===
+# Identidade resolvida fica em memória por alguns segundos: evita ida ao banco
+# em rajadas de requisições (downloads por Range, autosave); edição de fiscal
+# descarta o cache na hora (invalidar_identidade)
+IDENTIDADE_TTL_SEG = 5.0
+_identidade_cache: dict = {}  # username → (expira_em, dados do fiscal)
+
+def invalidar_identidade():
+    """Descarta a identidade em cache - chamado quando FISCAIS é alterada"""
+    _identidade_cache.clear()
+
 async def get_current_fiscal_dados_bd():
     """
     NOVA FUNÇÃO: USERNAME global → busca dados completos do fiscal no BD
@@ -79,6 +130,10 @@ async def get_current_fiscal_dados_bd():
                 detail="USERNAME global não inicializado"
             )
         
+        cache = _identidade_cache.get(username)
+        if cache and cache[0] > time.monotonic():
+            return dict(cache[1])
+        
         # 2. Busca dados do usuário usando USERNAME global
         user_data = await get_current_user_data()
         if not user_data or not user_data.get("fiscal_data"):
@@ -93,7 +148,7 @@ async def get_current_fiscal_dados_bd():
         # 4. Monta dados formatados para retorno
         fiscal_formatado = f"[{fiscal_data['Chave']}] - {fiscal_data['Nome']}"
         
-        return {
+        dados = {
             "FiscalId": fiscal_data["FiscalId"],
             "Nome": fiscal_data["Nome"],
             "Chave": fiscal_data["Chave"],
@@ -101,6 +156,11 @@ async def get_current_fiscal_dados_bd():
             "FiscalFormatado": fiscal_formatado  # "[chave] - [nome]"
         }
         
+        # Um usuário por processo (USERNAME global): troca de usuário descarta o anterior
+        _identidade_cache.clear()
+        _identidade_cache[username] = (time.monotonic() + IDENTIDADE_TTL_SEG, dados)
+        return dict(dados)
+        
     except HTTPException:
         raise
     except Exception as e:
@@ -157,59 +217,111 @@ def can_edit_passagem(ps_data: dict, fiscal_id: int) -> bool:
         logger.error(f"Erro em can_edit_passagem: {e}")
         return False
 
-async def inicializar_secoes_porto(passagem_id: int):
-    """REGRA DE NEGÓCIO: Inicializa seções PORTO automaticamente"""
-    from app.config.database import db
-    
-    try:
-        # 1.1 e 1.2 (linhas "singulares")
-        await db.execute_query('INSERT INTO porto_trocaturma (PassagemId) VALUES (?)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_manutencaopreventiva (PassagemId, NaoSolicitada, NaoProgramada) VALUES (?,?,?)', 
-                               [passagem_id, 0, 0])
-        
-        # 1.3–1.6 (com flag NaoPrevisto disponível)
-        await db.execute_query('INSERT INTO porto_abastecimento (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_anvisa (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_classe (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_inspecoespetrobras (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        
-        # 1.7–1.10 (listas) — cria "sentinela" NaoPrevisto=1
-        await db.execute_query('INSERT INTO porto_embarqueequipes (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_embarquemateriais (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_desembarquemateriais (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        await db.execute_query('INSERT INTO porto_osmobilizacao (PassagemId, NaoPrevisto) VALUES (?,1)', [passagem_id])
-        
-        logger.info(f"Seções PORTO inicializadas para PS {passagem_id}")
-        
-    except Exception as e:
-        logger.error(f"Erro ao inicializar seções PORTO para PS {passagem_id}: {e}")
-        # Não falha a criação da PS por causa disso
-
 async def log_audit_event(passagem_id: int, evento: str, descricao: str, fiscal_nome: str, fiscal_login: str, detalhe: Optional[str] = None):
-    """FUNÇÃO DE AUDITORIA"""
+    """FUNÇÃO DE AUDITORIA - só enfileira; a gravação é em lote (audit_service)"""
     try:
-        from app.config.database import db
-        
-        sql = "INSERT INTO AuditLog (PassagemId, Evento, Descricao, AutorUser, AutorNome, Detalhe) VALUES (?,?,?,?,?,?)"
-        await db.execute_query(sql, [passagem_id, evento, descricao, fiscal_login, fiscal_nome, detalhe])
+        await audit_service.registrar(passagem_id, evento, descricao, fiscal_login, fiscal_nome, detalhe)
         
     except Exception as e:
         logger.error(f"Erro no log de auditoria: {e}")
 
-# === API ENDPOINTS ===
-@router.get("/", response_model=List[PassagemResponse])
-async def list_passagens(inicio: Optional[str] = None, fim: Optional[str] = None):
-    """Lista passagens do fiscal - USA USERNAME GLOBAL para identificar fiscal"""
-    try:
-        from app.config.database import db
-        
-        # Obtém dados do fiscal via USERNAME global
-        fiscal_dados = await get_current_fiscal_dados_bd()
-        fiscal_id = fiscal_dados["FiscalId"]
-        
-        # CORREÇÃO: Query específica com campos ordenados
-        sql = """
-        SELECT p.PassagemId, p.NumeroPS, p.DataEmissao, p.PeriodoInicio, p.PeriodoFim,
+async def consultar_versao_passagem(passagem_id: int, fiscal_id: int):
+    """
+    Consulta leve (sem JOIN) da versão da PS + validação de acesso de leitura
+    Returns: (Versao, Status)
+    """
+    from app.config.database import db
+
+    sql = """
+    SELECT Versao, Status, FiscalEmbarcandoId, FiscalDesembarcandoId
+    FROM PASSAGENS WHERE PassagemId = ?
+    """
+    rows = await db.execute_query(sql, [passagem_id])
+
+    if not rows:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="PS não encontrada"
+        )
+
+    versao, status_ps, fiscal_emb_id, fiscal_desemb_id = rows[0]
+    if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso negado"
+        )
+
+    return versao, status_ps
+
+async def validar_edicao_passagem(passagem_id: int, fiscal_id: int):
+    """Valida existência da PS, acesso do fiscal e janela de edição (RASCUNHO + desembarcante)"""
+    from app.config.database import db
+
+    sql_check = """
+    SELECT Status, FiscalDesembarcandoId, PeriodoFim,
+           FiscalEmbarcandoId
+    FROM PASSAGENS WHERE PassagemId = ?
+    """
+    rows_check = await db.execute_query(sql_check, [passagem_id])
+
+    if not rows_check:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="PS não encontrada"
+        )
+
+    ps_data = {
+        'Status': rows_check[0][0],
+        'FiscalDesembarcandoId': rows_check[0][1],
+        'PeriodoFim': rows_check[0][2],
+        'FiscalEmbarcandoId': rows_check[0][3]
+    }
+
+    # Valida permissão de acesso
+    if ps_data['FiscalEmbarcandoId'] != fiscal_id and ps_data['FiscalDesembarcandoId'] != fiscal_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso negado"
+        )
+
+    # Valida permissão de edição
+    if not can_edit_passagem(ps_data, fiscal_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Janela de edição encerrada ou você não é o desembarcante"
+        )
+
+async def erro_escrita_negada(passagem_id: int, fiscal_id: int, acao: str = "alterar",
+                             janela: bool = True) -> HTTPException:
+    """
+    Escrita guardada não afetou linha: descobre o motivo (só roda no caminho de falha)
+    """
+    from app.config.database import db
+
+    rows = await db.execute_query(
+        "SELECT Status, FiscalEmbarcandoId, FiscalDesembarcandoId, PeriodoFim FROM PASSAGENS WHERE PassagemId = ?",
+        [passagem_id]
+    )
+    if not rows:
+        return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="PS não encontrada")
+
+    status_ps, fiscal_emb_id, fiscal_desemb_id, periodo_fim = rows[0]
+    if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acesso negado")
+    if status_ps != 'RASCUNHO':
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Só é possível {acao} PS em rascunho")
+    if fiscal_desemb_id != fiscal_id:
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Só o fiscal desembarcando pode {acao}")
+    if janela and periodo_fim < passagem_service.limite_janela_edicao():
+        return HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Janela de edição encerrada")
+
+    # Guarda falhou mas a PS agora passa: mudou entre a escrita e esta consulta
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="PS alterada por outra operação, tente novamente")
+
+COLUNAS_LISTAGEM = list(PassagemResponse.model_fields)
+
+SQL_LISTAGEM = """
+        SELECT {primeiras}p.PassagemId, p.NumeroPS, p.DataEmissao, p.PeriodoInicio, p.PeriodoFim,
                p.EmbarcacaoId, p.FiscalEmbarcandoId, p.FiscalDesembarcandoId, p.Status, p.OwnerUser,
                e.Nome AS EmbarcacaoNome, 
                fe.Nome AS FiscalEmbarcandoNome, 
@@ -219,48 +331,115 @@ async def list_passagens(inicio: Optional[str] = None, fim: Optional[str] = None
         JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
         LEFT JOIN FISCAIS fe ON fe.FiscalId = p.FiscalEmbarcandoId
         JOIN FISCAIS fd ON fd.FiscalId = p.FiscalDesembarcandoId
-        WHERE (p.FiscalEmbarcandoId = ? OR p.FiscalDesembarcandoId = ?)
         """
-        
+
+def linha_passagem(row) -> dict:
+    """Linha de SQL_LISTAGEM → campos de PassagemResponse (JSON e streaming)"""
+    # Monta fiscal desembarcando formatado "[chave] - [nome]"
+    fiscal_desemb_formatado = f"{row[13]}-{row[12]}" if row[13] and row[12] else row[12]
+
+    return {
+        "PassagemId": row[0],          # p.PassagemId
+        "NumeroPS": form_ps_num(row[1]) if row[1] else None,  # p.NumeroPS
+        "DataEmissao": str(row[2]) if row[2] else None,       # p.DataEmissao
+        "PeriodoInicio": str(row[3]),  # p.PeriodoInicio
+        "PeriodoFim": str(row[4]),     # p.PeriodoFim
+        "EmbarcacaoId": row[5],        # p.EmbarcacaoId
+        "FiscalEmbarcandoId": row[6],  # p.FiscalEmbarcandoId
+        "FiscalDesembarcandoId": row[7], # p.FiscalDesembarcandoId
+        "Status": row[8],              # p.Status
+        "OwnerUser": row[9],           # p.OwnerUser
+        "EmbarcacaoNome": row[10],     # e.Nome
+        "FiscalEmbarcandoNome": row[11], # fe.Nome
+        "FiscalDesembarcandoNome": row[12], # fd.Nome
+        "FiscalDesembarcandoFormatado": fiscal_desemb_formatado # [chave] - [nome]
+    }
+
+# === API ENDPOINTS ===
+@router.get("/", response_model=List[PassagemResponse])
+async def list_passagens(
+    request: Request,
+    response: Response,
+    inicio: Optional[str] = None,
+    fim: Optional[str] = None,
+    status_ps: Optional[str] = Query(None, alias="status"),
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None,
+    total: bool = False
+):
+    """
+    Lista passagens do fiscal - USA USERNAME GLOBAL para identificar fiscal
+    status=RASCUNHO etc. restringe ao status (ex.: verificação de rascunho na tela)
+    Paginação por keyset em (PeriodoInicio, PassagemId): próxima página via
+    cabeçalho X-Next-Cursor; X-Total-Count apenas quando total=true
+    Accept: text/csv ou application/x-ndjson → todas as linhas em streaming
+    """
+    try:
+        from app.config.database import db
+
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
+
+        cursor_valores = decode_cursor(cursor, 2)
+
+        # Filtro comum (listagem e contagem)
+        where = " WHERE (p.FiscalEmbarcandoId = ? OR p.FiscalDesembarcandoId = ?)"
         params = [fiscal_id, fiscal_id]
-        
+
         if inicio:
-            sql += " AND p.PeriodoInicio >= ?"
+            where += " AND p.PeriodoInicio >= ?"
             params.append(inicio)
-            
+
         if fim:
-            sql += " AND p.PeriodoFim <= ?"
+            where += " AND p.PeriodoFim <= ?"
             params.append(fim)
-            
-        sql += " ORDER BY p.PeriodoInicio DESC"
-        
+
+        if status_ps:
+            where += " AND p.Status = ?"
+            params.append(status_ps)
+
+        formato = formato_streaming(request)
+        if formato:
+            logger.info(f"Listagem de passagens em streaming ({formato}) para fiscal {fiscal_dados['Nome']}")
+            return resposta_streaming(
+                formato, COLUNAS_LISTAGEM,
+                SQL_LISTAGEM.format(primeiras="") + where + " ORDER BY p.PeriodoInicio DESC, p.PassagemId DESC",
+                params, linha_passagem, "passagens"
+            )
+
+        total_registros = None
+        if total:
+            rows_total = await db.execute_query(f"SELECT COUNT(*) FROM PASSAGENS p{where}", params)
+            total_registros = rows_total[0][0] if rows_total else 0
+
+        # Keyset: continua após a última linha da página anterior
+        if cursor_valores:
+            where += " AND (p.PeriodoInicio < ? OR (p.PeriodoInicio = ? AND p.PassagemId < ?))"
+            params.extend([cursor_valores[0], cursor_valores[0], cursor_valores[1]])
+
+        # CORREÇÃO: Query específica com campos ordenados
+        sql = SQL_LISTAGEM.format(primeiras=f"FIRST {limit + 1} ")  # +1 para saber se existe próxima página
+
+        sql += where
+        sql += " ORDER BY p.PeriodoInicio DESC, p.PassagemId DESC"
+
         rows = await db.execute_query(sql, params)
-        
-        passagens = []
-        for row in rows:
-            # Monta fiscal desembarcando formatado "[chave] - [nome]"
-            fiscal_desemb_formatado = f"{row[13]}-{row[12]}" if row[13] and row[12] else row[12]
-            
-            passagens.append(PassagemResponse(
-                PassagemId=row[0],          # p.PassagemId
-                NumeroPS=form_ps_num(row[1]) if row[1] else None,  # p.NumeroPS
-                DataEmissao=str(row[2]) if row[2] else None,       # p.DataEmissao
-                PeriodoInicio=str(row[3]),  # p.PeriodoInicio
-                PeriodoFim=str(row[4]),     # p.PeriodoFim
-                EmbarcacaoId=row[5],        # p.EmbarcacaoId
-                FiscalEmbarcandoId=row[6],  # p.FiscalEmbarcandoId
-                FiscalDesembarcandoId=row[7], # p.FiscalDesembarcandoId
-                Status=row[8],              # p.Status
-                OwnerUser=row[9],           # p.OwnerUser
-                EmbarcacaoNome=row[10],     # e.Nome
-                FiscalEmbarcandoNome=row[11], # fe.Nome
-                FiscalDesembarcandoNome=row[12], # fd.Nome
-                FiscalDesembarcandoFormatado=fiscal_desemb_formatado # [chave] - [nome]
-            ))
+
+        proximo_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            proximo_cursor = encode_cursor([rows[-1][3], rows[-1][0]])
+
+        response.headers.update(cabecalhos_paginacao(proximo_cursor, total_registros))
+
+        passagens = [PassagemResponse(**linha_passagem(row)) for row in rows]
         
         logger.info(f"Listadas {len(passagens)} passagens para fiscal {fiscal_dados['Nome']} (USERNAME global)")
         return passagens
-        
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Erro ao listar passagens: {e}")
         raise HTTPException(
@@ -287,10 +466,12 @@ async def create_passagem(passagem_data: PassagemCreate):
             )
         
         # Cria a PS com dados do fiscal obtidos do BD
+        # Seções PORTO não são pré-criadas: cada linha nasce no primeiro salvamento
         sql = """
         INSERT INTO PASSAGENS 
         (NumeroPS, DataEmissao, PeriodoInicio, PeriodoFim, EmbarcacaoId, FiscalEmbarcandoId, FiscalDesembarcandoId, Status, OwnerUser)
         VALUES (?,?,?,?,?,?,?,?,?)
+        RETURNING PassagemId
         """
         
         params = [
@@ -305,53 +486,57 @@ async def create_passagem(passagem_data: PassagemCreate):
             fiscal_dados["Nome"]  # OwnerUser = Nome do BD
         ]
         
-        affected = await db.execute_query(sql, params)
-        
-        if affected > 0:
-            # Busca o ID da PS criada
-            sql_id = """
-            SELECT FIRST 1 PassagemId FROM PASSAGENS 
-            WHERE FiscalDesembarcandoId = ? AND Status = 'RASCUNHO'
-            ORDER BY PassagemId DESC
-            """
-            rows = await db.execute_query(sql_id, [fiscal_dados["FiscalId"]])
+        # REGRA DE NEGÓCIO: período não pode coincidir com outra PS da embarcação
+        async with db.transaction() as cursor:
+            passagem_service.validar_periodo_tx(
+                cursor, passagem_data.EmbarcacaoId, passagem_data.PeriodoInicio, passagem_data.PeriodoFim
+            )
+            cursor.execute(sql, params)
+            row = cursor.fetchone()
+        
+        if row:
+            passagem_id = row[0]
+            # AUDITORIA: Log do evento
+            await log_audit_event(
+                passagem_id, 
+                'CREATE', 
+                'Criou a PS.',
+                fiscal_dados["Nome"],
+                fiscal_dados["Nome"]
+            )
             
-            if rows:
-                passagem_id = rows[0][0]
-                
-                # REGRA DE NEGÓCIO: Inicializa seções PORTO
-                await inicializar_secoes_porto(passagem_id)
-                
-                # AUDITORIA: Log do evento
-                await log_audit_event(
-                    passagem_id, 
-                    'CREATE', 
-                    'Criou a PS.',
-                    fiscal_dados["Nome"],
-                    fiscal_dados["Nome"]
-                )
-                
-                logger.info(f"PS {passagem_id} criada para fiscal {fiscal_dados['FiscalFormatado']} (via USERNAME global)")
-                
-                # CORREÇÃO: Retorna também dados do fiscal formatado para o frontend
-                return {
-                    "PassagemId": passagem_id,
-                    "FiscalDesembarcando": {
-                        "FiscalId": fiscal_dados["FiscalId"],
-                        "Nome": fiscal_dados["Nome"],
-                        "Chave": fiscal_dados["Chave"],
-                        "FiscalFormatado": fiscal_dados["FiscalFormatado"]  # "[chave] - [nome]"
-                    }
+            logger.info(f"PS {passagem_id} criada para fiscal {fiscal_dados['FiscalFormatado']} (via USERNAME global)")
+            
+            # CORREÇÃO: Retorna também dados do fiscal formatado para o frontend
+            return {
+                "PassagemId": passagem_id,
+                "FiscalDesembarcando": {
+                    "FiscalId": fiscal_dados["FiscalId"],
+                    "Nome": fiscal_dados["Nome"],
+                    "Chave": fiscal_dados["Chave"],
+                    "FiscalFormatado": fiscal_dados["FiscalFormatado"]  # "[chave] - [nome]"
                 }
+            }
         
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Erro ao criar passagem de serviço"
         )
         
+    except PeriodoSobreposto as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
+        # Outra criação/cópia/edição da mesma embarcação venceu a trava (WITH LOCK)
+        if conflito_concorrencia(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="PS alterada por outra operação, tente novamente"
+            )
         logger.error(f"Erro ao criar passagem: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -359,15 +544,19 @@ async def create_passagem(passagem_data: PassagemCreate):
         )
 
 @router.get("/{passagem_id}", response_model=PassagemResponse)
-async def get_passagem(passagem_id: int):
-    """Busca PS por ID - USA USERNAME GLOBAL para validar permissão"""
+async def get_passagem(passagem_id: int, request: Request = None, response: Response = None):
+    """
+    Busca PS por ID - USA USERNAME GLOBAL para validar permissão
+    ETag = versão da PS + nomes do JOIN (renomear embarcação/fiscal muda o ETag);
+    If-None-Match que confere → 304 sem corpo
+    """
     try:
         from app.config.database import db
         
         # Obtém dados do fiscal via USERNAME global
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
-        
+
         # CORREÇÃO: Query específica com campos ordenados
         sql = """
         SELECT p.PassagemId, p.NumeroPS, p.DataEmissao, p.PeriodoInicio, p.PeriodoFim,
@@ -375,7 +564,8 @@ async def get_passagem(passagem_id: int):
                e.Nome AS EmbarcacaoNome, 
                fe.Nome AS FiscalEmbarcandoNome, 
                fd.Nome AS FiscalDesembarcandoNome,
-               fd.Chave AS FiscalDesembarcandoChave
+               fd.Chave AS FiscalDesembarcandoChave,
+               p.Versao
         FROM PASSAGENS p
         JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
         LEFT JOIN FISCAIS fe ON fe.FiscalId = p.FiscalEmbarcandoId
@@ -405,6 +595,13 @@ async def get_passagem(passagem_id: int):
         
         # Monta fiscal desembarcando formatado "[chave] - [nome]"
         fiscal_desemb_formatado = f"{row[13]}-{row[12]}" if row[13] and row[12] else row[12]
+
+        # Requisição condicional: responde 304 sem montar a PS
+        etag = etag_passagem(passagem_id, row[14], "cabecalho", row[10], row[11], row[12], row[13])
+        if etag_confere(request, etag):
+            return resposta_nao_modificada(etag, row[8] == 'FINALIZADA')
+        if response is not None:
+            response.headers.update(cabecalhos_cache(etag, row[8] == 'FINALIZADA'))
         
         return PassagemResponse(
             PassagemId=row[0],          # p.PassagemId
@@ -443,54 +640,34 @@ async def update_passagem(passagem_id: int, passagem_data: PassagemUpdate):
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
         
-        # Busca PS para validar permissão
-        sql_check = """
-        SELECT Status, FiscalDesembarcandoId, PeriodoFim 
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows = await db.execute_query(sql_check, [passagem_id])
-        
-        if not rows:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
-            )
-        
-        status_ps, fiscal_desemb_id, periodo_fim = rows[0]
-        
-        # REGRA DE NEGÓCIO: Só pode alterar se for RASCUNHO e fiscal desembarcando
-        if status_ps != 'RASCUNHO':
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Só é possível alterar PS em rascunho"
-            )
-        
-        if fiscal_desemb_id != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Só o fiscal desembarcando pode alterar"
-            )
-        
-        # Atualiza os campos básicos
+        # REGRA DE NEGÓCIO na própria escrita: só RASCUNHO e só o fiscal desembarcando
         sql_update = """
         UPDATE PASSAGENS 
-        SET DataEmissao = ?, PeriodoInicio = ?, PeriodoFim = ?, FiscalEmbarcandoId = ?
-        WHERE PassagemId = ?
+        SET DataEmissao = ?, PeriodoInicio = ?, PeriodoFim = ?, FiscalEmbarcandoId = ?,
+            Versao = Versao + 1
+        WHERE PassagemId = ? AND Status = 'RASCUNHO' AND FiscalDesembarcandoId = ?
         """
         
-        affected = await db.execute_query(sql_update, [
-            passagem_data.DataEmissao,
-            passagem_data.PeriodoInicio,
-            passagem_data.PeriodoFim,
-            passagem_data.FiscalEmbarcandoId,
-            passagem_id
-        ])
+        async with db.transaction() as cursor:
+            cursor.execute(sql_update, [
+                passagem_data.DataEmissao,
+                passagem_data.PeriodoInicio,
+                passagem_data.PeriodoFim,
+                passagem_data.FiscalEmbarcandoId,
+                passagem_id,
+                fiscal_id
+            ])
+            atualizada = cursor.rowcount > 0
+            if atualizada:
+                # Depois da guarda: PS alheia recebe 403/404, não o conflito de período
+                cursor.execute("SELECT EmbarcacaoId FROM PASSAGENS WHERE PassagemId = ?", [passagem_id])
+                passagem_service.validar_periodo_tx(
+                    cursor, cursor.fetchone()[0], passagem_data.PeriodoInicio, passagem_data.PeriodoFim,
+                    ignorar_id=passagem_id
+                )
         
-        if affected == 0:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro ao atualizar PS"
-            )
+        if not atualizada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id, "alterar", janela=False)
         
         # AUDITORIA: Log do evento
         await log_audit_event(
@@ -506,9 +683,20 @@ async def update_passagem(passagem_id: int, passagem_data: PassagemUpdate):
         # Retorna PS atualizada
         return await get_passagem(passagem_id)
         
+    except PeriodoSobreposto as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
+        # Outra criação/cópia/edição da mesma embarcação venceu a trava (WITH LOCK)
+        if conflito_concorrencia(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="PS alterada por outra operação, tente novamente"
+            )
         logger.error(f"Erro ao atualizar PS {passagem_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -517,7 +705,7 @@ async def update_passagem(passagem_id: int, passagem_data: PassagemUpdate):
     
 
 @router.get("/{passagem_id}/porto")
-async def get_porto_data(passagem_id: int):
+async def get_porto_data(passagem_id: int, request: Request, response: Response):
     """
     GET /api/passagens/{id}/porto - Carrega dados das seções Porto 1.1 a 1.6
     """
@@ -528,52 +716,20 @@ async def get_porto_data(passagem_id: int):
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
         
-        # Valida se PS existe e fiscal tem permissão
-        sql_check = """
-        SELECT FiscalEmbarcandoId, FiscalDesembarcandoId 
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows_check = await db.execute_query(sql_check, [passagem_id])
-        
-        if not rows_check:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
-            )
-        
-        fiscal_emb_id, fiscal_desemb_id = rows_check[0]
-        if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acesso negado"
-            )
-        
-        # Busca dados das 6 tabelas porto
-        sql_queries = {
-            'trocaturma': 'SELECT * FROM porto_trocaturma WHERE PassagemId=?',
-            'manutencaopreventiva': 'SELECT * FROM porto_manutencaopreventiva WHERE PassagemId=?',
-            'abastecimento': 'SELECT * FROM porto_abastecimento WHERE PassagemId=?',
-            'anvisa': 'SELECT * FROM porto_anvisa WHERE PassagemId=?',
-            'classe': 'SELECT * FROM porto_classe WHERE PassagemId=?',
-            'inspecoespetrobras': 'SELECT * FROM porto_inspecoespetrobras WHERE PassagemId=?'
-        }
-        
-        result = {}
-        for table_key, sql in sql_queries.items():
-            rows = await db.execute_query(sql, [passagem_id])
-            if rows:
-                # Converte row para dict usando column names
-                columns = await db.get_column_names(sql, [passagem_id])
-                row_dict = dict(zip(columns, rows[0])) if rows else None
-                result[table_key] = row_dict
-            else:
-                result[table_key] = None
-                
-        # Ajusta nomes de chaves para compatibilidade com frontend
-        if result.get('manutencaopreventiva'):
-            result['manutencaoPreventiva'] = result.pop('manutencaopreventiva')
-        if result.get('inspecoespetrobras'):
-            result['inspecoesPetrobras'] = result.pop('inspecoespetrobras')
+        # Valida se PS existe e fiscal tem permissão (consulta leve da versão)
+        versao, status_ps = await consultar_versao_passagem(passagem_id, fiscal_id)
+        if autosave_service.pendentes(passagem_id):
+            # Leitura enxerga o que o autosave ainda segura em memória
+            await autosave_service.descarregar(passagem_id)
+            versao, status_ps = await consultar_versao_passagem(passagem_id, fiscal_id)
+        etag = etag_passagem(passagem_id, versao, "porto")
+        if etag_confere(request, etag):
+            return resposta_nao_modificada(etag, status_ps == 'FINALIZADA')
+        response.headers.update(cabecalhos_cache(etag, status_ps == 'FINALIZADA'))
+        
+        # Busca as 6 seções numa única conexão; seção ainda não gravada vem com padrões
+        async with db.transaction() as cursor:
+            result = porto_service.carregar_secoes(cursor, passagem_id)
         
         return result
         
@@ -598,48 +754,26 @@ async def update_porto_data(passagem_id: int, porto_data: dict):
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
         
-        # Valida PS e permissão de edição
-        sql_check = """
-        SELECT Status, FiscalDesembarcandoId, PeriodoFim,
-               FiscalEmbarcandoId
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows_check = await db.execute_query(sql_check, [passagem_id])
-        
-        if not rows_check:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
-            )
+        # Autosave pendente é mais antigo que este salvamento: grava antes
+        await autosave_service.descarregar(passagem_id)
         
-        ps_data = {
-            'Status': rows_check[0][0],
-            'FiscalDesembarcandoId': rows_check[0][1], 
-            'PeriodoFim': rows_check[0][2],
-            'FiscalEmbarcandoId': rows_check[0][3]
+        # PUT grava a seção inteira (campo ausente → NULL), mas só as colunas que mudaram
+        secoes = {
+            chave: {campo: (porto_data.get(chave) or {}).get(campo) for campo in secao['campos']}
+            for chave, secao in SECOES_PORTO.items()
         }
         
-        # Valida permissão de acesso
-        if ps_data['FiscalEmbarcandoId'] != fiscal_id and ps_data['FiscalDesembarcandoId'] != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acesso negado"
-            )
-        
-        # Valida permissão de edição
-        if not can_edit_passagem(ps_data, fiscal_id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Janela de edição encerrada ou você não é o desembarcante"
-            )
+        # Guarda de edição + seções numa única transação; versão só sobe se algum campo mudou
+        async with db.transaction() as cursor:
+            travada = passagem_service.travar_edicao_tx(cursor, passagem_id, fiscal_id, incrementar=False)
+            if travada:
+                alterados = porto_service.salvar_secoes_parcial(cursor, passagem_id, secoes)
+                if alterados:
+                    passagem_service.incrementar_versao_tx(cursor, passagem_id)
+                    busca_service.indexar_tx(cursor, passagem_id, busca_service.secoes_afetadas(alterados))
         
-        # Salva cada seção
-        await salvar_trocaturma(db, passagem_id, porto_data.get('trocaturma', {}))
-        await salvar_manutencao_preventiva(db, passagem_id, porto_data.get('manutencaoPreventiva', {}))
-        await salvar_abastecimento(db, passagem_id, porto_data.get('abastecimento', {}))
-        await salvar_anvisa(db, passagem_id, porto_data.get('anvisa', {}))
-        await salvar_classe(db, passagem_id, porto_data.get('classe', {}))
-        await salvar_inspecoes_petrobras(db, passagem_id, porto_data.get('inspecoesPetrobras', {}))
+        if not travada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id)
         
         # Log de auditoria
         await log_audit_event(
@@ -663,293 +797,174 @@ async def update_porto_data(passagem_id: int, porto_data: dict):
             detail="Erro ao salvar dados do Porto"
         )
 
-# Funções auxiliares de salvamento
-async def salvar_trocaturma(db, passagem_id: int, data: dict):
-    """Salva seção 1.1 Troca de Turma"""
-    sql = """
-    UPDATE OR INSERT INTO porto_trocaturma 
-    (PassagemId, Porto, Terminal, OrdemServico, AtracacaoHora, DuracaoMin, Observacoes)
-    VALUES (?,?,?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        data.get('Porto'),
-        data.get('Terminal'), 
-        data.get('OrdemServico'),
-        data.get('AtracacaoHora'),
-        data.get('DuracaoMin'),
-        data.get('Observacoes')
-    ])
-
-async def salvar_manutencao_preventiva(db, passagem_id: int, data: dict):
-    """Salva seção 1.2 Manutenção Preventiva"""
-    sql = """
-    UPDATE OR INSERT INTO porto_manutencaopreventiva
-    (PassagemId, NaoSolicitada, FranquiaSolicitadaMin, NaoProgramada, 
-     OrdemServico, SaldoFranquiaMin, RADEPath, Observacoes)
-    VALUES (?,?,?,?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        1 if data.get('NaoSolicitada') else 0,
-        data.get('FranquiaSolicitadaMin'),
-        1 if data.get('NaoProgramada') else 0,
-        data.get('OrdemServico'),
-        data.get('SaldoFranquiaMin'),
-        data.get('RADEPath'),
-        data.get('Observacoes')
-    ])
-
-async def salvar_abastecimento(db, passagem_id: int, data: dict):
-    """Salva seção 1.3 Abastecimento"""
-    sql = """
-    UPDATE OR INSERT INTO porto_abastecimento
-    (PassagemId, NaoPrevisto, OrdemServico, Quantidade_m3, DuracaoMin, Observacoes, AnexoPath)
-    VALUES (?,?,?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        1 if data.get('NaoPrevisto') else 0,
-        data.get('OrdemServico'),
-        data.get('Quantidade_m3'),
-        data.get('DuracaoMin'),
-        data.get('Observacoes'),
-        data.get('AnexoPath')
-    ])
-
-async def salvar_anvisa(db, passagem_id: int, data: dict):
-    """Salva seção 1.4 ANVISA"""
-    sql = """
-    UPDATE OR INSERT INTO porto_anvisa
-    (PassagemId, NaoPrevisto, OrdemServico, Descricao, Observacoes)
-    VALUES (?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        1 if data.get('NaoPrevisto') else 0,
-        data.get('OrdemServico'),
-        data.get('Descricao'),
-        data.get('Observacoes')
-    ])
-
-async def salvar_classe(db, passagem_id: int, data: dict):
-    """Salva seção 1.5 Classe"""
-    sql = """
-    UPDATE OR INSERT INTO porto_classe
-    (PassagemId, NaoPrevisto, OrdemServico, Descricao, Observacoes)
-    VALUES (?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        1 if data.get('NaoPrevisto') else 0,
-        data.get('OrdemServico'),
-        data.get('Descricao'),
-        data.get('Observacoes')
-    ])
-
-async def salvar_inspecoes_petrobras(db, passagem_id: int, data: dict):
-    """Salva seção 1.6 Inspeções Petrobras"""
-    sql = """
-    UPDATE OR INSERT INTO porto_inspecoespetrobras
-    (PassagemId, NaoPrevisto, Auditor, Gerencia, Observacoes)
-    VALUES (?,?,?,?,?)
-    MATCHING (PassagemId)
-    """
-    await db.execute_query(sql, [
-        passagem_id,
-        1 if data.get('NaoPrevisto') else 0,
-        data.get('Auditor'),
-        data.get('Gerencia'),
-        data.get('Observacoes')
-    ])
-
-
-@router.get("/{passagem_id}/porto-listas")
-async def get_porto_listas_data(passagem_id: int):
+@router.patch("/{passagem_id}/porto")
+async def patch_porto_data(passagem_id: int, porto_data: dict):
     """
-    GET /api/passagens/{id}/porto-listas - Carrega dados das seções Porto 1.7 a 1.10 (listas)
+    PATCH /api/passagens/{id}/porto - Grava só as seções/campos enviados (1.1 a 1.6)
+    Ex.: {"anvisa": {"Observacoes": "..."}} → no máximo 1 UPDATE em porto_anvisa
+    Campos iguais ao valor atual são ignorados (comparação na mesma transação)
     """
     try:
         from app.config.database import db
-        
+
         # Obtém dados do fiscal via USERNAME global
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
-        
-        # Valida se PS existe e fiscal tem permissão
-        sql_check = """
-        SELECT FiscalEmbarcandoId, FiscalDesembarcandoId 
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows_check = await db.execute_query(sql_check, [passagem_id])
-        
-        if not rows_check:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
-            )
-        
-        fiscal_emb_id, fiscal_desemb_id = rows_check[0]
-        if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acesso negado"
-            )
-        
-        # Busca dados das 4 tabelas de listas
-        sql_equipes = """
-        SELECT EmbEqId, NaoPrevisto, Tipo, Empresa, Nome, Observacoes 
-        FROM porto_embarqueequipes 
-        WHERE PassagemId=? ORDER BY EmbEqId
-        """
-        
-        sql_embarque_materiais = """
-        SELECT EmbMatId, NaoPrevisto, Origem, OS, Destino, RT, Observacoes, AnexoPath 
-        FROM porto_embarquemateriais 
-        WHERE PassagemId=? ORDER BY EmbMatId
-        """
-        
-        sql_desembarque_materiais = """
-        SELECT DesembMatId, NaoPrevisto, OS, Origem, Destino, RT, Observacoes, AnexoPath 
-        FROM porto_desembarquemateriais 
-        WHERE PassagemId=? ORDER BY DesembMatId
-        """
-        
-        sql_os_mobilizacao = """
-        SELECT OSMobId, NaoPrevisto, OS, Descricao, Observacoes, AnexoPath 
-        FROM porto_osmobilizacao 
-        WHERE PassagemId=? ORDER BY OSMobId
-        """
-        
-        # Executa queries
-        equipes_rows = await db.execute_query(sql_equipes, [passagem_id])
-        embarque_rows = await db.execute_query(sql_embarque_materiais, [passagem_id])
-        desembarque_rows = await db.execute_query(sql_desembarque_materiais, [passagem_id])
-        osmob_rows = await db.execute_query(sql_os_mobilizacao, [passagem_id])
-        
-        # Processa listas usando função pack_list
-        # CORREÇÃO: backend/app/api/v1/passagens_api.py
-        # Data: 2025-01-20
-        # Problema: Mapeamento incorreto de campos na função pack_list do endpoint GET porto-listas
-        # Seções afetadas: 1.7 a 1.10 (listas)
 
-        # Substituir a função pack_list dentro do endpoint get_porto_listas_data():
+        # Autosave pendente é mais antigo que este salvamento: grava antes
+        await autosave_service.descarregar(passagem_id)
 
-        def pack_list(rows, field_names):
-            if not rows:
-                return {"naoPrevisto": True, "linhas": []}
-            
-            # Verifica se todas as linhas são "sentinela" (NaoPrevisto=1 e campos vazios)
-            nao_previsto = all(
-                row[1] == 1 and all(row[i] is None or row[i] == '' for i in range(2, len(row)))
-                for row in rows
+        # Guarda de edição trava a PS; versão só sobe se algum campo mudou
+        alterados = {}
+        async with db.transaction() as cursor:
+            travada = passagem_service.travar_edicao_tx(cursor, passagem_id, fiscal_id, incrementar=False)
+            if travada:
+                alterados = porto_service.salvar_secoes_parcial(cursor, passagem_id, porto_data)
+                if alterados:
+                    passagem_service.incrementar_versao_tx(cursor, passagem_id)
+                    busca_service.indexar_tx(cursor, passagem_id, busca_service.secoes_afetadas(alterados))
+
+        if not travada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id)
+
+        if alterados:
+            await log_audit_event(
+                passagem_id,
+                'PORTO_PATCH',
+                'Atualizou parcialmente Seção Porto (1.1–1.6)',
+                fiscal_dados["Nome"],
+                fiscal_dados["Nome"],
+                ', '.join(f"{k}: {', '.join(v)}" for k, v in alterados.items())
             )
-            
-            if nao_previsto:
-                return {"naoPrevisto": True, "linhas": []}
-            
-            # Filtra linhas reais (NaoPrevisto != 1) e converte para dict
-            linhas = []
-            for row in rows:
-                if row[1] != 1:  # Se não é sentinela
-                    linha_dict = {}
-                    # CORREÇÃO: Mapear corretamente os campos
-                    # row[0] = ID, row[1] = NaoPrevisto, row[2+] = dados
-                    for i, field_name in enumerate(field_names):
-                        linha_dict[field_name] = row[i + 2] if i + 2 < len(row) else None
-                    linhas.append(linha_dict)
-            
-            return {"naoPrevisto": False, "linhas": linhas}
-        
-        # Monta resposta
-        result = {
-            "equipes": pack_list(equipes_rows, ['Tipo', 'Empresa', 'Nome', 'Observacoes']),
-            "embarqueMateriais": pack_list(embarque_rows, ['Origem', 'OS', 'Destino', 'RT', 'Observacoes', 'AnexoPath']),
-            "desembarqueMateriais": pack_list(desembarque_rows, ['OS', 'Origem', 'Destino', 'RT', 'Observacoes', 'AnexoPath']),
-            "osMobilizacao": pack_list(osmob_rows, ['OS', 'Descricao', 'Observacoes', 'AnexoPath'])
-        }
-        
-        return result
-        
+
+        return {"success": True, "alterados": alterados}
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro ao buscar listas Porto PS {passagem_id}: {e}")
+        logger.error(f"Erro ao salvar parcialmente dados Porto PS {passagem_id}: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Erro ao buscar listas do Porto"
+            detail="Erro ao salvar dados do Porto"
         )
-    
-@router.put("/{passagem_id}/porto-listas")
-async def update_porto_listas_data(passagem_id: int, listas_data: dict):
+
+@router.post("/{passagem_id}/porto/autosave", status_code=status.HTTP_202_ACCEPTED)
+async def autosave_porto_data(passagem_id: int, porto_data: dict):
     """
-    PUT /api/passagens/{id}/porto-listas - Salva dados das seções Porto 1.7 a 1.10 (listas)
+    POST /api/passagens/{id}/porto/autosave - Edições pequenas e frequentes (1.1 a 1.6)
+    Mesmo formato do PATCH; fica em memória e é gravado em lote após o debounce
     """
     try:
-        from app.config.database import db
-        
         # Obtém dados do fiscal via USERNAME global
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
-        
+
         # Valida PS e permissão de edição
-        sql_check = """
-        SELECT Status, FiscalDesembarcandoId, PeriodoFim,
-               FiscalEmbarcandoId
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows_check = await db.execute_query(sql_check, [passagem_id])
-        
-        if not rows_check:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
-            )
+        await validar_edicao_passagem(passagem_id, fiscal_id)
+
+        pendentes = await autosave_service.acumular(passagem_id, porto_data, fiscal_dados["Nome"], fiscal_id)
+        return {"ok": True, "pendentes": pendentes}
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no autosave Porto PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro no autosave do Porto"
+        )
+
+@router.get("/{passagem_id}/porto-listas")
+async def get_porto_listas_data(passagem_id: int, request: Request, response: Response):
+    """
+    GET /api/passagens/{id}/porto-listas - Carrega dados das seções Porto 1.7 a 1.10 (listas)
+    """
+    try:
+        from app.config.database import db
         
-        ps_data = {
-            'Status': rows_check[0][0],
-            'FiscalDesembarcandoId': rows_check[0][1], 
-            'PeriodoFim': rows_check[0][2],
-            'FiscalEmbarcandoId': rows_check[0][3]
-        }
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
         
-        # Valida permissão de acesso
-        if ps_data['FiscalEmbarcandoId'] != fiscal_id and ps_data['FiscalDesembarcandoId'] != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acesso negado"
-            )
+        # Valida se PS existe e fiscal tem permissão (consulta leve da versão)
+        versao, status_ps = await consultar_versao_passagem(passagem_id, fiscal_id)
+        etag = etag_passagem(passagem_id, versao, "porto-listas")
+        if etag_confere(request, etag):
+            return resposta_nao_modificada(etag, status_ps == 'FINALIZADA')
+        response.headers.update(cabecalhos_cache(etag, status_ps == 'FINALIZADA'))
         
-        # Valida permissão de edição
-        if not can_edit_passagem(ps_data, fiscal_id):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Janela de edição encerrada ou você não é o desembarcante"
-            )
+        # Busca as 4 listas (com ID de cada linha) e os flags "não previsto"
+        async with db.transaction() as cursor:
+            result = porto_service.carregar_listas(cursor, passagem_id)
         
-        # Salva cada lista
-        await salvar_lista_equipes(db, passagem_id, listas_data.get('equipes', {}))
-        await salvar_lista_embarque_materiais(db, passagem_id, listas_data.get('embarqueMateriais', {}))
-        await salvar_lista_desembarque_materiais(db, passagem_id, listas_data.get('desembarqueMateriais', {}))
-        await salvar_lista_os_mobilizacao(db, passagem_id, listas_data.get('osMobilizacao', {}))
+        return result
         
-        # Log de auditoria
-        await log_audit_event(
-            passagem_id,
-            'PORTO_LISTAS_SAVE',
-            'Atualizou Listas Porto (1.7–1.10)',
-            fiscal_dados["Nome"],
-            fiscal_dados["Nome"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao buscar listas Porto PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao buscar listas do Porto"
         )
+    
+@router.put("/{passagem_id}/porto-listas")
+async def update_porto_listas_data(passagem_id: int, listas_data: dict):
+    """
+    PUT /api/passagens/{id}/porto-listas - Salva dados das seções Porto 1.7 a 1.10 (listas)
+    """
+    try:
+        from app.config.database import db
         
-        logger.info(f"Listas Porto salvas para PS {passagem_id}")
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
         
-        return {"success": True, "message": "Listas Porto salvas com sucesso"}
+        # Guarda de edição e diff por ID de cada lista, numa única transação;
+        # versão só sobe se alguma linha ou flag foi gravado
+        ids, alterados = {}, {}
+        async with db.transaction() as cursor:
+            travada = passagem_service.travar_edicao_tx(cursor, passagem_id, fiscal_id, incrementar=False)
+            if travada:
+                for chave in LISTAS_PORTO:
+                    ids[chave], campos = porto_service.salvar_lista_diff(
+                        cursor, passagem_id, chave, listas_data.get(chave) or {}
+                    )
+                    if campos:
+                        alterados[chave] = campos
+                for chave in porto_service.salvar_flags_listas(cursor, passagem_id, listas_data):
+                    alterados.setdefault(chave, []).append('naoPrevisto')
+                if alterados:
+                    passagem_service.incrementar_versao_tx(cursor, passagem_id)
+                    # Reindexa só as listas cujo texto mudou
+                    busca_service.indexar_tx(cursor, passagem_id, busca_service.secoes_afetadas(alterados))
+        
+        if not travada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id)
+        
+        # Log de auditoria (só quando algo foi gravado)
+        if alterados:
+            await log_audit_event(
+                passagem_id,
+                'PORTO_LISTAS_SAVE',
+                'Atualizou Listas Porto (1.7–1.10)',
+                fiscal_dados["Nome"],
+                fiscal_dados["Nome"],
+                ', '.join(f"{k}: {', '.join(v)}" for k, v in alterados.items())
+            )
+            logger.info(f"Listas Porto salvas para PS {passagem_id}")
+        
+        return {"success": True, "message": "Listas Porto salvas com sucesso", "ids": ids, "alterados": alterados}
         
     except HTTPException:
         raise
@@ -960,131 +975,171 @@ async def update_porto_listas_data(passagem_id: int, listas_data: dict):
             detail="Erro ao salvar listas do Porto"
         )
 
-# Funções auxiliares para salvar listas
-async def salvar_lista_equipes(db, passagem_id: int, data: dict):
-    """Salva seção 1.7 Embarque de Equipes"""
-    table_name = "porto_embarqueequipes"
-    await salvar_lista_generica(db, table_name, passagem_id, data, 
-                               ['Tipo', 'Empresa', 'Nome', 'Observacoes'])
-
-async def salvar_lista_embarque_materiais(db, passagem_id: int, data: dict):
-    """Salva seção 1.8 Embarque de Materiais"""
-    table_name = "porto_embarquemateriais"
-    await salvar_lista_generica(db, table_name, passagem_id, data,
-                               ['Origem', 'OS', 'Destino', 'RT', 'Observacoes', 'AnexoPath'])
-
-async def salvar_lista_desembarque_materiais(db, passagem_id: int, data: dict):
-    """Salva seção 1.9 Desembarque de Materiais"""
-    table_name = "porto_desembarquemateriais"
-    await salvar_lista_generica(db, table_name, passagem_id, data,
-                               ['OS', 'Origem', 'Destino', 'RT', 'Observacoes', 'AnexoPath'])
-
-async def salvar_lista_os_mobilizacao(db, passagem_id: int, data: dict):
-    """Salva seção 1.10 OS Mobilização/Desmobilização"""
-    table_name = "porto_osmobilizacao"
-    await salvar_lista_generica(db, table_name, passagem_id, data,
-                               ['OS', 'Descricao', 'Observacoes', 'AnexoPath'])
-
-# CORREÇÃO: backend/app/api/v1/passagens_api.py 
-# Data: 2025-01-20
-# Problema: Função salvar_lista_generica incompleta - PUT porto-listas
-# Seções afetadas: 1.7 a 1.10 (salvamento listas)
-
-async def salvar_lista_generica(db, table_name: str, passagem_id: int, data: dict, fields: list):
-    """Função genérica para salvar listas porto"""
-    # Limpa registros existentes
-    await db.execute_query(f"DELETE FROM {table_name} WHERE PassagemId=?", [passagem_id])
-    
-    # Se naoPrevisto=True, insere apenas sentinela
-    if data.get('naoPrevisto', False):
-        await db.execute_query(
-            f"INSERT INTO {table_name} (PassagemId, NaoPrevisto) VALUES (?,1)",
-            [passagem_id]
+def grupo_secoes_ou_404(grupo: str):
+    if grupo not in GRUPOS:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Grupo de seções não encontrado: {grupo}"
         )
-        return
-    
-    # Insere linhas reais
-    linhas = data.get('linhas', [])
-    if not linhas:
-        # Se não há linhas, cria sentinela
-        await db.execute_query(
-            f"INSERT INTO {table_name} (PassagemId, NaoPrevisto) VALUES (?,1)",
-            [passagem_id]
+
+@router.get("/{passagem_id}/secoes/{grupo}")
+async def get_secoes_grupo(passagem_id: int, grupo: str, request: Request, response: Response):
+    """
+    GET /api/passagens/{id}/secoes/{grupo} - Carrega as seções do registro (sms, rotina, ordens, gerais)
+    Singular → objeto; lista → {"naoPrevisto", "linhas"} com "id" em cada linha
+    """
+    try:
+        from app.config.database import db
+
+        grupo_secoes_ou_404(grupo)
+
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
+
+        # Valida se PS existe e fiscal tem permissão (consulta leve da versão)
+        versao, status_ps = await consultar_versao_passagem(passagem_id, fiscal_id)
+        etag = etag_passagem(passagem_id, versao, f"secoes-{grupo}")
+        if etag_confere(request, etag):
+            return resposta_nao_modificada(etag, status_ps == 'FINALIZADA')
+        response.headers.update(cabecalhos_cache(etag, status_ps == 'FINALIZADA'))
+
+        # Uma consulta por tabela do grupo, numa única transação
+        async with db.transaction() as cursor:
+            result = secao_service.carregar_grupo(cursor, passagem_id, grupo)
+
+        return result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao buscar seções {grupo} PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao buscar seções"
+        )
+
+@router.put("/{passagem_id}/secoes/{grupo}")
+async def update_secoes_grupo(passagem_id: int, grupo: str, secoes_data: dict):
+    """
+    PUT /api/passagens/{id}/secoes/{grupo} - Salva as seções enviadas do grupo
+    Ex.: {"ais": {"naoPrevisto": false, "linhas": [...]}, "racQsms": {...}}
+    Seção ausente no corpo não é alterada; gravação por diferença (versão só sobe se algo mudou)
+    """
+    try:
+        from app.config.database import db
+
+        grupo_secoes_ou_404(grupo)
+
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
+
+        # Guarda de edição, validação pelos modelos e diff de cada tabela numa única transação
+        alterados, ids = {}, {}
+        async with db.transaction() as cursor:
+            travada = passagem_service.travar_edicao_tx(cursor, passagem_id, fiscal_id, incrementar=False)
+            if travada:
+                alterados, ids = secao_service.salvar_grupo(cursor, passagem_id, grupo, secoes_data)
+                if alterados:
+                    passagem_service.incrementar_versao_tx(cursor, passagem_id)
+                    busca_service.indexar_tx(cursor, passagem_id, busca_service.secoes_afetadas(alterados))
+
+        if not travada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id)
+
+        if alterados:
+            await log_audit_event(
+                passagem_id,
+                'SECOES_SAVE',
+                f'Atualizou {GRUPOS[grupo]}',
+                fiscal_dados["Nome"],
+                fiscal_dados["Nome"],
+                ', '.join(f"{k}: {', '.join(v)}" for k, v in alterados.items())
+            )
+
+        return {"success": True, "alterados": alterados, "ids": ids}
+
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao salvar seções {grupo} PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao salvar seções"
         )
-        return
-    
-    # Monta SQL de inserção dinamicamente - CORREÇÃO APLICADA
-    field_placeholders = ','.join(['?'] * (len(fields) + 2))  # +2 para PassagemId e NaoPrevisto
-    all_fields = ['PassagemId', 'NaoPrevisto'] + fields
-    fields_str = ','.join(all_fields)
-    
-    sql = f"INSERT INTO {table_name} ({fields_str}) VALUES ({field_placeholders})"
-    
-    # Insere cada linha
-    for linha in linhas:
-        values = [passagem_id, 0]  # PassagemId, NaoPrevisto=0
-        for field in fields:
-            values.append(linha.get(field))
-        
-        await db.execute_query(sql, values)
 
 from fastapi import UploadFile, File
-import os
+from app.services.anexo_service import anexo_service, AnexoMuitoGrande, TAMANHOS_PREVIEW, caminho_derivado
+from app.services.preview_service import preview_service
+from app.utils.arquivos_http import resposta_arquivo
+import mimetypes
 from pathlib import Path
 
+async def validar_participante_passagem(passagem_id: int, fiscal_id: int):
+    """Valida se PS existe e o fiscal é embarcante ou desembarcante"""
+    from app.config.database import db
+
+    sql_check = """
+    SELECT FiscalEmbarcandoId, FiscalDesembarcandoId 
+    FROM PASSAGENS WHERE PassagemId = ?
+    """
+    rows_check = await db.execute_query(sql_check, [passagem_id])
+    
+    if not rows_check:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="PS não encontrada"
+        )
+    
+    fiscal_emb_id, fiscal_desemb_id = rows_check[0]
+    if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Acesso negado"
+        )
+
 @router.post("/{passagem_id}/upload")
-async def upload_anexo(passagem_id: int, file: UploadFile = File(...)):
+async def upload_anexo(passagem_id: int, request: Request, file: UploadFile = File(...)):
     """
     POST /api/passagens/{id}/upload - Upload de anexos para seção Porto
+    (gravado em blocos, com SHA-256 calculado durante a gravação)
+    Corpo acima de UPLOAD_MAX_BYTES já é recusado por LimiteUploadMiddleware,
+    antes do parse do multipart; as checagens abaixo valem para o arquivo em si
     """
     try:
-        from app.config.database import db
-        from app.config.settings import settings
+        # Tamanho do arquivo (a requisição inteira cabe no limite + folga do multipart)
+        if anexo_service.excede_limite(request.headers.get("content-length")) or \
+                anexo_service.excede_limite(file.size):
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail="Arquivo excede o tamanho máximo permitido"
+            )
         
         # Obtém dados do fiscal via USERNAME global
         fiscal_dados = await get_current_fiscal_dados_bd()
-        fiscal_id = fiscal_dados["FiscalId"]
         
         # Valida se PS existe e fiscal tem permissão
-        sql_check = """
-        SELECT FiscalEmbarcandoId, FiscalDesembarcandoId 
-        FROM PASSAGENS WHERE PassagemId = ?
-        """
-        rows_check = await db.execute_query(sql_check, [passagem_id])
+        await validar_participante_passagem(passagem_id, fiscal_dados["FiscalId"])
         
-        if not rows_check:
+        # Grava em blocos num temporário; conteúdo novo vai para STORAGE_DIR/blobs
+        try:
+            anexo = await anexo_service.salvar_upload(passagem_id, file)
+        except AnexoMuitoGrande as e:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="PS não encontrada"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=str(e)
             )
+        file_path = anexo["path"]
         
-        fiscal_emb_id, fiscal_desemb_id = rows_check[0]
-        if fiscal_emb_id != fiscal_id and fiscal_desemb_id != fiscal_id:
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="Acesso negado"
-            )
-        
-        # Cria diretório da PS se não existir
-        storage_dir = Path(settings.STORAGE_DIR) / "PS" / str(passagem_id)
-        storage_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Sanitiza nome do arquivo
-        safe_filename = file.filename.replace("/", "_").replace("\\", "_").replace(":", "_")
-        safe_filename = safe_filename.replace("*", "_").replace("?", "_").replace('"', "_")
-        safe_filename = safe_filename.replace("<", "_").replace(">", "_").replace("|", "_")
-        
-        # Adiciona timestamp para evitar conflitos
-        timestamp = int(time.time())
-        filename = f"{timestamp}_{safe_filename}"
-        
-        # Caminho completo do arquivo
-        file_path = storage_dir / filename
-        
-        # Salva arquivo
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Miniatura/prévia geradas em segundo plano (fila cheia → sob demanda)
+        if preview_service.e_imagem(file.filename or ""):
+            preview_service.enfileirar(file_path)
         
         # Log de auditoria
         await log_audit_event(
@@ -1101,9 +1156,10 @@ async def upload_anexo(passagem_id: int, file: UploadFile = File(...)):
         return {
             "ok": True,
             "path": str(file_path),
-            "filename": filename,
+            "filename": anexo["filename"],
             "original_filename": file.filename,
-            "size": len(content)
+            "size": anexo["size"],
+            "sha256": anexo["sha256"]
         }
         
     except HTTPException:
@@ -1115,10 +1171,186 @@ async def upload_anexo(passagem_id: int, file: UploadFile = File(...)):
             detail="Erro no upload do arquivo"
         )
 
+@router.post("/{passagem_id}/anexos/por-hash")
+async def anexar_por_hash(passagem_id: int, anexo_data: AnexoPorHashRequest):
+    """
+    POST /api/passagens/{id}/anexos/por-hash - Anexa conteúdo que o servidor já tem
+    (o cliente envia o SHA-256 antes do upload; 404 → enviar o arquivo em /upload)
+    """
+    try:
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await validar_participante_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        anexo = await anexo_service.registrar_existente(passagem_id, anexo_data.sha256, anexo_data.filename)
+        if anexo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Conteúdo não encontrado, envie o arquivo"
+            )
+        
+        if preview_service.e_imagem(anexo_data.filename):
+            preview_service.enfileirar(anexo["path"])
+        
+        await log_audit_event(
+            passagem_id,
+            'UPLOAD',
+            f'Anexo reaproveitado ({anexo_data.filename})',
+            fiscal_dados["Nome"],
+            fiscal_dados["Nome"],
+            str(anexo["path"])
+        )
+        
+        return {
+            "ok": True,
+            "path": str(anexo["path"]),
+            "filename": anexo["filename"],
+            "original_filename": anexo_data.filename,
+            "size": anexo["size"],
+            "sha256": anexo["sha256"]
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao anexar por hash na PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao anexar arquivo"
+        )
+
+@router.get("/{passagem_id}/anexos/{nome}")
+async def download_anexo(passagem_id: int, nome: str, request: Request):
+    """
+    GET /api/passagens/{id}/anexos/{nome} - Download de anexo da PS
+    Aceita o filename do upload, o hash do blob ou um arquivo legado da PS;
+    suporta Range (retomada) e ETag forte (conteúdo imutável)
+    """
+    try:
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await validar_participante_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        anexo = await anexo_service.localizar(passagem_id, nome)
+        if anexo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Anexo não encontrado"
+            )
+        
+        media_type = mimetypes.guess_type(anexo["nome"])[0] or "application/octet-stream"
+        return resposta_arquivo(
+            request, anexo["caminho"], anexo["tamanho"], anexo["etag"], anexo["nome"], media_type
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro no download do anexo {nome} da PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao baixar anexo"
+        )
+
+@router.get("/{passagem_id}/anexos/{nome}/preview")
+async def preview_anexo(passagem_id: int, nome: str, request: Request,
+                        tamanho: str = Query("thumb", description="thumb | preview")):
+    """
+    GET /api/passagens/{id}/anexos/{nome}/preview - Miniatura/prévia JPEG de anexo de imagem
+    Ainda não gerada → 202 (derivado entra na fila; consultar de novo)
+    """
+    try:
+        if tamanho not in TAMANHOS_PREVIEW:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Tamanho inválido, use: {', '.join(TAMANHOS_PREVIEW)}"
+            )
+        
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await validar_participante_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        anexo = await anexo_service.localizar(passagem_id, nome)
+        if anexo is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Anexo não encontrado"
+            )
+        
+        original = anexo["caminho"]
+        if not preview_service.e_imagem(anexo["nome"]) or preview_service.falha(original):
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Anexo não é uma imagem válida"
+            )
+        
+        derivado = caminho_derivado(original, tamanho)
+        if derivado.exists():
+            # Derivado muda junto com o original: mesma ETag forte + tamanho
+            etag_original = anexo["etag"].strip('"')
+            etag = f'"{etag_original}-{tamanho}"'
+            nome_derivado = f"{Path(anexo['nome']).stem}_{tamanho}.jpg"
+            return resposta_arquivo(
+                request, derivado, derivado.stat().st_size, etag, nome_derivado, "image/jpeg"
+            )
+        
+        if not preview_service.enfileirar(original):
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Fila de miniaturas cheia, tente novamente em instantes",
+                headers={"Retry-After": "5"}
+            )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"ok": True, "status": "processando"},
+            headers={"Retry-After": "1"}
+        )
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro na miniatura do anexo {nome} da PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao obter miniatura"
+        )
+
     
 @router.delete("/{passagem_id}")
-async def delete_passagem(passagem_id: int):
-    """Exclui uma passagem de serviço"""
+async def delete_passagem(passagem_id: int, background_tasks: BackgroundTasks):
+    """Exclui uma passagem de serviço (um DELETE; dependências via ON DELETE CASCADE)"""
+    try:
+        from app.config.database import db
+        
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
+        
+        # Exclui a PS (e, em cascata, seções e auditoria) só se RASCUNHO do fiscal desembarcando
+        async with db.transaction() as cursor:
+            cursor.execute(
+                "DELETE FROM PASSAGENS WHERE PassagemId = ? AND Status = 'RASCUNHO' AND FiscalDesembarcandoId = ?",
+                [passagem_id, fiscal_id]
+            )
+            excluida = cursor.rowcount > 0
+        
+        if not excluida:
+            raise await erro_escrita_negada(passagem_id, fiscal_id, "excluir", janela=False)
+        
+        # Limpeza dos anexos fica para depois da resposta
+        autosave_service.descartar(passagem_id)
+        background_tasks.add_task(storage_service.limpar_passagem, passagem_id)
+        
+        return {"success": True}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao excluir PS {passagem_id}: {e}")
+        raise HTTPException(status_code=500, detail="Erro ao excluir PS")
+@router.post("/{passagem_id}/finalizar", status_code=status.HTTP_202_ACCEPTED)
+async def finalizar_passagem(passagem_id: int):
+    """
+    POST /api/passagens/{id}/finalizar - Trava a PS (Status=FINALIZADA) e enfileira o PDF
+    A renderização roda no pool de processos; acompanhar em GET /{id}/pdf-jobs/{jobId}
+    """
     try:
         from app.config.database import db
         
@@ -1126,40 +1358,263 @@ async def delete_passagem(passagem_id: int):
         fiscal_dados = await get_current_fiscal_dados_bd()
         fiscal_id = fiscal_dados["FiscalId"]
         
-        # Busca PS para validar permissão
-        sql_check = "SELECT Status, FiscalDesembarcandoId FROM PASSAGENS WHERE PassagemId = ?"
-        rows = await db.execute_query(sql_check, [passagem_id])
+        # Sem vaga na fila a PS nem é travada
+        if pdf_service.fila_cheia():
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Fila de geração de PDF cheia, tente novamente em instantes"
+            )
+        
+        # Edições ainda no autosave entram na PS (e no PDF) antes da trava
+        await autosave_service.descarregar(passagem_id)
+        
+        # Trava condicional com as regras de edição: só um /finalizar concorrente vence
+        # Documento do PDF montado na mesma transação: se a leitura falha, a PS volta a RASCUNHO
+        documento = None
+        async with db.transaction() as cursor:
+            cursor.execute(
+                "UPDATE PASSAGENS SET Status = 'FINALIZADA', Versao = Versao + 1 "
+                "WHERE PassagemId = ? AND Status = 'RASCUNHO' AND FiscalDesembarcandoId = ? "
+                "AND PeriodoFim >= ?",
+                [passagem_id, fiscal_id, passagem_service.limite_janela_edicao()]
+            )
+            travada = cursor.rowcount > 0
+            if travada:
+                documento = pdf_service.montar_documento_tx(cursor, passagem_id)
+        
+        if not travada:
+            raise await erro_escrita_negada(passagem_id, fiscal_id, "finalizar")
+        
+        # PS já finalizada: falha ao enfileirar não vira 500 - o PDF sai depois por GET /{id}/pdf
+        job, erro_pdf = None, None
+        try:
+            job = await pdf_service.gerar(passagem_id, documento)
+        except Exception as e:
+            logger.error(f"PS {passagem_id} finalizada, mas o PDF não foi enfileirado: {e}")
+            erro_pdf = "PS finalizada, mas a geração do PDF não foi iniciada; solicite o PDF novamente"
         
+        # Log de auditoria
+        await log_audit_event(
+            passagem_id,
+            'FINALIZAR',
+            'Finalizou PS e enfileirou geração do PDF.' if job else 'Finalizou PS (PDF não enfileirado).',
+            fiscal_dados["Nome"],
+            fiscal_dados["Nome"],
+            f"JobId={job['jobId']}" if job else erro_pdf
+        )
+        
+        if job is None:
+            return {"ok": True, "status": "FINALIZADA", "job": None, "erroPdf": erro_pdf}
+        
+        logger.info(f"PS {passagem_id} finalizada, PDF na fila (job {job['jobId']})")
+        
+        return {"ok": True, "status": "FINALIZADA", "job": job}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao finalizar PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao finalizar PS"
+        )
+
+@router.get("/{passagem_id}/pdf-jobs/{job_id}")
+async def get_pdf_job(passagem_id: int, job_id: str):
+    """
+    GET /api/passagens/{id}/pdf-jobs/{jobId} - Progresso da renderização do PDF
+    status: na_fila (com posicao) → processando → concluido | erro
+    """
+    try:
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await consultar_versao_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        job = pdf_service.status_job(job_id)
+        if job is None or job["passagemId"] != passagem_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Job de PDF não encontrado"
+            )
+        
+        return job
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao consultar job de PDF {job_id} da PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao consultar geração do PDF"
+        )
+
+@router.post("/{passagem_id}/copiar", status_code=status.HTTP_201_CREATED)
+async def copiar_passagem(passagem_id: int, copia_data: Optional[CopiaPassagemRequest] = None):
+    """
+    POST /api/passagens/{id}/copiar - Gera a PS seguinte a partir de uma PS finalizada
+    Cabeçalho (+1 a +14 dias) e seções escolhidas copiados no servidor, numa transação
+    """
+    try:
+        from app.config.database import db
+        
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        fiscal_id = fiscal_dados["FiscalId"]
+        
+        secoes = passagem_service.secoes_copia(copia_data.secoes if copia_data else None)
+        
+        rows = await db.execute_query(
+            "SELECT Status, FiscalEmbarcandoId FROM PASSAGENS WHERE PassagemId = ?",
+            [passagem_id]
+        )
         if not rows:
-            raise HTTPException(status_code=404, detail="PS não encontrada")
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="PS não encontrada"
+            )
         
-        status, fiscal_desemb_id = rows[0]
+        status_ps, fiscal_emb_id = rows[0]
         
-        # Só pode excluir RASCUNHO e se for o fiscal desembarcando
-        if status != 'RASCUNHO':
-            raise HTTPException(status_code=403, detail="Só é possível excluir PS em rascunho")
+        # REGRAS DE NEGÓCIO (legado): só PS finalizada, só pelo embarcante
+        if status_ps != 'FINALIZADA':
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Somente PS finalizada pode ser copiada"
+            )
+        if fiscal_emb_id != fiscal_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Somente o embarcante pode copiar esta PS"
+            )
         
-        if fiscal_desemb_id != fiscal_id:
-            raise HTTPException(status_code=403, detail="Só o fiscal desembarcando pode excluir")
-        
-        # Exclui a PS
-        await db.execute_query("DELETE FROM porto_trocaturma WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_manutencaopreventiva WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_abastecimento WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_anvisa WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_classe WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_inspecoespetrobras WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_embarqueequipes WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_embarquemateriais WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_desembarquemateriais WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM porto_osmobilizacao WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM AUDITLOG WHERE PassagemId = ?", [passagem_id])
-        await db.execute_query("DELETE FROM PASSAGENS WHERE PassagemId = ?", [passagem_id])
+        # O embarcante passa a desembarcante da nova PS: vale a regra de 1 rascunho
+        if await check_fiscal_rascunho_existente(fiscal_id):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Passagem de serviço já existe, no modo rascunho, para o fiscal!"
+            )
         
-        return {"success": True}
+        async with db.transaction() as cursor:
+            novo_id = passagem_service.copiar_passagem(
+                cursor, passagem_id, fiscal_id, fiscal_dados["Nome"], secoes
+            )
+        
+        if novo_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="PS não encontrada"
+            )
         
+        # Log de auditoria (origem e nova PS)
+        await log_audit_event(
+            passagem_id,
+            'COPIAR',
+            'Copiou PS para nova PS (+14 dias).',
+            fiscal_dados["Nome"],
+            fiscal_dados["Nome"],
+            f"NovaPassagemId={novo_id}; Secoes={','.join(secoes)}"
+        )
+        await log_audit_event(
+            novo_id,
+            'CREATE',
+            f'Criou a PS por cópia da PS {passagem_id}.',
+            fiscal_dados["Nome"],
+            fiscal_dados["Nome"]
+        )
+        
+        return {"PassagemId": novo_id, "NewPassagemId": novo_id, "secoes": secoes}
+        
+    except PeriodoSobreposto as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Erro ao excluir PS {passagem_id}: {e}")
-        raise HTTPException(status_code=500, detail="Erro ao excluir PS")
\ No newline at end of file
+        # Outra criação/cópia/edição da mesma embarcação venceu a trava (WITH LOCK)
+        if conflito_concorrencia(e):
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="PS alterada por outra operação, tente novamente"
+            )
+        logger.error(f"Erro ao copiar PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao copiar PS"
+        )
+
+async def responder_pdf(passagem_id: int):
+    """FileResponse do PDF em cache ou 202 com o job de renderização (usado também pelo admin)"""
+    caminho, nome, job = await pdf_service.obter_ou_gerar(passagem_id)
+    if caminho is not None:
+        return FileResponse(str(caminho), media_type="application/pdf", filename=nome)
+    return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content={"ok": True, "job": job})
+
+@router.get("/{passagem_id}/auditoria", response_model=List[AuditoriaEvento])
+async def get_auditoria_passagem(
+    passagem_id: int,
+    response: Response,
+    evento: Optional[str] = Query(None, description="Um ou mais eventos separados por vírgula"),
+    autor: Optional[str] = None,
+    desde: Optional[datetime] = None,
+    ate: Optional[datetime] = None,
+    limit: int = Query(LIMITE_PADRAO, ge=1, le=LIMITE_MAXIMO),
+    cursor: Optional[str] = None
+):
+    """
+    GET /api/passagens/{id}/auditoria - Histórico da PS (mais recente primeiro)
+    Filtros por evento, autor e período; próxima página via cabeçalho X-Next-Cursor
+    """
+    try:
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await validar_participante_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        cursor_valores = decode_cursor(cursor, 2)
+        if cursor_valores:
+            cursor_valores[0] = cursor_datetime(cursor_valores[0])
+        
+        eventos, proximo = await audit_service.consultar(
+            limit, cursor_valores, passagem_id=passagem_id,
+            eventos=[e.strip().upper() for e in evento.split(",") if e.strip()] if evento else None,
+            autor=autor, desde=desde, ate=ate
+        )
+        
+        response.headers.update(cabecalhos_paginacao(encode_cursor(proximo) if proximo else None))
+        return eventos
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao consultar auditoria da PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao consultar auditoria"
+        )
+
+@router.get("/{passagem_id}/pdf")
+async def download_pdf(passagem_id: int):
+    """
+    GET /api/passagens/{id}/pdf - PDF da PS
+    Conteúdo já renderizado → FileResponse do cache; senão 202 com o job enfileirado
+    """
+    try:
+        # Obtém dados do fiscal via USERNAME global
+        fiscal_dados = await get_current_fiscal_dados_bd()
+        await consultar_versao_passagem(passagem_id, fiscal_dados["FiscalId"])
+        
+        return await responder_pdf(passagem_id)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao obter PDF da PS {passagem_id}: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro ao obter PDF da PS"
+        )
@@ -8,6 +8,7 @@ Baseada na aplicação cadastro3.py que FUNCIONA com Firebird 4.0
 import logging
 import os
 import ctypes
+from contextlib import asynccontextmanager
 from typing import Optional, List, Any
 
 logger = logging.getLogger(__name__)
@@ -120,7 +121,61 @@ class FirebirdConnection:
                 except:
                     pass
     
-    
+    @asynccontextmanager
+    async def transaction(self):
+        """
+        Transação única: uma conexão, um cursor, um commit
+        Commit ao sair do bloco sem erro; rollback em qualquer exceção
+        """
+        connection = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            yield cursor
+            connection.commit()
+        except Exception as e:
+            if connection:
+                try:
+                    connection.rollback()
+                except:
+                    pass
+            logger.error(f"Erro na transação: {e}")
+            raise
+        finally:
+            if connection:
+                try:
+                    connection.close()
+                except:
+                    pass
+
+    def iter_query_sync(self, sql: str, params: Optional[List] = None, lote: int = 500):
+        """
+        SELECT em streaming: entrega linha a linha buscando lotes com fetchmany
+        (memória limitada a um lote, qualquer que seja o total de linhas)
+        A conexão fica aberta até o gerador terminar ou ser fechado
+        """
+        connection = None
+        try:
+            connection = self.get_connection()
+            cursor = connection.cursor()
+            cursor.execute(sql, params or [])
+            while True:
+                linhas = cursor.fetchmany(lote)
+                if not linhas:
+                    break
+                yield from linhas
+            cursor.close()
+        except Exception as e:
+            logger.error(f"Erro ao executar query em streaming: {e}")
+            raise
+        finally:
+            if connection:
+                try:
+                    connection.rollback()
+                    connection.close()
+                except:
+                    pass
+
     def execute_query_sync(self, sql: str, params: Optional[List] = None) -> List[Any]:
         """Versão síncrona como na aplicação funcional"""
         connection = None
@@ -179,3 +234,19 @@ async def init_database():
 def get_db():
     """Dependency injection para FastAPI"""
     return db
+
+# Códigos do Firebird para conflito entre transações concorrentes
+# (deadlock / update conflict, lock conflict, update conflict, concurrent transaction)
+GDSCODES_CONFLITO = {335544336, 335544345, 335544451, 335544878}
+
+def conflito_concorrencia(erro: Exception) -> bool:
+    """
+    Erro do fdb por conflito com outra transação (ex.: SELECT ... WITH LOCK ou
+    UPDATE na mesma linha em transação snapshot) - a operação pode ser repetida
+    """
+    # DatabaseError do fdb: args = (mensagem, sqlcode, gdscode)
+    args = getattr(erro, 'args', ())
+    if len(args) >= 3 and args[2] in GDSCODES_CONFLITO:
+        return True
+    mensagem = str(erro).lower()
+    return 'update conflicts with concurrent update' in mensagem or 'lock conflict' in mensagem
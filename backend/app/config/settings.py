@@ -41,6 +41,29 @@ class Settings:
     
     # PDF
     PDF_LOGO: Optional[str] = None
+    PDF_WORKERS: int = 2  # Processos dedicados à renderização (não disputam o loop da API)
+    PDF_FILA_MAX: int = 20  # Jobs aguardando renderização; acima disso /finalizar responde 503
+    
+    # Autosave do Porto (buffer em memória por PS)
+    AUTOSAVE_DEBOUNCE_SEG: float = 2.0  # Grava quando o fiscal para de digitar por este tempo
+    AUTOSAVE_ESPERA_MAX_SEG: float = 15.0  # Nunca segura alterações por mais que isso
+    
+    # Upload de anexos (gravado em blocos, sem carregar o arquivo inteiro na memória)
+    UPLOAD_MAX_BYTES: int = 50 * 1024 * 1024  # Acima disso o upload responde 413
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    
+    # Miniaturas/prévias de anexos de imagem (pool de processos, como o PDF)
+    PREVIEW_WORKERS: int = 1
+    PREVIEW_FILA_MAX: int = 100  # Imagens aguardando; fila cheia → gera na primeira consulta
+    
+    # Varredura de arquivos órfãos no storage (0 desliga o agendamento)
+    STORAGE_VARREDURA_HORAS: float = 24.0
+    STORAGE_CARENCIA_HORAS: float = 24.0  # Arquivo mais novo que isso nunca é removido
+    
+    # Auditoria gravada em lote por uma tarefa de fundo
+    AUDIT_INTERVALO_MS: int = 500  # Espera máxima de um evento antes de ir para o banco
+    AUDIT_LOTE_MAX: int = 200
+    AUDIT_FILA_MAX: int = 10000  # Fila cheia → o request espera vaga (nenhum evento é perdido)
     
     def __init__(self):
         """Carrega configurações do arquivo .env se existir"""
@@ -66,8 +89,14 @@ class Settings:
                         # Aplica as configurações
                         if hasattr(self, key):
                             # Converte tipos conforme necessário
-                            if key in ['DB_PORT', 'PORT']:
+                            if key in ['DB_PORT', 'PORT', 'PDF_WORKERS', 'PDF_FILA_MAX',
+                                       'UPLOAD_MAX_BYTES', 'UPLOAD_CHUNK_BYTES',
+                                       'PREVIEW_WORKERS', 'PREVIEW_FILA_MAX',
+                                       'AUDIT_INTERVALO_MS', 'AUDIT_LOTE_MAX', 'AUDIT_FILA_MAX']:
                                 value = int(value)
+                            elif key in ['AUTOSAVE_DEBOUNCE_SEG', 'AUTOSAVE_ESPERA_MAX_SEG',
+                                         'STORAGE_VARREDURA_HORAS', 'STORAGE_CARENCIA_HORAS']:
+                                value = float(value)
                             elif key in ['USE_WINDOWS_AUTH', 'DEBUG', 'DEBUG_AUTH', 'DEBUG_ROUTES']:
                                 value = value.lower() in ['true', '1', 'yes']
                             elif key == 'AUTH_FIELD':
@@ -0,0 +1,381 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/db/migrations.py
+Migrações de esquema do banco Firebird - aplicadas na inicialização
+
+Cada migração tem um nome único e uma lista de comandos DDL/DML.
+Um comando também pode ser uma função (cursor) → lista de SQL, para DDL
+que depende do catálogo do banco (ex.: nomes de constraints existentes).
+As migrações já aplicadas ficam registradas em SCHEMA_MIGRACOES.
+
+Como cada comando tem commit próprio, uma migração interrompida no meio é
+reaplicada por inteiro na próxima inicialização: todo comando precisa poder
+rodar de novo. CREATE TABLE/INDEX/TRIGGER e ALTER TABLE ... ADD coluna já
+existentes no catálogo são pulados; DML e o restante são escritos para dar o
+mesmo resultado quando repetidos.
+"""
+
+import logging
+import re
+from typing import Callable, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+class MigracaoFalhou(RuntimeError):
+    """Migração pendente não aplicada - a API não deve subir com o esquema incompleto"""
+
+
+# DDL reconhecido pelo catálogo: regex → consulta que encontra o objeto já criado
+_DDL_CATALOGO = [
+    (re.compile(r'^\s*CREATE\s+(?:UNIQUE\s+)?(?:(?:ASC|ASCENDING|DESC|DESCENDING)\s+)?INDEX\s+(\w+)', re.I),
+     "SELECT 1 FROM RDB$INDICES WHERE RDB$INDEX_NAME = ?"),
+    (re.compile(r'^\s*CREATE\s+TABLE\s+(\w+)', re.I),
+     "SELECT 1 FROM RDB$RELATIONS WHERE RDB$RELATION_NAME = ?"),
+    (re.compile(r'^\s*CREATE\s+TRIGGER\s+(\w+)', re.I),
+     "SELECT 1 FROM RDB$TRIGGERS WHERE RDB$TRIGGER_NAME = ?"),
+    (re.compile(r'^\s*ALTER\s+TABLE\s+(\w+)\s+ADD\s+(?!CONSTRAINT\b)(\w+)', re.I),
+     "SELECT 1 FROM RDB$RELATION_FIELDS WHERE RDB$RELATION_NAME = ? AND RDB$FIELD_NAME = ?"),
+]
+
+
+def _objeto_existente(cursor, sql: str) -> Optional[str]:
+    """Nome do objeto que o DDL criaria, se ele já está no catálogo (None = executar)"""
+    for padrao, consulta in _DDL_CATALOGO:
+        encontrado = padrao.match(sql)
+        if encontrado:
+            nomes = [nome.upper() for nome in encontrado.groups()]
+            cursor.execute(consulta, nomes)
+            return '.'.join(nomes) if cursor.fetchone() is not None else None
+    return None
+
+
+def _recriar_fks_passagens_cascade(cursor) -> List[str]:
+    """
+    Gera DROP/ADD para toda FK que referencia PASSAGENS sem ON DELETE CASCADE
+    (lida do catálogo: cobre as tabelas porto_*, AUDITLOG e as que vierem depois)
+    DROP e ADD vão no mesmo ALTER TABLE: a FK nunca fica removida sem a nova
+    """
+    cursor.execute("""
+        SELECT rc.RDB$RELATION_NAME, rc.RDB$CONSTRAINT_NAME, seg.RDB$FIELD_NAME
+        FROM RDB$RELATION_CONSTRAINTS rc
+        JOIN RDB$REF_CONSTRAINTS ref ON ref.RDB$CONSTRAINT_NAME = rc.RDB$CONSTRAINT_NAME
+        JOIN RDB$RELATION_CONSTRAINTS pk ON pk.RDB$CONSTRAINT_NAME = ref.RDB$CONST_NAME_UQ
+        JOIN RDB$INDEX_SEGMENTS seg ON seg.RDB$INDEX_NAME = rc.RDB$INDEX_NAME
+        WHERE rc.RDB$CONSTRAINT_TYPE = 'FOREIGN KEY'
+          AND pk.RDB$RELATION_NAME = 'PASSAGENS'
+          AND ref.RDB$DELETE_RULE <> 'CASCADE'
+    """)
+    comandos = []
+    for tabela, constraint, coluna in cursor.fetchall():
+        tabela, constraint, coluna = tabela.strip(), constraint.strip(), coluna.strip()
+        comandos.append(
+            f"ALTER TABLE {tabela} DROP CONSTRAINT {constraint}, "
+            f"ADD CONSTRAINT {constraint} FOREIGN KEY ({coluna}) "
+            f"REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE"
+        )
+    return comandos
+
+
+def _criar_tabelas_secoes(cursor) -> List[str]:
+    """
+    CREATE TABLE das seções 4/6/7 geradas do registro de secao_service
+    (tabelas já existentes ficam como estão)
+    """
+    from app.services.secao_service import ddl_secoes
+
+    return [sql for tabela, sql in ddl_secoes() if not _tabela_existe(cursor, tabela)]
+
+
+Comando = Union[str, Callable[..., List[str]]]
+
+# Ordem importa: novas migrações sempre no final da lista
+MIGRACOES: List[Tuple[str, List[Comando]]] = [
+    ("001_idx_passagens_periodo_keyset", [
+        # Navegação da listagem de PS: ORDER BY PeriodoInicio DESC, PassagemId DESC
+        "CREATE DESCENDING INDEX IDX_PASSAGENS_INICIO_ID ON PASSAGENS (PeriodoInicio, PassagemId)",
+    ]),
+    ("002_idx_admin_passagens_filtros", [
+        # Listagem administrativa: filtros de igualdade + ordenação por período
+        "CREATE DESCENDING INDEX IDX_PASSAGENS_EMB_INICIO ON PASSAGENS (EmbarcacaoId, PeriodoInicio, PassagemId)",
+        "CREATE DESCENDING INDEX IDX_PASSAGENS_STATUS_INICIO ON PASSAGENS (Status, PeriodoInicio, PassagemId)",
+        "CREATE DESCENDING INDEX IDX_PASSAGENS_FIM_ID ON PASSAGENS (PeriodoFim, PassagemId)",
+    ]),
+    ("003_passagens_versao", [
+        # Versão da PS para ETag/If-None-Match - incrementada a cada escrita
+        "ALTER TABLE PASSAGENS ADD Versao INTEGER DEFAULT 0 NOT NULL",
+    ]),
+    ("004_porto_listas_flags", [
+        # Flag "não previsto" explícito por PS (substitui as linhas sentinela das listas 1.7–1.10)
+        """
+        CREATE TABLE PORTO_LISTAS_FLAGS (
+            PassagemId INTEGER NOT NULL PRIMARY KEY,
+            EquipesNaoPrevisto SMALLINT,
+            EmbMatNaoPrevisto SMALLINT,
+            DesembMatNaoPrevisto SMALLINT,
+            OSMobNaoPrevisto SMALLINT,
+            CONSTRAINT FK_PLF_PAS FOREIGN KEY (PassagemId) REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE
+        )
+        """,
+        # Sentinelas antigas: sem flag gravado, lista vazia já é lida como "não previsto"
+        "DELETE FROM porto_embarqueequipes WHERE NaoPrevisto = 1",
+        "DELETE FROM porto_embarquemateriais WHERE NaoPrevisto = 1",
+        "DELETE FROM porto_desembarquemateriais WHERE NaoPrevisto = 1",
+        "DELETE FROM porto_osmobilizacao WHERE NaoPrevisto = 1",
+    ]),
+    ("005_fk_passagens_on_delete_cascade", [
+        # Excluir a PS passa a ser um único DELETE em PASSAGENS
+        _recriar_fks_passagens_cascade,
+    ]),
+    ("006_anexos_blobs", [
+        # Conteúdo dos anexos gravado uma vez por hash (SHA-256) em STORAGE_DIR/blobs
+        """
+        CREATE TABLE ANEXOS_BLOBS (
+            Hash CHAR(64) NOT NULL PRIMARY KEY,
+            Tamanho BIGINT NOT NULL,
+            Refs INTEGER DEFAULT 0 NOT NULL,
+            CriadoEm TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IDX_ANEXOS_BLOBS_REFS ON ANEXOS_BLOBS (Refs)",
+        # Referência de cada PS ao blob (nome exibido/baixado pela PS)
+        """
+        CREATE TABLE ANEXOS_REFS (
+            AnexoId INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            PassagemId INTEGER NOT NULL,
+            Hash CHAR(64) NOT NULL,
+            Filename VARCHAR(300) NOT NULL,
+            NomeOriginal VARCHAR(255),
+            CriadoEm TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT UQ_AR_PS_FILENAME UNIQUE (PassagemId, Filename),
+            CONSTRAINT FK_AR_PAS FOREIGN KEY (PassagemId) REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE,
+            CONSTRAINT FK_AR_BLOB FOREIGN KEY (Hash) REFERENCES ANEXOS_BLOBS (Hash)
+        )
+        """,
+        # Contagem de referências mantida pelo banco (vale também para o DELETE em cascata da PS)
+        """
+        CREATE TRIGGER TRG_ANEXOS_REFS_AI FOR ANEXOS_REFS ACTIVE AFTER INSERT POSITION 0
+        AS
+        BEGIN
+            UPDATE ANEXOS_BLOBS SET Refs = Refs + 1 WHERE Hash = NEW.Hash;
+        END
+        """,
+        """
+        CREATE TRIGGER TRG_ANEXOS_REFS_AU FOR ANEXOS_REFS ACTIVE AFTER UPDATE POSITION 0
+        AS
+        BEGIN
+            IF (NEW.Hash <> OLD.Hash) THEN
+            BEGIN
+                UPDATE ANEXOS_BLOBS SET Refs = Refs - 1 WHERE Hash = OLD.Hash;
+                UPDATE ANEXOS_BLOBS SET Refs = Refs + 1 WHERE Hash = NEW.Hash;
+            END
+        END
+        """,
+        """
+        CREATE TRIGGER TRG_ANEXOS_REFS_AD FOR ANEXOS_REFS ACTIVE AFTER DELETE POSITION 0
+        AS
+        BEGIN
+            UPDATE ANEXOS_BLOBS SET Refs = Refs - 1 WHERE Hash = OLD.Hash;
+        END
+        """,
+    ]),
+    ("007_storage_index", [
+        # Índice dos arquivos em STORAGE_DIR (relatório de espaço e varredura de órfãos)
+        """
+        CREATE TABLE STORAGE_INDEX (
+            Caminho VARCHAR(400) NOT NULL PRIMARY KEY,
+            Tipo VARCHAR(10) NOT NULL,
+            Tamanho BIGINT NOT NULL,
+            Hash CHAR(64),
+            PassagemId INTEGER,
+            AtualizadoEm TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # Sem FK: a linha precisa sobreviver à exclusão da PS até o arquivo sair do disco
+        "CREATE INDEX IDX_STORAGE_INDEX_PS ON STORAGE_INDEX (PassagemId, Tipo)",
+        "CREATE INDEX IDX_STORAGE_INDEX_TIPO ON STORAGE_INDEX (Tipo)",
+    ]),
+    ("008_idx_auditlog_keyset", [
+        # Histórico da PS / do autor / geral: ORDER BY CriadoEm DESC, AuditLogId DESC
+        "CREATE DESCENDING INDEX IDX_AUDITLOG_PS_CRIADO ON AUDITLOG (PassagemId, CriadoEm, AuditLogId)",
+        "CREATE DESCENDING INDEX IDX_AUDITLOG_AUTOR_CRIADO ON AUDITLOG (AutorUser, CriadoEm, AuditLogId)",
+        "CREATE DESCENDING INDEX IDX_AUDITLOG_CRIADO ON AUDITLOG (CriadoEm, AuditLogId)",
+    ]),
+    ("009_busca_indice_invertido", [
+        # Um documento por seção da PS com texto (Termos = tamanho em termos, para o BM25)
+        """
+        CREATE TABLE BUSCA_DOCS (
+            PassagemId INTEGER NOT NULL,
+            Secao VARCHAR(40) NOT NULL,
+            Texto BLOB SUB_TYPE TEXT,
+            Termos INTEGER NOT NULL,
+            AtualizadoEm TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            CONSTRAINT PK_BUSCA_DOCS PRIMARY KEY (PassagemId, Secao),
+            CONSTRAINT FK_BD_PAS FOREIGN KEY (PassagemId) REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE
+        )
+        """,
+        # Listas de postagens: a PK começa pelo termo (IN e STARTING WITH usam o índice)
+        """
+        CREATE TABLE BUSCA_TERMOS (
+            Termo VARCHAR(40) NOT NULL,
+            PassagemId INTEGER NOT NULL,
+            Secao VARCHAR(40) NOT NULL,
+            Freq INTEGER NOT NULL,
+            CONSTRAINT PK_BUSCA_TERMOS PRIMARY KEY (Termo, PassagemId, Secao),
+            CONSTRAINT FK_BT_DOC FOREIGN KEY (PassagemId, Secao)
+                REFERENCES BUSCA_DOCS (PassagemId, Secao) ON DELETE CASCADE
+        )
+        """,
+    ]),
+    ("010_painel_agregados", [
+        # Contagem de PS por (embarcação, status, mês de início) em linhas de delta:
+        # triggers só inserem (+1/-1), sem disputar a mesma linha entre transações;
+        # painel_service.compactar consolida as linhas de tempos em tempos
+        """
+        CREATE TABLE PAINEL_AGREGADOS (
+            DeltaId BIGINT GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            EmbarcacaoId INTEGER NOT NULL,
+            Status VARCHAR(20) NOT NULL,
+            Mes INTEGER NOT NULL,
+            Delta INTEGER NOT NULL
+        )
+        """,
+        """
+        CREATE TRIGGER TRG_PASSAGENS_PAINEL_AI FOR PASSAGENS ACTIVE AFTER INSERT POSITION 10
+        AS
+        BEGIN
+            INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+            VALUES (COALESCE(NEW.EmbarcacaoId, 0), COALESCE(NEW.Status, ''),
+                    COALESCE(EXTRACT(YEAR FROM NEW.PeriodoInicio) * 100 + EXTRACT(MONTH FROM NEW.PeriodoInicio), 0),
+                    1);
+        END
+        """,
+        # Só mudança de embarcação/status/início gera delta (Versao, PdfPath etc. não)
+        """
+        CREATE TRIGGER TRG_PASSAGENS_PAINEL_AU FOR PASSAGENS ACTIVE AFTER UPDATE POSITION 10
+        AS
+        BEGIN
+            IF (NEW.EmbarcacaoId IS DISTINCT FROM OLD.EmbarcacaoId
+                OR NEW.Status IS DISTINCT FROM OLD.Status
+                OR NEW.PeriodoInicio IS DISTINCT FROM OLD.PeriodoInicio) THEN
+            BEGIN
+                INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+                VALUES (COALESCE(OLD.EmbarcacaoId, 0), COALESCE(OLD.Status, ''),
+                        COALESCE(EXTRACT(YEAR FROM OLD.PeriodoInicio) * 100 + EXTRACT(MONTH FROM OLD.PeriodoInicio), 0),
+                        -1);
+                INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+                VALUES (COALESCE(NEW.EmbarcacaoId, 0), COALESCE(NEW.Status, ''),
+                        COALESCE(EXTRACT(YEAR FROM NEW.PeriodoInicio) * 100 + EXTRACT(MONTH FROM NEW.PeriodoInicio), 0),
+                        1);
+            END
+        END
+        """,
+        """
+        CREATE TRIGGER TRG_PASSAGENS_PAINEL_AD FOR PASSAGENS ACTIVE AFTER DELETE POSITION 10
+        AS
+        BEGIN
+            INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+            VALUES (COALESCE(OLD.EmbarcacaoId, 0), COALESCE(OLD.Status, ''),
+                    COALESCE(EXTRACT(YEAR FROM OLD.PeriodoInicio) * 100 + EXTRACT(MONTH FROM OLD.PeriodoInicio), 0),
+                    -1);
+        END
+        """,
+        # Carga inicial com as PS existentes (refeita do zero se a migração for repetida)
+        "DELETE FROM PAINEL_AGREGADOS",
+        """
+        INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+        SELECT COALESCE(EmbarcacaoId, 0), COALESCE(Status, ''),
+               COALESCE(EXTRACT(YEAR FROM PeriodoInicio) * 100 + EXTRACT(MONTH FROM PeriodoInicio), 0),
+               COUNT(*)
+        FROM PASSAGENS
+        GROUP BY 1, 2, 3
+        """,
+    ]),
+    ("011_secoes_registro", [
+        # Flag "não ocorreu/nenhuma" das listas do registro de seções (uma linha por PS e seção)
+        """
+        CREATE TABLE SECOES_LISTAS_FLAGS (
+            PassagemId INTEGER NOT NULL,
+            Secao VARCHAR(40) NOT NULL,
+            NaoPrevisto SMALLINT DEFAULT 0,
+            CONSTRAINT PK_SECOES_LISTAS_FLAGS PRIMARY KEY (PassagemId, Secao),
+            CONSTRAINT FK_SLF_PAS FOREIGN KEY (PassagemId) REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE
+        )
+        """,
+        _criar_tabelas_secoes,
+    ]),
+]
+
+
+def _tabela_existe(cursor, tabela: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM RDB$RELATIONS WHERE RDB$RELATION_NAME = ?",
+        [tabela.upper()]
+    )
+    return cursor.fetchone() is not None
+
+
+def _migracoes_aplicadas(cursor) -> set:
+    cursor.execute("SELECT Nome FROM SCHEMA_MIGRACOES")
+    return {row[0].strip() for row in cursor.fetchall()}
+
+
+def aplicar_migracoes() -> bool:
+    """
+    Aplica migrações pendentes, uma por vez, com commit ao final de cada comando
+    (Firebird exige commit do DDL antes de usar o objeto criado)
+    """
+    from app.config.database import db
+
+    connection = None
+    try:
+        connection = db.get_connection()
+        cursor = connection.cursor()
+
+        if not _tabela_existe(cursor, "SCHEMA_MIGRACOES"):
+            cursor.execute("""
+                CREATE TABLE SCHEMA_MIGRACOES (
+                    Nome VARCHAR(80) NOT NULL PRIMARY KEY,
+                    AplicadaEm TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            connection.commit()
+            logger.info("Tabela SCHEMA_MIGRACOES criada")
+
+        aplicadas = _migracoes_aplicadas(cursor)
+
+        for nome, comandos in MIGRACOES:
+            if nome in aplicadas:
+                continue
+
+            logger.info(f"Aplicando migração {nome}...")
+            for comando in comandos:
+                for sql in (comando(cursor) if callable(comando) else [comando]):
+                    existente = _objeto_existente(cursor, sql)
+                    if existente:
+                        logger.info(f"  {existente} já existe - comando pulado")
+                        continue
+                    cursor.execute(sql)
+                    connection.commit()
+
+            cursor.execute("INSERT INTO SCHEMA_MIGRACOES (Nome) VALUES (?)", [nome])
+            connection.commit()
+            logger.info(f"Migração {nome} aplicada")
+
+        return True
+
+    except Exception as e:
+        if connection:
+            try:
+                connection.rollback()
+            except:
+                pass
+        logger.error(f"Erro ao aplicar migrações: {e}")
+        return False
+    finally:
+        if connection:
+            try:
+                connection.close()
+            except:
+                pass
@@ -17,12 +17,16 @@ from pathlib import Path
 
 from app.config.settings import settings
 from app.config.database import init_database
+from app.db.migrations import aplicar_migracoes, MigracaoFalhou
+from app.utils.limite_upload import LimiteUploadMiddleware
 
 # Importar TODAS as APIs com regras de negócio REFATORADAS
 from app.api.v1 import fiscais_api, passagens_api
 from app.api.v1.embarcacoes_api import router as embarcacoes_router
 from app.api.v1.administradores_api import router as administradores_router
 from app.api.v1.auth_api import router as auth_router  # NOVA ROTA DE AUTENTICAÇÃO
+from app.api.v1.admin_passagens_api import router as admin_passagens_router
+from app.api.v1.busca_api import router as busca_router
 
 # Configurar logging
 logging.basicConfig(
@@ -48,6 +52,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Limite de upload aplicado antes do parse do multipart (413 sem gravar o corpo)
+app.add_middleware(LimiteUploadMiddleware)
+
 # Configuração de caminhos
 BASE_DIR = Path(__file__).parent.parent.parent
 FRONTEND_DIR = BASE_DIR / "frontend"
@@ -73,6 +80,8 @@ app.include_router(fiscais_api.router, tags=["Fiscais"])
 app.include_router(embarcacoes_router, tags=["Embarcações"]) 
 app.include_router(passagens_api.router, tags=["Passagens"])
 app.include_router(administradores_router, tags=["Administradores"])
+app.include_router(admin_passagens_router, tags=["Admin Passagens"])
+app.include_router(busca_router, tags=["Busca"])
 
 # === ROTA DE DEBUG CONDICIONAL ===
 if settings.DEBUG:
@@ -178,6 +187,13 @@ async def startup_event():
         success = await init_database()
         if success:
             logger.info("✅ Banco de dados conectado com sucesso")
+
+            # Aplica migrações de esquema pendentes (índices, colunas, tabelas)
+            # Sem elas o código consulta colunas/tabelas inexistentes: não sobe
+            if aplicar_migracoes():
+                logger.info("✅ Migrações de esquema verificadas")
+            else:
+                raise MigracaoFalhou("Falha ao aplicar migrações de esquema")
         else:
             logger.error("❌ Falha ao conectar com banco de dados")
             
@@ -194,6 +210,29 @@ async def startup_event():
             logger.error("❌ Falha na inicialização da variável global USERNAME")
             logger.error("⚠️  Sistema funcionará sem USERNAME global")
             
+        # Auditoria gravada em lote (fila em memória + tarefa de fundo)
+        from app.services.audit_service import audit_service
+        audit_service.iniciar()
+        
+        # Fila de geração de PDF (workers + pool de processos)
+        from app.services.pdf_service import pdf_service
+        pdf_service.iniciar()
+        
+        # Fila de miniaturas de anexos de imagem
+        from app.services.preview_service import preview_service
+        preview_service.iniciar()
+        
+        # Varredura periódica de arquivos órfãos no storage
+        from app.services.storage_service import storage_service
+        storage_service.iniciar()
+        
+        # Índice de busca: reconstrução em segundo plano na primeira execução
+        from app.services.busca_service import busca_service
+        busca_service.iniciar()
+            
+    except MigracaoFalhou as e:
+        logger.error(f"❌ {e} - inicialização abortada")
+        raise
     except Exception as e:
         logger.error(f"Erro na inicialização: {e}")
     
@@ -204,6 +243,26 @@ async def shutdown_event():
     """Finalização da aplicação"""
     logger.info("Finalizando PSWEB Python API...")
 
+    # Autosave em memória não pode se perder
+    from app.services.autosave_service import autosave_service
+    await autosave_service.descarregar_todos()
+
+    # Eventos de auditoria ainda na fila também
+    from app.services.audit_service import audit_service
+    await audit_service.parar()
+
+    from app.services.pdf_service import pdf_service
+    await pdf_service.parar()
+
+    from app.services.preview_service import preview_service
+    await preview_service.parar()
+
+    from app.services.storage_service import storage_service
+    await storage_service.parar()
+
+    from app.services.busca_service import busca_service
+    await busca_service.parar()
+
 if __name__ == "__main__":
     import uvicorn
     
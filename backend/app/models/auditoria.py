@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelos para Auditoria (AuditLog)
+Histórico de eventos das Passagens de Serviço
+"""
+
+from pydantic import BaseModel
+from typing import Optional
+
+class AuditoriaEvento(BaseModel):
+    """Evento de auditoria como devolvido pelas consultas"""
+    AuditLogId: int
+    PassagemId: Optional[int] = None
+    Evento: str
+    Descricao: Optional[str] = None
+    AutorUser: Optional[str] = None
+    AutorNome: Optional[str] = None
+    Detalhe: Optional[str] = None
+    CriadoEm: Optional[str] = None
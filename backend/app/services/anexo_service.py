@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/anexo_service.py
+Service Layer para anexos das Passagens de Serviço (RADE, fotos, documentos)
+
+Armazenamento endereçado por conteúdo: cada arquivo é gravado uma única vez
+em STORAGE_DIR/blobs/{hash[:2]}/{hash} (SHA-256) e cada PS guarda apenas uma
+referência em ANEXOS_REFS. ANEXOS_BLOBS.Refs é mantido por triggers
+(inclusive nas exclusões em cascata da PS); blobs sem referência são
+removidos por coletar_orfaos().
+
+O upload é gravado em blocos de UPLOAD_CHUNK_BYTES num temporário (I/O
+assíncrono via aiofiles), com o hash calculado durante a gravação, e só
+então movido de forma atômica para o caminho do blob.
+"""
+
+from pathlib import Path
+from stat import S_ISREG
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import logging
+import time
+
+import aiofiles
+import aiofiles.os
+
+from app.config.database import db
+from app.config.settings import settings
+from app.services.passagem_service import passagem_service
+from app.services.storage_service import storage_service, TIPO_BLOB
+
+logger = logging.getLogger(__name__)
+
+# Sufixo do arquivo em gravação - nunca é servido nem listado como anexo
+SUFIXO_TEMPORARIO = ".part"
+
+CARACTERES_INVALIDOS = '/\\:*?"<>|'
+
+# Derivados de imagem (lado maior em pixels) - gerados pelo preview_service
+TAMANHOS_PREVIEW = {"thumb": 256, "preview": 1280}
+
+
+def caminho_derivado(original: Path, tamanho: str) -> Path:
+    """Miniatura/prévia ao lado do original (nome oculto: nunca resolvido como anexo)"""
+    return original.parent / f".{original.name}.{tamanho}.jpg"
+
+
+class AnexoMuitoGrande(ValueError):
+    """Upload excede UPLOAD_MAX_BYTES"""
+
+
+class AnexoService:
+    """Service para gravação de anexos no storage"""
+
+    def __init__(self):
+        # Serializa a gravação do blob com a coleta de órfãos: um lock por faixa de
+        # hash (2 primeiros hex → no máximo 256, mesma divisão dos diretórios de blobs)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, sha256: str) -> asyncio.Lock:
+        faixa = sha256[:2]
+        if faixa not in self._locks:
+            self._locks[faixa] = asyncio.Lock()
+        return self._locks[faixa]
+
+    def nome_seguro(self, filename: str) -> str:
+        """Troca caracteres inválidos em nomes de arquivo por '_'"""
+        nome = filename or "anexo"
+        for caractere in CARACTERES_INVALIDOS:
+            nome = nome.replace(caractere, "_")
+        return nome
+
+    def excede_limite(self, tamanho) -> bool:
+        """Tamanho declarado (Content-Length / UploadFile.size) já acima do limite"""
+        return tamanho is not None and int(tamanho) > settings.UPLOAD_MAX_BYTES
+
+    def diretorio_blobs(self) -> Path:
+        return Path(settings.STORAGE_DIR) / "blobs"
+
+    def caminho_blob(self, sha256: str) -> Path:
+        """Caminho do conteúdo no storage (dois níveis para não lotar um diretório)"""
+        return self.diretorio_blobs() / sha256[:2] / sha256
+
+    async def salvar_upload(self, passagem_id: int, file) -> Dict[str, Any]:
+        """
+        Grava o UploadFile em blocos e registra a referência da PS ao blob
+        (conteúdo já existente no storage não é gravado de novo)
+
+        Returns:
+            {"path", "filename", "size", "sha256"}
+
+        Raises:
+            AnexoMuitoGrande: arquivo passou de UPLOAD_MAX_BYTES (nada fica gravado)
+        """
+        diretorio_tmp = self.diretorio_blobs() / "tmp"
+        await aiofiles.os.makedirs(diretorio_tmp, exist_ok=True)
+        temporario = diretorio_tmp / f"{passagem_id}_{time.monotonic_ns()}{SUFIXO_TEMPORARIO}"
+
+        sha256 = hashlib.sha256()
+        tamanho = 0
+        try:
+            async with aiofiles.open(temporario, "wb") as f:
+                while True:
+                    bloco = await file.read(settings.UPLOAD_CHUNK_BYTES)
+                    if not bloco:
+                        break
+                    tamanho += len(bloco)
+                    if tamanho > settings.UPLOAD_MAX_BYTES:
+                        raise AnexoMuitoGrande(
+                            f"Arquivo excede o limite de {settings.UPLOAD_MAX_BYTES // (1024 * 1024)} MB"
+                        )
+                    sha256.update(bloco)
+                    await f.write(bloco)
+
+            return await self._registrar(
+                passagem_id, sha256.hexdigest(), tamanho, file.filename, temporario
+            )
+        finally:
+            await self._remover(temporario)
+
+    async def registrar_existente(self, passagem_id: int, sha256: str,
+                                  filename: str) -> Optional[Dict[str, Any]]:
+        """
+        Referencia na PS um conteúdo que o servidor já tem - o cliente pula o upload
+
+        Returns:
+            mesmo formato de salvar_upload, ou None se o hash não está no storage
+        """
+        rows = await db.execute_query(
+            "SELECT Tamanho FROM ANEXOS_BLOBS WHERE Hash = ?", [sha256]
+        )
+        if not rows:
+            return None
+        return await self._registrar(passagem_id, sha256, rows[0][0], filename, None)
+
+    async def _registrar(self, passagem_id: int, sha256: str, tamanho: int,
+                         nome_original: str, temporario: Optional[Path]) -> Optional[Dict[str, Any]]:
+        """Garante o blob no disco e grava blob + referência numa transação"""
+        blob = self.caminho_blob(sha256)
+        # Timestamp evita conflito entre anexos com o mesmo nome na PS
+        filename = f"{int(time.time())}_{self.nome_seguro(nome_original)}"
+
+        async with self._lock(sha256):
+            if not await aiofiles.os.path.exists(blob):
+                if temporario is None:
+                    # Linha sem arquivo (storage restaurado/limpo): cliente precisa enviar
+                    return None
+                await aiofiles.os.makedirs(blob.parent, exist_ok=True)
+                await aiofiles.os.replace(temporario, blob)
+
+            async with db.transaction() as cursor:
+                cursor.execute(
+                    "UPDATE OR INSERT INTO ANEXOS_BLOBS (Hash, Tamanho) VALUES (?, ?) MATCHING (Hash)",
+                    [sha256, tamanho]
+                )
+                # Refs é ajustado pelos triggers de ANEXOS_REFS
+                cursor.execute(
+                    "UPDATE OR INSERT INTO ANEXOS_REFS (PassagemId, Hash, Filename, NomeOriginal) "
+                    "VALUES (?, ?, ?, ?) MATCHING (PassagemId, Filename)",
+                    [passagem_id, sha256, filename, nome_original]
+                )
+                storage_service.registrar_tx(cursor, blob, tamanho, TIPO_BLOB, sha256=sha256)
+
+        return {
+            "path": blob,
+            "filename": filename,
+            "size": tamanho,
+            "sha256": sha256
+        }
+
+    async def localizar(self, passagem_id: int, nome: str) -> Optional[Dict[str, Any]]:
+        """
+        Resolve o anexo da PS para download. Aceita o nome da referência
+        (filename do upload), o hash (fim do `path` dos blobs) ou o nome de um
+        arquivo legado em STORAGE_DIR/PS/{id}
+
+        Returns:
+            {"caminho", "tamanho", "etag", "nome"} ou None
+        """
+        if not nome or nome != Path(nome).name or nome.startswith(".") or nome.endswith(SUFIXO_TEMPORARIO):
+            return None
+
+        rows = await db.execute_query(
+            "SELECT FIRST 1 r.Hash, r.NomeOriginal, b.Tamanho FROM ANEXOS_REFS r "
+            "JOIN ANEXOS_BLOBS b ON b.Hash = r.Hash "
+            "WHERE r.PassagemId = ? AND (r.Filename = ? OR r.Hash = ?)",
+            [passagem_id, nome, nome]
+        )
+        if rows:
+            sha256, nome_original, tamanho = rows[0]
+            sha256 = sha256.strip()
+            caminho = self.caminho_blob(sha256)
+            if not await aiofiles.os.path.isfile(caminho):
+                return None
+            return {
+                "caminho": caminho,
+                "tamanho": tamanho,
+                "etag": f'"{sha256}"',
+                "nome": nome_original or nome
+            }
+
+        # Uploads anteriores ao storage por hash
+        caminho = passagem_service.diretorio_anexos(passagem_id) / nome
+        try:
+            info = await aiofiles.os.stat(caminho)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        if not S_ISREG(info.st_mode):
+            return None
+        return {
+            "caminho": caminho,
+            "tamanho": info.st_size,
+            "etag": f'"{info.st_size:x}-{info.st_mtime_ns:x}"',
+            "nome": nome
+        }
+
+    async def coletar_orfaos(self) -> List[str]:
+        """
+        Remove blobs sem referência (linha e arquivo) - agendado como BackgroundTask
+        depois de excluir PS; a linha sai antes do arquivo, sob o lock do hash
+
+        Returns:
+            hashes removidos
+        """
+        removidos = []
+        try:
+            rows = await db.execute_query("SELECT Hash FROM ANEXOS_BLOBS WHERE Refs <= 0")
+            for (sha256,) in rows:
+                sha256 = sha256.strip()
+                async with self._lock(sha256):
+                    blob = self.caminho_blob(sha256)
+                    arquivos = [blob] + [caminho_derivado(blob, tamanho) for tamanho in TAMANHOS_PREVIEW]
+                    async with db.transaction() as cursor:
+                        cursor.execute(
+                            "DELETE FROM ANEXOS_BLOBS WHERE Hash = ? AND Refs <= 0", [sha256]
+                        )
+                        removido = cursor.rowcount > 0
+                        if removido:
+                            storage_service.remover_tx(cursor, arquivos)
+                    if removido:
+                        for arquivo in arquivos:
+                            await self._remover(arquivo)
+                        removidos.append(sha256)
+
+            if removidos:
+                logger.info(f"{len(removidos)} blob(s) de anexo sem referência removido(s)")
+        except Exception as e:
+            logger.error(f"Erro na coleta de anexos órfãos: {e}")
+        return removidos
+
+    async def _remover(self, caminho: Path):
+        try:
+            await aiofiles.os.remove(caminho)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao remover arquivo {caminho}: {e}")
+
+# Instância global do serviço
+anexo_service = AnexoService()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/audit_service.py
+Service Layer para gravação da auditoria (AuditLog) fora do caminho do request
+
+O request só coloca o evento numa fila em memória; uma tarefa de fundo grava
+em lote (executemany, um commit) a cada AUDIT_INTERVALO_MS ou AUDIT_LOTE_MAX
+eventos. CriadoEm é preenchido na hora do evento, não na hora do lote.
+No shutdown a fila é descarregada antes de fechar.
+"""
+
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+import asyncio
+import logging
+
+from app.config.database import db
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+CAMPOS_CONSULTA = ['AuditLogId', 'PassagemId', 'Evento', 'Descricao',
+                   'AutorUser', 'AutorNome', 'Detalhe', 'CriadoEm']
+
+SQL_INSERT_AUDIT = (
+    "INSERT INTO AuditLog (PassagemId, Evento, Descricao, AutorUser, AutorNome, Detalhe, CriadoEm) "
+    "VALUES (?,?,?,?,?,?,?)"
+)
+
+
+class AuditService:
+    """Fila de eventos de auditoria com gravação em lote"""
+
+    def __init__(self):
+        self._fila: Optional[asyncio.Queue] = None
+        self._escritor: Optional[asyncio.Task] = None
+
+    def iniciar(self):
+        """Cria fila e tarefa de gravação - chamado no startup da aplicação"""
+        if self._fila is not None:
+            return
+        self._fila = asyncio.Queue(maxsize=settings.AUDIT_FILA_MAX)
+        self._escritor = asyncio.create_task(self._gravar_continuamente())
+        logger.info(f"Auditoria em lote iniciada: até {settings.AUDIT_LOTE_MAX} eventos "
+                    f"a cada {settings.AUDIT_INTERVALO_MS} ms")
+
+    async def parar(self):
+        """Shutdown: a tarefa grava o que já está na fila e termina; o resto é gravado aqui"""
+        if self._fila is None:
+            return
+        if self._escritor:
+            await self._fila.put(None)
+            await asyncio.gather(self._escritor, return_exceptions=True)
+            self._escritor = None
+
+        pendentes = []
+        while not self._fila.empty():
+            linha = self._fila.get_nowait()
+            if linha is not None:
+                pendentes.append(linha)
+        self._fila = None
+        if pendentes:
+            await self._gravar(pendentes)
+        logger.info("Auditoria em lote encerrada (fila descarregada)")
+
+    async def registrar(self, passagem_id: int, evento: str, descricao: str,
+                        autor_user: str, autor_nome: str, detalhe: Optional[str] = None):
+        """Enfileira o evento (fila cheia → espera vaga; fila parada → grava direto)"""
+        linha = (passagem_id, evento, descricao, autor_user, autor_nome, detalhe, datetime.now())
+        if self._fila is None:
+            await self._gravar([linha])
+            return
+        try:
+            self._fila.put_nowait(linha)
+        except asyncio.QueueFull:
+            await self._fila.put(linha)
+
+    async def _gravar_continuamente(self):
+        intervalo = settings.AUDIT_INTERVALO_MS / 1000
+        loop = asyncio.get_running_loop()
+        encerrar = False
+        while not encerrar:
+            linha = await self._fila.get()
+            if linha is None:
+                break
+            lote = [linha]
+            # Junta o que chegar até o prazo do lote ou o tamanho máximo
+            prazo = loop.time() + intervalo
+            while len(lote) < settings.AUDIT_LOTE_MAX:
+                restante = prazo - loop.time()
+                if restante <= 0:
+                    break
+                try:
+                    linha = await asyncio.wait_for(self._fila.get(), restante)
+                except asyncio.TimeoutError:
+                    break
+                if linha is None:
+                    # parar(): grava o lote atual e termina
+                    encerrar = True
+                    break
+                lote.append(linha)
+            await self._gravar(lote)
+
+    async def _gravar(self, lote: List[tuple]):
+        """Um executemany e um commit; se o lote falhar, grava linha a linha (descarta só as inválidas)"""
+        try:
+            async with db.transaction() as cursor:
+                cursor.executemany(SQL_INSERT_AUDIT, lote)
+            return
+        except Exception as e:
+            logger.error(f"Erro ao gravar lote de auditoria ({len(lote)} eventos), gravando um a um: {e}")
+
+        for linha in lote:
+            try:
+                await db.execute_query(SQL_INSERT_AUDIT, list(linha))
+            except Exception as e:
+                # Ex.: PS excluída antes do lote (FK) - não há mais onde registrar
+                logger.error(f"Evento de auditoria descartado {linha[:3]}: {e}")
+
+    async def consultar(self, limite: int, cursor: Optional[List[Any]] = None,
+                        passagem_id: Optional[int] = None, eventos: Optional[List[str]] = None,
+                        autor: Optional[str] = None, desde: Optional[datetime] = None,
+                        ate: Optional[datetime] = None) -> Tuple[List[dict], Optional[List[Any]]]:
+        """
+        Histórico mais recente primeiro, paginado por keyset (CriadoEm, AuditLogId)
+        Igualdade em PassagemId/AutorUser + faixa em CriadoEm usam os índices da migração 008
+
+        Returns:
+            (eventos da página, valores do cursor da próxima página ou None)
+        """
+        where = " WHERE 1=1"
+        params: List[Any] = []
+
+        if passagem_id is not None:
+            where += " AND PassagemId = ?"
+            params.append(passagem_id)
+        if autor:
+            where += " AND AutorUser = ?"
+            params.append(autor)
+        if eventos:
+            where += f" AND Evento IN ({', '.join('?' * len(eventos))})"
+            params.extend(eventos)
+        if desde:
+            where += " AND CriadoEm >= ?"
+            params.append(desde)
+        if ate:
+            where += " AND CriadoEm < ?"
+            params.append(ate)
+        if cursor:
+            where += " AND (CriadoEm < ? OR (CriadoEm = ? AND AuditLogId < ?))"
+            params.extend([cursor[0], cursor[0], cursor[1]])
+
+        rows = await db.execute_query(
+            f"SELECT FIRST {limite + 1} {', '.join(CAMPOS_CONSULTA)} FROM AuditLog{where} "
+            "ORDER BY CriadoEm DESC, AuditLogId DESC",
+            params
+        )
+
+        proximo = None
+        if len(rows) > limite:
+            rows = rows[:limite]
+            proximo = [rows[-1][7], rows[-1][0]]
+
+        eventos_pagina = []
+        for row in rows:
+            evento = dict(zip(CAMPOS_CONSULTA, row))
+            evento['CriadoEm'] = evento['CriadoEm'].isoformat() if evento['CriadoEm'] else None
+            eventos_pagina.append(evento)
+        return eventos_pagina, proximo
+
+# Instância global do serviço
+audit_service = AuditService()
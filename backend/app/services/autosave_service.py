@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/autosave_service.py
+Service Layer para autosave do Porto (seções 1.1 a 1.6) - write-behind por PS
+
+Edições pequenas e frequentes entram num buffer em memória por PS; o buffer
+é gravado numa única transação quando o fiscal para de digitar
+(AUTOSAVE_DEBOUNCE_SEG), ou no máximo após AUTOSAVE_ESPERA_MAX_SEG.
+Salvamento explícito, leitura, finalização e shutdown descarregam antes.
+"""
+
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Tuple
+import asyncio
+import logging
+import time
+
+from app.config.database import db
+from app.config.settings import settings
+from app.services.porto_service import porto_service, SECOES_PORTO
+from app.services.passagem_service import passagem_service
+from app.services.busca_service import busca_service
+
+logger = logging.getLogger(__name__)
+
+
+class AutosaveService:
+    """Buffer write-behind das seções singulares do Porto"""
+
+    def __init__(self):
+        # PassagemId → {"dados": {secao: {campo: valor}}, "autor", "fiscal_id", "desde", "timer"}
+        self._buffers: Dict[int, Dict[str, Any]] = {}
+        # PassagemId → (lock, quantos o usam ou aguardam) - sai do dicionário ao zerar
+        self._locks: Dict[int, Tuple[asyncio.Lock, int]] = {}
+
+    @asynccontextmanager
+    async def _travado(self, passagem_id: int):
+        """Lock por PS; a entrada é removida quando ninguém mais o segura nem espera"""
+        lock, usos = self._locks.get(passagem_id, (None, 0))
+        if lock is None:
+            lock = asyncio.Lock()
+        self._locks[passagem_id] = (lock, usos + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, usos = self._locks[passagem_id]
+            if usos <= 1:
+                del self._locks[passagem_id]
+            else:
+                self._locks[passagem_id] = (lock, usos - 1)
+
+    def pendentes(self, passagem_id: int) -> int:
+        """Quantidade de campos aguardando gravação"""
+        buffer = self._buffers.get(passagem_id)
+        return sum(len(c) for c in buffer["dados"].values()) if buffer else 0
+
+    async def acumular(self, passagem_id: int, porto_data: Dict[str, Dict[str, Any]], autor: str,
+                       fiscal_id: int) -> int:
+        """
+        Junta as alterações ao buffer da PS (última escrita do campo vence)
+        e reinicia a janela de debounce
+
+        Returns:
+            campos pendentes após a junção
+
+        Raises:
+            ValueError: seção desconhecida ou malformada
+        """
+        for chave, dados in porto_data.items():
+            if chave not in SECOES_PORTO:
+                raise ValueError(f"Seções desconhecidas: {chave}")
+            if not isinstance(dados, dict):
+                raise ValueError(f"Seção '{chave}' deve ser um objeto")
+
+        buffer = self._buffers.setdefault(
+            passagem_id, {"dados": {}, "autor": autor, "fiscal_id": fiscal_id, "desde": time.monotonic(), "timer": None}
+        )
+        for chave, dados in porto_data.items():
+            buffer["dados"].setdefault(chave, {}).update(dados)
+        buffer["autor"] = autor
+        buffer["fiscal_id"] = fiscal_id
+
+        if buffer["timer"]:
+            buffer["timer"].cancel()
+        restante = settings.AUTOSAVE_ESPERA_MAX_SEG - (time.monotonic() - buffer["desde"])
+        atraso = max(min(settings.AUTOSAVE_DEBOUNCE_SEG, restante), 0)
+        buffer["timer"] = asyncio.create_task(self._descarregar_apos(passagem_id, atraso))
+
+        return self.pendentes(passagem_id)
+
+    async def _descarregar_apos(self, passagem_id: int, atraso: float):
+        try:
+            await asyncio.sleep(atraso)
+            await self.descarregar(passagem_id, agendado=True)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            # Buffer já foi devolvido por descarregar(); próxima edição ou shutdown tenta de novo
+            logger.error(f"Erro no autosave da PS {passagem_id}: {e}")
+
+    async def descarregar(self, passagem_id: int, agendado: bool = False) -> Dict[str, Any]:
+        """
+        Grava o buffer da PS numa única transação (sem buffer não faz nada)
+
+        Returns:
+            {chave_secao: [campos gravados]}
+        """
+        async with self._travado(passagem_id):
+            buffer = self._buffers.pop(passagem_id, None)
+            if not buffer:
+                return {}
+            if buffer["timer"] and not agendado:
+                buffer["timer"].cancel()
+
+            try:
+                alterados = {}
+                async with db.transaction() as cursor:
+                    # A guarda vale na gravação, não só quando o campo foi recebido
+                    travada = passagem_service.travar_edicao_tx(
+                        cursor, passagem_id, buffer["fiscal_id"], incrementar=False
+                    )
+                    if travada:
+                        alterados = porto_service.salvar_secoes_parcial(cursor, passagem_id, buffer["dados"])
+                    if alterados:
+                        passagem_service.incrementar_versao_tx(cursor, passagem_id)
+                        busca_service.indexar_tx(cursor, passagem_id, busca_service.secoes_afetadas(alterados))
+                        cursor.execute(
+                            "INSERT INTO AuditLog (PassagemId, Evento, Descricao, AutorUser, AutorNome, Detalhe) "
+                            "VALUES (?,?,?,?,?,?)",
+                            [passagem_id, 'PORTO_AUTOSAVE', 'Autosave Seção Porto (1.1–1.6)',
+                             buffer["autor"], buffer["autor"],
+                             ', '.join(f"{k}: {', '.join(v)}" for k, v in alterados.items())]
+                        )
+            except Exception:
+                self._devolver(passagem_id, buffer)
+                raise
+
+            if not travada:
+                # PS finalizada/excluída ou janela encerrada: não há para onde gravar
+                logger.warning(f"Autosave da PS {passagem_id} descartado: PS não está mais editável")
+            return alterados
+
+    def _devolver(self, passagem_id: int, buffer: Dict[str, Any]):
+        """Falha na gravação: devolve o buffer sem sobrescrever edições mais novas"""
+        buffer["timer"] = None
+        atual = self._buffers.get(passagem_id)
+        if atual:
+            for chave, dados in buffer["dados"].items():
+                atual["dados"][chave] = {**dados, **atual["dados"].get(chave, {})}
+            atual["desde"] = min(atual["desde"], buffer["desde"])
+        else:
+            self._buffers[passagem_id] = buffer
+
+    def descartar(self, passagem_id: int):
+        """PS excluída ou travada: alterações pendentes não têm mais onde ser gravadas"""
+        buffer = self._buffers.pop(passagem_id, None)
+        if buffer and buffer["timer"]:
+            buffer["timer"].cancel()
+
+    async def descarregar_todos(self):
+        """Shutdown: grava todos os buffers pendentes"""
+        for passagem_id in list(self._buffers):
+            try:
+                await self.descarregar(passagem_id)
+            except Exception as e:
+                logger.error(f"Autosave da PS {passagem_id} perdido no shutdown: {e}")
+
+# Instância global do serviço
+autosave_service = AutosaveService()
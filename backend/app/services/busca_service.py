@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/busca_service.py
+Service Layer para a busca textual nas PS (índice invertido no banco)
+
+Cada seção do Porto (e das seções 4/6/7 do registro) com texto vira um documento em BUSCA_DOCS (PassagemId,
+Secao) e cada termo, uma linha em BUSCA_TERMOS (Termo, PassagemId, Secao,
+Freq). O índice é atualizado na mesma transação do salvamento da seção e só
+para as seções cujos campos de texto mudaram; a diferença de termos é
+aplicada (sai o que sumiu, entra o que apareceu).
+
+A busca lê as listas de postagens dos termos pela chave primária (Termo ...),
+calcula BM25 por seção, soma por PS e devolve trechos com os termos
+destacados. O último termo da consulta vale como prefixo (busca enquanto digita).
+"""
+
+from collections import Counter, defaultdict
+from html import escape
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import math
+import re
+import unicodedata
+
+from app.config.database import db
+from app.services.porto_service import SECOES_PORTO, LISTAS_PORTO
+from app.services.pdf_service import TITULOS_SECOES
+from app.services.secao_service import SECOES, COLUNA_ITEM, campos_texto
+
+logger = logging.getLogger(__name__)
+
+# Campos de texto livre indexados (os demais são flags, números e caminhos)
+CAMPOS_TEXTO = ('Porto', 'Terminal', 'Descricao', 'Observacoes', 'Auditor',
+                'Gerencia', 'Empresa', 'Nome', 'Origem', 'Destino')
+
+# Seção → (tabela, campos de texto, coluna de ordenação das linhas da lista)
+SECOES_BUSCA = {
+    **{chave: (s['tabela'], [c for c in s['campos'] if c in CAMPOS_TEXTO], None)
+       for chave, s in SECOES_PORTO.items()},
+    **{chave: (l['tabela'], [c for c in l['campos'] if c in CAMPOS_TEXTO], l['id'])
+       for chave, l in LISTAS_PORTO.items()},
+    # Registro de seções: só os campos de texto livre (senhas e contatos ficam fora)
+    **{chave: (s['tabela'], campos_texto(chave), COLUNA_ITEM if s['lista'] else None)
+       for chave, s in SECOES.items() if campos_texto(chave)},
+}
+
+TERMO_MIN = 2
+TERMO_MAX = 40          # tamanho da coluna BUSCA_TERMOS.Termo
+PREFIXO_MIN = 3         # último termo como prefixo só a partir daqui
+TERMOS_CONSULTA_MAX = 8
+POSTAGENS_MAX = 20000   # por termo: termo muito comum tem a leitura cortada (maiores Freq primeiro)
+CANDIDATAS_FILTRO_MAX = 1000  # até aqui, termos comuns são lidos só nas PS candidatas
+
+# BM25
+K1 = 1.2
+B = 0.75
+
+JANELA_TRECHO = 80
+
+PALAVRAS_VAZIAS = {
+    'a', 'o', 'as', 'os', 'de', 'da', 'do', 'das', 'dos', 'e', 'em', 'no', 'na',
+    'nos', 'nas', 'um', 'uma', 'por', 'para', 'com', 'sem', 'que', 'se', 'ao',
+    'aos', 'ou', 'foi', 'ser', 'sua', 'seu',
+}
+
+PADRAO_TERMO = re.compile(r'[0-9a-z]+')
+
+
+def normalizar(texto: str) -> str:
+    """
+    Minúsculas e sem acento, caractere a caractere (mesmo tamanho do original,
+    para as posições dos termos valerem no texto original ao destacar)
+    """
+    return ''.join(
+        (unicodedata.normalize('NFKD', c)[:1] or c).lower()[:1] for c in texto
+    )
+
+
+def tokenizar(texto: str) -> List[Tuple[str, int, int]]:
+    """Termos do texto com posição no original: [(termo, inicio, fim)]"""
+    return [
+        (m.group()[:TERMO_MAX], m.start(), m.end())
+        for m in PADRAO_TERMO.finditer(normalizar(texto or ''))
+        if len(m.group()) >= TERMO_MIN and m.group() not in PALAVRAS_VAZIAS
+    ]
+
+
+def _marcadores(quantidade: int) -> str:
+    return ", ".join("?" * quantidade)
+
+
+class BuscaService:
+    """Índice invertido das seções do Porto e busca ranqueada"""
+
+    def __init__(self):
+        self._reconstrucao: Optional[asyncio.Task] = None
+
+    # === ATUALIZAÇÃO INCREMENTAL ===
+    def secoes_afetadas(self, alterados: Dict[str, List[str]]) -> List[str]:
+        """
+        Seções em que algum campo de texto mudou ({secao: [campos]} de salvar_secoes_parcial
+        ou secao_service.salvar_grupo - lista alterada vem como ['linhas'])
+        """
+        return [
+            chave for chave, campos in alterados.items()
+            if chave in SECOES_BUSCA
+            and ('linhas' in (campos or []) or set(campos or []) & set(SECOES_BUSCA[chave][1]))
+        ]
+
+    def indexar_tx(self, cursor, passagem_id: int, secoes: List[str]):
+        """
+        Reindexa as seções da PS lendo o texto já gravado no mesmo cursor/transação
+        (índice e dados confirmados juntos ou nenhum)
+        """
+        for chave in secoes:
+            tabela, campos, ordem = SECOES_BUSCA[chave]
+            if not campos:
+                continue
+
+            cursor.execute(
+                f"SELECT {', '.join(campos)} FROM {tabela} WHERE PassagemId = ?"
+                + (f" ORDER BY {ordem}" if ordem else ""),
+                [passagem_id]
+            )
+            texto = "\n".join(
+                " · ".join(str(v) for v in row if v not in (None, ''))
+                for row in cursor.fetchall()
+            ).strip()
+            self._aplicar_diferenca(cursor, passagem_id, chave, texto)
+
+    def _aplicar_diferenca(self, cursor, passagem_id: int, secao: str, texto: str):
+        termos = tokenizar(texto)
+        novos = Counter(termo for termo, _, _ in termos)
+
+        cursor.execute(
+            "SELECT Termo, Freq FROM BUSCA_TERMOS WHERE PassagemId = ? AND Secao = ?",
+            [passagem_id, secao]
+        )
+        atuais = {row[0].strip(): row[1] for row in cursor.fetchall()}
+
+        if not novos:
+            # Texto apagado: o documento sai do índice (postagens vão junto, FK em cascata)
+            cursor.execute(
+                "DELETE FROM BUSCA_DOCS WHERE PassagemId = ? AND Secao = ?",
+                [passagem_id, secao]
+            )
+            return
+
+        cursor.execute(
+            "UPDATE OR INSERT INTO BUSCA_DOCS (PassagemId, Secao, Texto, Termos, AtualizadoEm) "
+            "VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP) MATCHING (PassagemId, Secao)",
+            [passagem_id, secao, texto, len(termos)]
+        )
+
+        sairam = [t for t in atuais if t not in novos]
+        if sairam:
+            cursor.execute(
+                f"DELETE FROM BUSCA_TERMOS WHERE PassagemId = ? AND Secao = ? "
+                f"AND Termo IN ({_marcadores(len(sairam))})",
+                [passagem_id, secao] + sairam
+            )
+
+        mudaram = [(f, t, passagem_id, secao) for t, f in novos.items() if t in atuais and atuais[t] != f]
+        if mudaram:
+            cursor.executemany(
+                "UPDATE BUSCA_TERMOS SET Freq = ? WHERE Termo = ? AND PassagemId = ? AND Secao = ?",
+                mudaram
+            )
+
+        entraram = [(t, passagem_id, secao, f) for t, f in novos.items() if t not in atuais]
+        if entraram:
+            cursor.executemany(
+                "INSERT INTO BUSCA_TERMOS (Termo, PassagemId, Secao, Freq) VALUES (?, ?, ?, ?)",
+                entraram
+            )
+
+    # === RECONSTRUÇÃO ===
+    def iniciar(self):
+        """Startup: índice vazio com PS existentes (primeira execução) → reconstrói em segundo plano"""
+        if self._reconstrucao is None:
+            self._reconstrucao = asyncio.create_task(self._reconstruir_se_vazio())
+
+    async def parar(self):
+        if self._reconstrucao and not self._reconstrucao.done():
+            self._reconstrucao.cancel()
+            await asyncio.gather(self._reconstrucao, return_exceptions=True)
+        self._reconstrucao = None
+
+    async def _reconstruir_se_vazio(self):
+        try:
+            docs = await db.execute_query("SELECT FIRST 1 1 FROM BUSCA_DOCS")
+            if docs:
+                return
+            await self.reconstruir()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao verificar/reconstruir índice de busca: {e}")
+
+    async def reconstruir(self) -> int:
+        """
+        Reindexa todas as PS, uma transação por PS (não segura lock longo)
+
+        Returns:
+            quantidade de PS indexadas
+        """
+        rows = await db.execute_query("SELECT PassagemId FROM PASSAGENS ORDER BY PassagemId")
+        indexadas = 0
+        for (passagem_id,) in rows:
+            try:
+                async with db.transaction() as cursor:
+                    self.indexar_tx(cursor, passagem_id, list(SECOES_BUSCA))
+                indexadas += 1
+            except Exception as e:
+                # Ex.: PS salva ao mesmo tempo (conflito de atualização) - o salvamento já reindexou
+                logger.warning(f"PS {passagem_id} não reindexada: {e}")
+        logger.info(f"Índice de busca reconstruído: {indexadas} de {len(rows)} PS")
+        return indexadas
+
+    # === CONSULTA ===
+    def termos_consulta(self, q: str) -> List[str]:
+        termos = []
+        for termo, _, _ in tokenizar(q):
+            if termo not in termos:
+                termos.append(termo)
+        return termos[:TERMOS_CONSULTA_MAX]
+
+    async def buscar(self, q: str, fiscal_id: Optional[int] = None, limite: int = 20) -> List[Dict[str, Any]]:
+        """
+        PS que contêm todos os termos (o último também como prefixo), da mais relevante
+        fiscal_id: restringe às PS do fiscal (embarcando ou desembarcando); None = todas (ADMIN)
+        """
+        termos = self.termos_consulta(q)
+        if not termos:
+            return []
+
+        prefixo = termos[-1] if len(termos[-1]) >= PREFIXO_MIN else None
+
+        # Documentos por termo: termo ausente encerra a busca, e o mais raro é lido primeiro
+        frequencia = await self._frequencia_documentos(termos, prefixo)
+        if any(frequencia[consulta] == 0 for consulta in termos):
+            return []  # algum termo não aparece em PS nenhuma
+
+        estatisticas = await db.execute_query("SELECT COUNT(*), AVG(Termos) FROM BUSCA_DOCS")
+        total_docs = estatisticas[0][0] or 1
+        media_termos = float(estatisticas[0][1] or 1)
+
+        # Postagens termo a termo, do mais raro ao mais comum; POSTAGENS_MAX vale por termo
+        # e, com poucas PS candidatas, a leitura dos termos comuns fica restrita a elas
+        por_termo: Dict[str, List[tuple]] = {}
+        candidatas: Optional[set] = None
+        for consulta in sorted(termos, key=lambda t: frequencia[t]):
+            sql = (
+                f"SELECT FIRST {POSTAGENS_MAX} t.Termo, t.PassagemId, t.Secao, t.Freq, d.Termos "
+                "FROM BUSCA_TERMOS t "
+                "JOIN BUSCA_DOCS d ON d.PassagemId = t.PassagemId AND d.Secao = t.Secao"
+            )
+            if fiscal_id is not None:
+                sql += " JOIN PASSAGENS p ON p.PassagemId = t.PassagemId"
+            # O último termo aceita prefixo (STARTING WITH também casa o termo exato)
+            sql += " WHERE t.Termo STARTING WITH ?" if consulta == prefixo else " WHERE t.Termo = ?"
+            params: List[Any] = [consulta]
+            if fiscal_id is not None:
+                sql += " AND (p.FiscalEmbarcandoId = ? OR p.FiscalDesembarcandoId = ?)"
+                params.extend([fiscal_id, fiscal_id])
+            if candidatas is not None and len(candidatas) <= CANDIDATAS_FILTRO_MAX:
+                sql += f" AND t.PassagemId IN ({_marcadores(len(candidatas))})"
+                params.extend(sorted(candidatas))
+            sql += " ORDER BY t.Freq DESC"
+
+            lista = [
+                (passagem_id, secao.strip(), freq, tamanho, termo.strip())
+                for termo, passagem_id, secao, freq, tamanho in await db.execute_query(sql, params)
+            ]
+            encontradas = {passagem_id for passagem_id, _, _, _, _ in lista}
+            candidatas = encontradas if candidatas is None else candidatas & encontradas
+            if not candidatas:
+                return []  # nenhuma PS (visível) tem todos os termos
+            por_termo[consulta] = lista
+
+        pontos_secao: Dict[Tuple[int, str], float] = defaultdict(float)
+        for consulta, lista in por_termo.items():
+            docs = frequencia[consulta]
+            idf = math.log(1 + (total_docs - docs + 0.5) / (docs + 0.5))
+            for passagem_id, secao, freq, tamanho, termo in lista:
+                tf = freq * (K1 + 1) / (freq + K1 * (1 - B + B * tamanho / media_termos))
+                # Casamento só por prefixo pesa menos que o termo exato
+                pontos_secao[(passagem_id, secao)] += idf * tf * (1.0 if termo == consulta else 0.5)
+
+        # Todos os termos na PS (não necessariamente na mesma seção)
+        pontos_ps: Dict[int, float] = defaultdict(float)
+        melhor_secao: Dict[int, Tuple[float, str]] = {}
+        for (passagem_id, secao), pontos in pontos_secao.items():
+            if passagem_id not in candidatas:
+                continue
+            pontos_ps[passagem_id] += pontos
+            if pontos > melhor_secao.get(passagem_id, (0.0, ''))[0]:
+                melhor_secao[passagem_id] = (pontos, secao)
+
+        ranking = sorted(pontos_ps.items(), key=lambda item: (-item[1], -item[0]))[:limite]
+        if not ranking:
+            return []
+
+        ids = [passagem_id for passagem_id, _ in ranking]
+        rows = await db.execute_query(
+            f"""
+            SELECT d.PassagemId, d.Secao, d.Texto, p.NumeroPS, p.PeriodoInicio, p.PeriodoFim, e.Nome
+            FROM BUSCA_DOCS d
+            JOIN PASSAGENS p ON p.PassagemId = d.PassagemId
+            JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
+            WHERE d.PassagemId IN ({_marcadores(len(ids))})
+            """,
+            ids
+        )
+        documentos = {(row[0], row[1].strip()): row for row in rows}
+
+        resultados = []
+        for passagem_id, pontos in ranking:
+            secao = melhor_secao[passagem_id][1]
+            row = documentos.get((passagem_id, secao))
+            if row is None:
+                continue  # reindexada entre as duas consultas
+            resultados.append({
+                "PassagemId": passagem_id,
+                "NumeroPS": row[3],
+                "EmbarcacaoNome": row[6],
+                "PeriodoInicio": str(row[4]),
+                "PeriodoFim": str(row[5]),
+                "Secao": secao,
+                "SecaoTitulo": TITULOS_SECOES.get(secao) or SECOES.get(secao, {}).get('titulo', secao),
+                "Pontuacao": round(pontos, 4),
+                "Trecho": self.trecho(row[2] or '', termos, prefixo),
+            })
+        return resultados
+
+    async def _frequencia_documentos(self, termos: List[str], prefixo: Optional[str]) -> Dict[str, int]:
+        """Documentos (PS, seção) que contêm cada termo da consulta - IDF e ordem de leitura"""
+        frequencia = dict.fromkeys(termos, 0)
+        exatos = [consulta for consulta in termos if consulta != prefixo]
+        if exatos:
+            rows = await db.execute_query(
+                f"SELECT Termo, COUNT(*) FROM BUSCA_TERMOS WHERE Termo IN ({_marcadores(len(exatos))}) "
+                "GROUP BY Termo",
+                exatos
+            )
+            for termo, quantidade in rows:
+                frequencia[termo.strip()] = quantidade
+        if prefixo:
+            rows = await db.execute_query(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT PassagemId, Secao FROM BUSCA_TERMOS "
+                "WHERE Termo STARTING WITH ?)",
+                [prefixo]
+            )
+            frequencia[prefixo] = rows[0][0] if rows else 0
+        return frequencia
+
+    def trecho(self, texto: str, termos: List[str], prefixo: Optional[str] = None) -> str:
+        """
+        Janela do texto em volta da primeira ocorrência, com os termos em <mark>
+        (HTML escapado - pode ir direto para innerHTML)
+        """
+        ocorrencias = [
+            (inicio, fim) for termo, inicio, fim in tokenizar(texto)
+            if termo in termos or (prefixo and termo.startswith(prefixo))
+        ]
+        if not ocorrencias:
+            return escape(texto[:2 * JANELA_TRECHO])
+
+        janela_inicio = max(ocorrencias[0][0] - JANELA_TRECHO, 0)
+        janela_fim = min(ocorrencias[0][1] + JANELA_TRECHO, len(texto))
+
+        partes = ["…" if janela_inicio > 0 else ""]
+        posicao = janela_inicio
+        for inicio, fim in ocorrencias:
+            if inicio < posicao or fim > janela_fim:
+                continue
+            partes.append(escape(texto[posicao:inicio]))
+            partes.append(f"<mark>{escape(texto[inicio:fim])}</mark>")
+            posicao = fim
+        partes.append(escape(texto[posicao:janela_fim]))
+        partes.append("…" if janela_fim < len(texto) else "")
+        return "".join(partes)
+
+# Instância global do serviço
+busca_service = BuscaService()
@@ -14,21 +14,23 @@ logger = logging.getLogger(__name__)
 class EmbarcacaoService:
     """Service para operações com Embarcações"""
     
+    SQL_LISTAGEM = "SELECT EmbarcacaoId, Nome, PrimeiraEntradaPorto, TipoEmbarcacao FROM EMBARCACOES ORDER BY Nome"
+
+    def linha_embarcacao(self, row) -> dict:
+        """Linha de SQL_LISTAGEM → campos de Embarcacao (JSON e streaming)"""
+        return {
+            "EmbarcacaoId": row[0],
+            "Nome": row[1],
+            "PrimeiraEntradaPorto": row[2],
+            "TipoEmbarcacao": row[3]
+        }
+
     async def get_all_embarcacoes(self) -> List[Embarcacao]:
         """Retorna todas as embarcações cadastradas"""
         try:
-            sql = "SELECT EmbarcacaoId, Nome, PrimeiraEntradaPorto, TipoEmbarcacao FROM EMBARCACOES ORDER BY Nome"
-            rows = await db.execute_query(sql)
-            
-            embarcacoes = []
-            for row in rows:
-                embarcacao_data = {
-                    "EmbarcacaoId": row[0],
-                    "Nome": row[1],
-                    "PrimeiraEntradaPorto": row[2],
-                    "TipoEmbarcacao": row[3]
-                }
-                embarcacoes.append(Embarcacao(**embarcacao_data))
+            rows = await db.execute_query(self.SQL_LISTAGEM)
+            
+            embarcacoes = [Embarcacao(**self.linha_embarcacao(row)) for row in rows]
             
             logger.info(f"Recuperadas {len(embarcacoes)} embarcações do banco")
             return embarcacoes
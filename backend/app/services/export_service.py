@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/export_service.py
+Service Layer para exportação de PS em planilha (XLSX)
+
+Workbook do openpyxl em modo write-only: cada linha lida do banco (fetchmany,
+ver db.iter_query_sync) vai direto para o XML temporário da aba, sem montar a
+planilha na memória. O XLSX é um ZIP cujo índice só existe no fim, então o
+arquivo é fechado em disco e então enviado em streaming.
+"""
+
+from datetime import datetime
+from pathlib import Path
+from typing import Any, List
+import logging
+import re
+import tempfile
+
+from app.config.database import db
+from app.services.porto_service import SECOES_PORTO, LISTAS_PORTO
+from app.services.secao_service import SECOES, COLUNA_ITEM, campos_secao
+from app.services.pdf_service import TITULOS_SECOES
+
+logger = logging.getLogger(__name__)
+
+# Aba principal: uma linha por PS
+COLUNAS_PASSAGENS = [
+    ('PassagemId', 'p.PassagemId'),
+    ('NumeroPS', 'p.NumeroPS'),
+    ('Embarcação', 'e.Nome'),
+    ('Início', 'p.PeriodoInicio'),
+    ('Fim', 'p.PeriodoFim'),
+    ('Emissão', 'p.DataEmissao'),
+    ('Status', 'p.Status'),
+    ('Fiscal Embarcando', 'fe.Nome'),
+    ('Fiscal Desembarcando', 'fd.Nome'),
+]
+
+FROM_PASSAGENS = """
+    FROM PASSAGENS p
+    JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
+    LEFT JOIN FISCAIS fe ON fe.FiscalId = p.FiscalEmbarcandoId
+    LEFT JOIN FISCAIS fd ON fd.FiscalId = p.FiscalDesembarcandoId
+"""
+
+# Seções que podem virar aba (mesma chave usada pelo frontend)
+SECOES_EXPORTAVEIS = {
+    **{chave: {'tabela': s['tabela'], 'campos': s['campos'], 'ordem': None} for chave, s in SECOES_PORTO.items()},
+    **{chave: {'tabela': l['tabela'], 'campos': l['campos'], 'ordem': l['id']} for chave, l in LISTAS_PORTO.items()},
+    **{
+        chave: {'tabela': s['tabela'], 'campos': campos_secao(chave), 'ordem': COLUNA_ITEM if s['lista'] else None}
+        for chave, s in SECOES.items()
+    },
+}
+
+# Excel: nome de aba com até 31 caracteres e sem []:*?/\
+CARACTERES_INVALIDOS_ABA = re.compile(r'[\[\]:*?/\\]')
+
+# Caracteres de controle que o XML da planilha não aceita
+CARACTERES_ILEGAIS = re.compile(r'[\000-\010]|[\013-\014]|[\016-\037]')
+
+
+def _nome_aba(titulo: str) -> str:
+    return CARACTERES_INVALIDOS_ABA.sub('-', titulo)[:31]
+
+
+def _celula(valor: Any) -> Any:
+    if isinstance(valor, str):
+        return CARACTERES_ILEGAIS.sub('', valor)
+    return valor
+
+
+class ExportService:
+    """Exportação de PS para XLSX com memória limitada"""
+
+    def secoes_exportacao(self, secoes: str) -> List[str]:
+        """
+        'chave1,chave2' → lista validada de seções
+
+        Raises:
+            ValueError: seção desconhecida
+        """
+        chaves = [s.strip() for s in (secoes or '').split(',') if s.strip()]
+        desconhecidas = [c for c in chaves if c not in SECOES_EXPORTAVEIS]
+        if desconhecidas:
+            raise ValueError(f"Seções não exportáveis: {', '.join(desconhecidas)}")
+        return list(dict.fromkeys(chaves))
+
+    def gerar_xlsx(self, where: str, params: List[Any], secoes: List[str]) -> Path:
+        """
+        Gera o XLSX num arquivo temporário (roda numa thread - I/O e CPU bloqueantes)
+        where/params: filtros sobre PASSAGENS p / EMBARCACOES e (ver montar_filtros)
+
+        Returns:
+            caminho do arquivo (o chamador remove depois de enviar)
+        """
+        from openpyxl import Workbook
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font
+
+        wb = Workbook(write_only=True)
+        negrito = Font(bold=True)
+
+        def aba(titulo: str, cabecalho: List[str]):
+            ws = wb.create_sheet(_nome_aba(titulo))
+            linha = []
+            for nome in cabecalho:
+                celula = WriteOnlyCell(ws, value=nome)
+                celula.font = negrito
+                linha.append(celula)
+            ws.append(linha)
+            return ws
+
+        ws = aba('Passagens', [nome for nome, _ in COLUNAS_PASSAGENS])
+        total = 0
+        for row in db.iter_query_sync(
+            f"SELECT {', '.join(c for _, c in COLUNAS_PASSAGENS)} {FROM_PASSAGENS}{where} "
+            "ORDER BY e.Nome, p.PeriodoInicio, p.PassagemId",
+            params
+        ):
+            ws.append([_celula(v) for v in row])
+            total += 1
+
+        for chave in secoes:
+            secao = SECOES_EXPORTAVEIS[chave]
+            ws = aba(TITULOS_SECOES.get(chave, chave), ['PassagemId', 'NumeroPS', 'Embarcação'] + secao['campos'])
+            colunas = ', '.join(f"s.{c}" for c in secao['campos'])
+            ordem = f", s.{secao['ordem']}" if secao['ordem'] else ""
+            for row in db.iter_query_sync(
+                f"SELECT p.PassagemId, p.NumeroPS, e.Nome, {colunas} {FROM_PASSAGENS}"
+                f"JOIN {secao['tabela']} s ON s.PassagemId = p.PassagemId{where} "
+                f"ORDER BY e.Nome, p.PeriodoInicio, p.PassagemId{ordem}",
+                params
+            ):
+                ws.append([_celula(v) for v in row])
+
+        arquivo = tempfile.NamedTemporaryFile(prefix='psweb_export_', suffix='.xlsx', delete=False)
+        arquivo.close()
+        try:
+            wb.save(arquivo.name)
+        except Exception:
+            Path(arquivo.name).unlink(missing_ok=True)
+            raise
+
+        logger.info(f"Exportação XLSX: {total} PS, abas extras: {', '.join(secoes) or 'nenhuma'}")
+        return Path(arquivo.name)
+
+    def nome_arquivo(self) -> str:
+        return f"passagens_{datetime.now():%Y%m%d_%H%M}.xlsx"
+
+# Instância global do serviço
+export_service = ExportService()
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/painel_service.py
+Service Layer para o painel administrativo (contagens de PS)
+
+As contagens por embarcação, status e mês de início vêm de PAINEL_AGREGADOS,
+mantida pelos triggers de PASSAGENS (migração 010) em toda criação, edição,
+finalização e exclusão - inclusive as que não passam por esta API. Os
+triggers só inserem deltas (+1/-1); compactar() soma e substitui as linhas
+quando elas passam de COMPACTAR_ACIMA. Ler o painel custa um GROUP BY numa
+tabela pequena, não um GROUP BY em PASSAGENS com joins.
+
+Rascunhos atrasados dependem da data de hoje e saem de uma consulta pelo
+índice de PeriodoFim (são poucos por natureza).
+"""
+
+from collections import defaultdict
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+from app.config.database import db
+from app.services.passagem_service import passagem_service
+
+logger = logging.getLogger(__name__)
+
+# Linhas de delta acima disso → compactação em segundo plano após a leitura
+COMPACTAR_ACIMA = 2000
+
+ATRASADOS_LISTA_MAX = 20
+
+SQL_CARGA = """
+    INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta)
+    SELECT COALESCE(EmbarcacaoId, 0), COALESCE(Status, ''),
+           COALESCE(EXTRACT(YEAR FROM PeriodoInicio) * 100 + EXTRACT(MONTH FROM PeriodoInicio), 0),
+           COUNT(*)
+    FROM PASSAGENS
+    GROUP BY 1, 2, 3
+"""
+
+
+def _mes_texto(mes: int) -> Optional[str]:
+    """202610 → '2026-10' (0 = PS sem período)"""
+    return f"{mes // 100:04d}-{mes % 100:02d}" if mes else None
+
+
+class PainelService:
+    """Leitura, compactação e reconstrução dos agregados do painel"""
+
+    def __init__(self):
+        self._compactacao: Optional[asyncio.Task] = None
+
+    async def resumo(self) -> Dict[str, Any]:
+        """Painel completo: totais por status, por embarcação, por mês e rascunhos atrasados"""
+        rows = await db.execute_query("""
+            SELECT EmbarcacaoId, Status, Mes, SUM(Delta), COUNT(*)
+            FROM PAINEL_AGREGADOS
+            GROUP BY EmbarcacaoId, Status, Mes
+        """)
+        nomes = dict(await db.execute_query("SELECT EmbarcacaoId, Nome FROM EMBARCACOES"))
+
+        total = 0
+        linhas_delta = 0
+        por_status: Dict[str, int] = defaultdict(int)
+        por_embarcacao: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        por_mes: Dict[int, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        for embarcacao_id, status_ps, mes, quantidade, linhas in rows:
+            linhas_delta += linhas
+            if not quantidade:
+                continue
+            status_ps = status_ps.strip()
+            total += quantidade
+            por_status[status_ps] += quantidade
+            por_embarcacao[embarcacao_id][status_ps] += quantidade
+            por_mes[mes][status_ps] += quantidade
+
+        if linhas_delta > COMPACTAR_ACIMA:
+            self._agendar_compactacao()
+
+        return {
+            "Total": total,
+            "PorStatus": dict(por_status),
+            "PorEmbarcacao": sorted(
+                (
+                    {
+                        "EmbarcacaoId": embarcacao_id,
+                        "EmbarcacaoNome": nomes.get(embarcacao_id),
+                        "Total": sum(contagem.values()),
+                        "PorStatus": dict(contagem),
+                    }
+                    for embarcacao_id, contagem in por_embarcacao.items()
+                ),
+                key=lambda item: (item["EmbarcacaoNome"] or "")
+            ),
+            "PorMes": [
+                {"Mes": _mes_texto(mes), "Total": sum(contagem.values()), "PorStatus": dict(contagem)}
+                for mes, contagem in sorted(por_mes.items(), reverse=True)
+            ],
+            "RascunhosAtrasados": await self.rascunhos_atrasados(),
+        }
+
+    async def rascunhos_atrasados(self) -> Dict[str, Any]:
+        """Rascunhos com a janela de edição encerrada (PeriodoFim antes do limite)"""
+        limite = passagem_service.limite_janela_edicao()
+        rows_total = await db.execute_query(
+            "SELECT COUNT(*) FROM PASSAGENS WHERE Status = 'RASCUNHO' AND PeriodoFim < ?",
+            [limite]
+        )
+        rows = await db.execute_query(
+            f"""
+            SELECT FIRST {ATRASADOS_LISTA_MAX} p.PassagemId, p.NumeroPS, e.Nome, p.PeriodoInicio, p.PeriodoFim,
+                   fd.Nome
+            FROM PASSAGENS p
+            JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
+            LEFT JOIN FISCAIS fd ON fd.FiscalId = p.FiscalDesembarcandoId
+            WHERE p.Status = 'RASCUNHO' AND p.PeriodoFim < ?
+            ORDER BY p.PeriodoFim, p.PassagemId
+            """,
+            [limite]
+        )
+        return {
+            "Total": rows_total[0][0] if rows_total else 0,
+            "MaisAntigos": [
+                {
+                    "PassagemId": row[0],
+                    "NumeroPS": row[1],
+                    "EmbarcacaoNome": row[2],
+                    "PeriodoInicio": str(row[3]),
+                    "PeriodoFim": str(row[4]),
+                    "FiscalDesembarcandoNome": row[5],
+                }
+                for row in rows
+            ],
+        }
+
+    def _agendar_compactacao(self):
+        if self._compactacao and not self._compactacao.done():
+            return
+        self._compactacao = asyncio.create_task(self._compactar_em_segundo_plano())
+
+    async def _compactar_em_segundo_plano(self):
+        try:
+            await self.compactar()
+        except Exception as e:
+            logger.error(f"Erro ao compactar agregados do painel: {e}")
+
+    async def compactar(self) -> int:
+        """
+        Substitui os deltas até o maior DeltaId atual por uma linha por chave
+        (deltas inseridos durante a compactação ficam para a próxima)
+
+        Returns:
+            linhas de delta removidas
+        """
+        async with db.transaction() as cursor:
+            cursor.execute("SELECT MAX(DeltaId) FROM PAINEL_AGREGADOS")
+            maximo = cursor.fetchone()[0]
+            if maximo is None:
+                return 0
+
+            cursor.execute(
+                "SELECT EmbarcacaoId, Status, Mes, SUM(Delta) FROM PAINEL_AGREGADOS "
+                "WHERE DeltaId <= ? GROUP BY EmbarcacaoId, Status, Mes",
+                [maximo]
+            )
+            consolidadas = [row for row in cursor.fetchall() if row[3]]
+
+            cursor.execute("DELETE FROM PAINEL_AGREGADOS WHERE DeltaId <= ?", [maximo])
+            removidas = cursor.rowcount
+            if consolidadas:
+                cursor.executemany(
+                    "INSERT INTO PAINEL_AGREGADOS (EmbarcacaoId, Status, Mes, Delta) VALUES (?, ?, ?, ?)",
+                    consolidadas
+                )
+
+        logger.info(f"Painel compactado: {removidas} deltas → {len(consolidadas)} linhas")
+        return removidas
+
+    async def reconstruir(self) -> int:
+        """
+        Recalcula os agregados a partir de PASSAGENS (correção manual)
+        Uma transação: o DELETE só alcança deltas já confirmados, que a carga
+        também enxerga - PS gravada ao mesmo tempo não é perdida nem contada duas vezes
+
+        Returns:
+            chaves (embarcação, status, mês) gravadas
+        """
+        async with db.transaction() as cursor:
+            cursor.execute("DELETE FROM PAINEL_AGREGADOS")
+            cursor.execute(SQL_CARGA)
+            chaves = cursor.rowcount
+
+        logger.info(f"Agregados do painel reconstruídos: {chaves} chaves")
+        return chaves
+
+# Instância global do serviço
+painel_service = PainelService()
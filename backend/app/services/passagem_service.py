@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/passagem_service.py
+Service Layer para Passagens de Serviço - operações compartilhadas entre
+a API do fiscal (passagens_api) e a API administrativa (admin_passagens_api)
+"""
+
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import shutil
+import logging
+
+from app.config.settings import settings
+from app.services.porto_service import SECOES_PORTO, LISTAS_PORTO, TABELA_FLAGS_LISTAS
+from app.services.secao_service import (
+    SECOES, COLUNA_ITEM, TABELA_FLAGS_SECOES, campos_secao, campos_anexo
+)
+from app.services.busca_service import busca_service, SECOES_BUSCA
+from app.utils.intervalos import ArvoreIntervalos, Intervalo, Varredura
+
+logger = logging.getLogger(__name__)
+
+# Nova PS gerada pela cópia: dia seguinte ao fim da PS de origem, por 14 dias
+COPIA_INICIO_DIAS = 1
+COPIA_FIM_DIAS = 14
+
+# Seções que podem ser levadas para a PS seguinte na cópia
+# chave → tabela, colunas copiadas, coluna de ordenação (listas) e flag "não previsto"
+# padrao=True: copiada quando o cliente não escolhe as seções
+# Caminhos de anexo não são copiados: apontam para o diretório da PS de origem
+CAMPOS_NAO_COPIAVEIS = {'AnexoPath', 'RADEPath'}
+
+SECOES_COPIAVEIS: Dict[str, Dict[str, Any]] = {
+    chave: {
+        'tabela': secao['tabela'],
+        'campos': [c for c in secao['campos'] if c not in CAMPOS_NAO_COPIAVEIS],
+        'ordem': None,
+        'flag': None,
+        'padrao': False
+    }
+    for chave, secao in SECOES_PORTO.items()
+}
+SECOES_COPIAVEIS.update({
+    chave: {
+        'tabela': lista['tabela'],
+        'campos': ['NaoPrevisto'] + [c for c in lista['campos'] if c not in CAMPOS_NAO_COPIAVEIS],
+        'ordem': lista['id'],
+        'flag': lista['flag'],
+        # Materiais que seguem a bordo e OS de mobilização ainda abertas
+        'padrao': chave in ('desembarqueMateriais', 'osMobilizacao')
+    }
+    for chave, lista in LISTAS_PORTO.items()
+})
+# Seções 4/6/7 do registro: flag da lista fica em SECOES_LISTAS_FLAGS, por seção
+SECOES_COPIAVEIS.update({
+    chave: {
+        'tabela': secao['tabela'],
+        'campos': [c for c in campos_secao(chave) if c not in campos_anexo(chave)],
+        'ordem': COLUNA_ITEM if secao['lista'] else None,
+        'flag': None,
+        'flag_secao': secao['lista'],
+        # Informações Gerais, orientações do Smart RDO e OS abertas seguem para a próxima PS
+        'padrao': secao.get('copiar', False)
+    }
+    for chave, secao in SECOES.items()
+})
+
+
+class PeriodoSobreposto(ValueError):
+    """Período da PS coincide com o de outra PS da mesma embarcação (409)"""
+
+    def __init__(self, conflitos: List[Intervalo]):
+        self.conflitos = conflitos
+        primeiro = conflitos[0]
+        super().__init__(
+            f"Período sobrepõe a PS {primeiro.chave} da mesma embarcação "
+            f"({primeiro.inicio:%d/%m/%Y} a {primeiro.fim:%d/%m/%Y})"
+        )
+
+
+class PassagemService:
+    """Service para operações com Passagens de Serviço"""
+
+    def incrementar_versao_tx(self, cursor, passagem_id: int):
+        """
+        Incrementa PASSAGENS.Versao na transação do chamador - toda escrita que muda
+        a PS ou suas seções (a versão alimenta o ETag das rotas GET da PS)
+        """
+        cursor.execute(
+            "UPDATE PASSAGENS SET Versao = Versao + 1 WHERE PassagemId = ?",
+            [passagem_id]
+        )
+
+    def limite_janela_edicao(self) -> date:
+        """
+        Menor PeriodoFim ainda editável hoje: a edição vai até PeriodoFim + 1 dia 23:59:59
+        (mesma regra de can_edit_passagem, expressa como filtro SQL)
+        """
+        return date.today() - timedelta(days=1)
+
+    def travar_edicao_tx(self, cursor, passagem_id: int, fiscal_id: int,
+                         incrementar: bool = True, janela: bool = True) -> bool:
+        """
+        Escrita guardada: o UPDATE em PASSAGENS só acontece se a PS está em RASCUNHO,
+        o fiscal é o desembarcante e (janela=True) a janela de edição está aberta.
+        Trava a linha da PS até o fim da transação do chamador - escritas concorrentes
+        na mesma PS esperam ou falham, sem janela entre verificação e escrita.
+
+        Returns:
+            False se a guarda falhou (classificar 404/403 fora da transação)
+        """
+        sql = (
+            f"UPDATE PASSAGENS SET Versao = Versao{' + 1' if incrementar else ''} "
+            "WHERE PassagemId = ? AND Status = 'RASCUNHO' AND FiscalDesembarcandoId = ?"
+        )
+        params = [passagem_id, fiscal_id]
+        if janela:
+            sql += " AND PeriodoFim >= ?"
+            params.append(self.limite_janela_edicao())
+        cursor.execute(sql, params)
+        return cursor.rowcount > 0
+
+    def excluir_passagem(self, cursor, passagem_id: int) -> bool:
+        """
+        Exclui a PS no cursor recebido (o chamador controla a transação - ver db.transaction())
+        As tabelas dependentes são removidas pelas FKs ON DELETE CASCADE (migração 005)
+
+        Returns:
+            True se a PS existia e foi excluída
+        """
+        cursor.execute("DELETE FROM PASSAGENS WHERE PassagemId = ?", [passagem_id])
+        excluida = cursor.rowcount > 0
+
+        if excluida:
+            logger.info(f"PS {passagem_id} excluída (dependências em cascata)")
+        return excluida
+
+    def arvore_periodos_tx(self, cursor, embarcacao_id: int) -> ArvoreIntervalos:
+        """Períodos das PS da embarcação (índice EmbarcacaoId, PeriodoInicio) numa árvore de intervalos"""
+        cursor.execute(
+            "SELECT PeriodoInicio, PeriodoFim, PassagemId FROM PASSAGENS WHERE EmbarcacaoId = ?",
+            [embarcacao_id]
+        )
+        return ArvoreIntervalos(cursor.fetchall())
+
+    def validar_periodo_tx(self, cursor, embarcacao_id: int, inicio: date, fim: date,
+                           ignorar_id: Optional[int] = None):
+        """
+        Rejeita período que coincide com outra PS da embarcação, no cursor da gravação
+        A linha da embarcação fica travada até o commit: duas PS simultâneas da mesma
+        embarcação não passam ambas pela verificação
+
+        Raises:
+            PeriodoSobreposto: com as PS conflitantes
+        """
+        cursor.execute(
+            "SELECT EmbarcacaoId FROM EMBARCACOES WHERE EmbarcacaoId = ? WITH LOCK",
+            [embarcacao_id]
+        )
+        cursor.fetchall()
+        conflitos = self.arvore_periodos_tx(cursor, embarcacao_id).sobrepostos(inicio, fim, ignorar=ignorar_id)
+        if conflitos:
+            raise PeriodoSobreposto(conflitos)
+
+    async def relatorio_periodos(self, embarcacao_id: Optional[int] = None,
+                                 inicio: Optional[date] = None, fim: Optional[date] = None) -> List[Dict[str, Any]]:
+        """
+        Lacunas e sobreposições de período por embarcação, numa passada ordenada
+        por (EmbarcacaoId, PeriodoInicio) lida em lotes
+
+        Returns:
+            uma entrada por embarcação com PS no filtro
+        """
+        from app.utils.streaming import linhas_em_lotes
+
+        where = " WHERE 1=1"
+        params: List[Any] = []
+        if embarcacao_id is not None:
+            where += " AND p.EmbarcacaoId = ?"
+            params.append(embarcacao_id)
+        if inicio:
+            where += " AND p.PeriodoFim >= ?"
+            params.append(inicio)
+        if fim:
+            where += " AND p.PeriodoInicio <= ?"
+            params.append(fim)
+
+        sql = (
+            "SELECT p.EmbarcacaoId, e.Nome, p.PeriodoInicio, p.PeriodoFim, p.PassagemId "
+            "FROM PASSAGENS p JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId"
+            f"{where} ORDER BY p.EmbarcacaoId, p.PeriodoInicio, p.PeriodoFim, p.PassagemId"
+        )
+
+        relatorio = []
+        atual = None
+        varredura = None
+        async for lote in linhas_em_lotes(sql, params):
+            for emb_id, nome, periodo_inicio, periodo_fim, passagem_id in lote:
+                if atual is None or atual["EmbarcacaoId"] != emb_id:
+                    atual = {"EmbarcacaoId": emb_id, "EmbarcacaoNome": nome, "Passagens": 0,
+                             "Sobreposicoes": [], "Lacunas": []}
+                    relatorio.append(atual)
+                    varredura = Varredura(timedelta(days=1))
+
+                atual["Passagens"] += 1
+                pares, lacuna = varredura.adicionar(Intervalo(periodo_inicio, periodo_fim, passagem_id))
+                for anterior, nova in pares:
+                    atual["Sobreposicoes"].append({
+                        "PassagemIdA": anterior.chave,
+                        "PassagemIdB": nova.chave,
+                        "Inicio": str(nova.inicio),
+                        "Fim": str(min(anterior.fim, nova.fim)),
+                    })
+                if lacuna:
+                    anterior, nova = lacuna
+                    atual["Lacunas"].append({
+                        "AposPassagemId": anterior.chave,
+                        "AntesPassagemId": nova.chave,
+                        "Inicio": str(anterior.fim + timedelta(days=1)),
+                        "Fim": str(nova.inicio - timedelta(days=1)),
+                        "Dias": (nova.inicio - anterior.fim).days - 1,
+                    })
+        return relatorio
+
+    def periodo_copia(self, periodo_fim: date):
+        """Período da PS copiada (regra do legado: +1 a +14 dias do fim da origem)"""
+        return (periodo_fim + timedelta(days=COPIA_INICIO_DIAS),
+                periodo_fim + timedelta(days=COPIA_FIM_DIAS))
+
+    def secoes_copia(self, secoes: Optional[List[str]]) -> List[str]:
+        """
+        Valida as seções pedidas; None → seções padrão do registro
+
+        Raises:
+            ValueError: seção desconhecida
+        """
+        if secoes is None:
+            return [chave for chave, secao in SECOES_COPIAVEIS.items() if secao['padrao']]
+        desconhecidas = [chave for chave in secoes if chave not in SECOES_COPIAVEIS]
+        if desconhecidas:
+            raise ValueError(f"Seções não copiáveis: {', '.join(desconhecidas)}")
+        return list(dict.fromkeys(secoes))
+
+    def copiar_passagem(self, cursor, origem_id: int, fiscal_id: int, owner: str,
+                        secoes: List[str]) -> Optional[int]:
+        """
+        Cria a PS seguinte a partir da origem no cursor recebido: cabeçalho e cada
+        seção escolhida são um INSERT ... SELECT (sem ida e volta por linha)
+
+        Returns:
+            PassagemId da nova PS, ou None se a origem não existe
+
+        Raises:
+            PeriodoSobreposto: já existe PS da embarcação no período da cópia
+        """
+        cursor.execute(
+            "SELECT PeriodoFim, EmbarcacaoId FROM PASSAGENS WHERE PassagemId = ?", [origem_id]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        inicio, fim = self.periodo_copia(row[0])
+        self.validar_periodo_tx(cursor, row[1], inicio, fim)
+
+        # Cabeçalho: mesma embarcação; o embarcante da origem desembarca na nova PS
+        cursor.execute("""
+            INSERT INTO PASSAGENS
+            (NumeroPS, DataEmissao, PeriodoInicio, PeriodoFim, EmbarcacaoId,
+             FiscalEmbarcandoId, FiscalDesembarcandoId, Status, OwnerUser)
+            SELECT NULL, ?, ?, ?, EmbarcacaoId, NULL, ?, 'RASCUNHO', ?
+            FROM PASSAGENS WHERE PassagemId = ?
+            RETURNING PassagemId
+        """, [date.today(), inicio, fim, fiscal_id, owner, origem_id])
+        novo_id = cursor.fetchone()[0]
+
+        flags = []
+        flags_secoes = []
+        for chave in secoes:
+            secao = SECOES_COPIAVEIS[chave]
+            colunas = ', '.join(secao['campos'])
+            ordem = f" ORDER BY {secao['ordem']}" if secao['ordem'] else ""
+            cursor.execute(
+                f"INSERT INTO {secao['tabela']} (PassagemId, {colunas}) "
+                f"SELECT ?, {colunas} FROM {secao['tabela']} WHERE PassagemId = ?{ordem}",
+                [novo_id, origem_id]
+            )
+            if secao['flag']:
+                flags.append(secao['flag'])
+            if secao.get('flag_secao'):
+                flags_secoes.append(chave)
+
+        if flags:
+            cursor.execute(
+                f"INSERT INTO {TABELA_FLAGS_LISTAS} (PassagemId, {', '.join(flags)}) "
+                f"SELECT ?, {', '.join(flags)} FROM {TABELA_FLAGS_LISTAS} WHERE PassagemId = ?",
+                [novo_id, origem_id]
+            )
+        if flags_secoes:
+            cursor.execute(
+                f"INSERT INTO {TABELA_FLAGS_SECOES} (PassagemId, Secao, NaoPrevisto) "
+                f"SELECT ?, Secao, NaoPrevisto FROM {TABELA_FLAGS_SECOES} "
+                f"WHERE PassagemId = ? AND Secao IN ({', '.join(['?'] * len(flags_secoes))})",
+                [novo_id, origem_id] + flags_secoes
+            )
+
+        # Texto chegou por INSERT ... SELECT: indexa a nova PS na mesma transação
+        busca_service.indexar_tx(cursor, novo_id, [c for c in secoes if c in SECOES_BUSCA])
+
+        logger.info(f"PS {origem_id} copiada para PS {novo_id} (seções: {', '.join(secoes) or 'nenhuma'})")
+        return novo_id
+
+    def diretorio_anexos(self, passagem_id: int) -> Path:
+        """Diretório de anexos da PS no storage (uploads anteriores ao storage por hash)"""
+        return Path(settings.STORAGE_DIR) / "PS" / str(passagem_id)
+
+    def remover_diretorio_anexos(self, passagem_id: int):
+        """
+        Remove os anexos da PS excluída - agendado como BackgroundTask,
+        depois que o DELETE já foi confirmado e a resposta enviada
+        """
+        diretorio = self.diretorio_anexos(passagem_id)
+        if not diretorio.exists():
+            return
+        try:
+            shutil.rmtree(diretorio)
+            logger.info(f"Anexos da PS {passagem_id} removidos: {diretorio}")
+        except Exception as e:
+            logger.error(f"Erro ao remover anexos da PS {passagem_id}: {e}")
+
+# Instância global do serviço
+passagem_service = PassagemService()
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/pdf_service.py
+Service Layer para geração do PDF da Passagem de Serviço
+
+Finalização → job numa fila limitada → workers assíncronos → renderização
+(reportlab) num pool de processos. O request nunca espera o PDF e a CPU da
+renderização não disputa o loop de eventos da API.
+
+Cada PDF fica em STORAGE_DIR/PS/{id}/pdf/{hash}.pdf, onde o hash cobre o
+documento completo, o logo e TEMPLATE_VERSION: mesmo conteúdo → mesmo
+arquivo, servido sem renderizar de novo.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import uuid
+from xml.sax.saxutils import escape
+
+from app.config.database import db
+from app.config.settings import settings
+from app.services.porto_service import porto_service, SECOES_PORTO, LISTAS_PORTO
+from app.services.secao_service import secao_service, SECOES, GRUPOS, campos_secao
+from app.services.storage_service import storage_service, TIPO_PDF
+
+logger = logging.getLogger(__name__)
+
+# Estados do job de renderização
+JOB_NA_FILA = "na_fila"
+JOB_PROCESSANDO = "processando"
+JOB_CONCLUIDO = "concluido"
+JOB_ERRO = "erro"
+
+# Quantos jobs terminados ficam disponíveis para consulta de status
+JOBS_HISTORICO_MAX = 500
+
+# Incrementar sempre que o layout de renderizar_pdf mudar (invalida o cache de PDFs)
+TEMPLATE_VERSION = "2"
+
+# Títulos das seções no PDF (mesma numeração da tela)
+TITULOS_SECOES = {
+    'trocaturma': '1.1 Troca de Turma',
+    'manutencaoPreventiva': '1.2 Manutenção Preventiva',
+    'abastecimento': '1.3 Abastecimento',
+    'anvisa': '1.4 ANVISA',
+    'classe': '1.5 Classe',
+    'inspecoesPetrobras': '1.6 Inspeções Petrobras',
+    'equipes': '1.7 Embarque de Equipes',
+    'embarqueMateriais': '1.8 Embarque de Materiais',
+    'desembarqueMateriais': '1.9 Desembarque de Materiais',
+    'osMobilizacao': '1.10 OS Mobilização/Desmobilização',
+    **{chave: secao['titulo'] for chave, secao in SECOES.items()},
+}
+
+# Capítulos das seções do registro (secao_service.SECOES), pelo número do título
+CAPITULOS = {
+    '4': '4. ROTINA E SMS',
+    '6': '6. ORDENS DE SERVIÇO',
+    '7': '7. INFORMAÇÕES GERAIS',
+}
+
+LOGO_PADRAO = Path(__file__).parent.parent.parent.parent / "frontend" / "static" / "assets" / "logo.png"
+
+
+def caminho_logo() -> Optional[str]:
+    """Logo do cabeçalho: PDF_LOGO do .env ou o logo do frontend"""
+    logo = Path(settings.PDF_LOGO) if settings.PDF_LOGO else LOGO_PADRAO
+    return str(logo) if logo.exists() else None
+
+
+@lru_cache(maxsize=8)
+def _hash_arquivo(caminho: str, mtime_ns: int, tamanho: int) -> str:
+    """SHA-256 do arquivo - mtime/tamanho na chave do cache invalidam quando o arquivo muda"""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(65536), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def hash_documento(documento: Dict[str, Any], logo: Optional[str]) -> str:
+    """Chave de conteúdo do PDF: documento + logo + versão do template"""
+    h = hashlib.sha256()
+    h.update(TEMPLATE_VERSION.encode())
+    h.update(json.dumps(documento, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8'))
+    if logo:
+        info = os.stat(logo)
+        h.update(_hash_arquivo(logo, info.st_mtime_ns, info.st_size).encode())
+    return h.hexdigest()
+
+
+def _texto(valor: Any) -> str:
+    """Valor do banco → texto do PDF"""
+    if valor is None or valor == '':
+        return '-'
+    if hasattr(valor, 'isoformat'):
+        return valor.isoformat()
+    return str(valor)
+
+
+def _valores_texto(dados: Dict[str, Any], campos: List[str]) -> Dict[str, Optional[str]]:
+    """Só tipos simples no documento (atravessa a fronteira de processo e entra no hash)"""
+    return {c: (_texto(dados.get(c)) if dados.get(c) is not None else None) for c in campos}
+
+
+def renderizar_pdf(documento: Dict[str, Any], destino: str, logo: Optional[str]) -> str:
+    """
+    Renderiza o PDF da PS - executa em processo do pool (função de módulo, picklable)
+    Grava em arquivo temporário e troca atomicamente, para nunca servir PDF pela metade
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    estilos = getSampleStyleSheet()
+    estilo_celula = ParagraphStyle('Celula', parent=estilos['Normal'], fontSize=8, leading=10)
+    cabecalho = documento['cabecalho']
+    elementos = []
+
+    def celula(valor: Any):
+        # Paragraph quebra linha dentro da célula; texto do usuário é escapado
+        return Paragraph(escape(_texto(valor)), estilo_celula)
+
+    if logo:
+        elementos.append(Image(logo, width=42 * mm, height=14 * mm, kind='proportional', hAlign='LEFT'))
+    elementos.append(Paragraph(f"PASSAGEM DE SERVIÇO – {escape(_texto(cabecalho['EmbarcacaoNome']))}", estilos['Title']))
+    for rotulo, chave in [
+        ('Número', 'NumeroPS'), ('Data', 'DataEmissao'), ('Status', 'Status'),
+        ('Fiscal Embarcando', 'FiscalEmbarcandoNome'), ('Fiscal Desembarcando', 'FiscalDesembarcandoNome')
+    ]:
+        elementos.append(Paragraph(f"<b>{rotulo}:</b> {escape(_texto(cabecalho[chave]))}", estilos['Normal']))
+    elementos.append(Paragraph(
+        f"<b>Período:</b> {_texto(cabecalho['PeriodoInicio'])} a {_texto(cabecalho['PeriodoFim'])}",
+        estilos['Normal']
+    ))
+    elementos.append(Spacer(1, 6 * mm))
+
+    estilo_tabela = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#e6f2ef')),
+        ('FONTSIZE', (0, 0), (-1, -1), 8),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+
+    elementos.append(Paragraph("1. PORTO", estilos['Heading2']))
+    for chave, dados in documento['secoes'].items():
+        elementos.append(Paragraph(TITULOS_SECOES.get(chave, chave), estilos['Heading4']))
+        tabela_campos(dados)
+
+    def tabela_campos(dados: Dict[str, Any]):
+        linhas = [['Campo', 'Valor']] + [[campo, celula(valor)] for campo, valor in dados.items()]
+        tabela = Table(linhas, colWidths=[55 * mm, 115 * mm], hAlign='LEFT')
+        tabela.setStyle(estilo_tabela)
+        elementos.append(tabela)
+
+    def tabela_lista(lista: Dict[str, Any]):
+        if lista['naoPrevisto'] or not lista['linhas']:
+            elementos.append(Paragraph("Não previsto", estilos['Italic']))
+            return
+        campos = lista['campos']
+        largura = 186 * mm / len(campos)
+        linhas = [campos] + [[celula(linha.get(c)) for c in campos] for linha in lista['linhas']]
+        tabela = Table(linhas, colWidths=[largura] * len(campos), repeatRows=1, hAlign='LEFT')
+        tabela.setStyle(estilo_tabela)
+        elementos.append(tabela)
+
+    for chave, lista in documento['listas'].items():
+        elementos.append(Paragraph(TITULOS_SECOES.get(chave, chave), estilos['Heading4']))
+        tabela_lista(lista)
+
+    # Seções do registro, na ordem da tela, com o título do capítulo quando ele muda
+    capitulo = None
+    for chave, secao in documento['registro'].items():
+        titulo = TITULOS_SECOES.get(chave, chave)
+        if titulo.split('.')[0] != capitulo:
+            capitulo = titulo.split('.')[0]
+            elementos.append(Paragraph(escape(CAPITULOS.get(capitulo, capitulo)), estilos['Heading2']))
+        elementos.append(Paragraph(escape(titulo), estilos['Heading4']))
+        if 'linhas' in secao:
+            tabela_lista(secao)
+        else:
+            tabela_campos(secao['dados'])
+
+    destino_path = Path(destino)
+    destino_path.parent.mkdir(parents=True, exist_ok=True)
+    temporario = destino_path.with_name(f".{destino_path.name}.{os.getpid()}.tmp")
+    SimpleDocTemplate(str(temporario), pagesize=A4, leftMargin=12 * mm, rightMargin=12 * mm,
+                      topMargin=10 * mm, bottomMargin=10 * mm).build(elementos)
+    os.replace(temporario, destino_path)
+    return str(destino_path)
+
+
+class PdfService:
+    """Fila de renderização de PDFs com workers e pool de processos"""
+
+    def __init__(self):
+        self._fila: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sequencia = 0
+        self._em_andamento = 0  # sequência do último job retirado da fila
+        self._por_conteudo: Dict[str, str] = {}  # hash do conteúdo → jobId em andamento
+
+    def iniciar(self):
+        """Cria fila, pool de processos e workers - chamado no startup da aplicação"""
+        if self._fila is not None:
+            return
+        self._fila = asyncio.Queue(maxsize=settings.PDF_FILA_MAX)
+        self._executor = ProcessPoolExecutor(max_workers=settings.PDF_WORKERS)
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(settings.PDF_WORKERS)
+        ]
+        logger.info(f"Fila de PDF iniciada: {settings.PDF_WORKERS} workers, até {settings.PDF_FILA_MAX} jobs")
+
+    async def parar(self):
+        """Encerra workers e pool - chamado no shutdown (jobs na fila são descartados)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._fila = None
+
+    def fila_cheia(self) -> bool:
+        return self._fila is None or self._fila.full()
+
+    async def montar_documento(self, passagem_id: int) -> Dict[str, Any]:
+        """
+        Lê tudo o que vai no PDF numa única conexão e devolve só tipos simples
+        (o documento atravessa a fronteira de processo)
+        """
+        async with db.transaction() as cursor:
+            return self.montar_documento_tx(cursor, passagem_id)
+
+    def montar_documento_tx(self, cursor, passagem_id: int) -> Dict[str, Any]:
+        """Mesmo que montar_documento, no cursor/transação do chamador (ex.: a da finalização)"""
+        cursor.execute("""
+            SELECT p.NumeroPS, p.DataEmissao, p.PeriodoInicio, p.PeriodoFim, p.Status,
+                   e.Nome, fe.Nome, fd.Nome
+            FROM PASSAGENS p
+            JOIN EMBARCACOES e ON e.EmbarcacaoId = p.EmbarcacaoId
+            LEFT JOIN FISCAIS fe ON fe.FiscalId = p.FiscalEmbarcandoId
+            JOIN FISCAIS fd ON fd.FiscalId = p.FiscalDesembarcandoId
+            WHERE p.PassagemId = ?
+        """, [passagem_id])
+        row = cursor.fetchone()
+        if row is None:
+            raise LookupError(f"PS {passagem_id} não encontrada")
+        secoes = porto_service.carregar_secoes(cursor, passagem_id)
+        listas = porto_service.carregar_listas(cursor, passagem_id)
+
+        cabecalho = dict(zip(
+            ['NumeroPS', 'DataEmissao', 'PeriodoInicio', 'PeriodoFim', 'Status',
+             'EmbarcacaoNome', 'FiscalEmbarcandoNome', 'FiscalDesembarcandoNome'],
+            [_texto(v) if v is not None else None for v in row]
+        ))
+        for dados in secoes.values():
+            dados.pop('PassagemId', None)
+
+        carregadas = {}
+        for grupo in GRUPOS:
+            carregadas.update(secao_service.carregar_grupo(cursor, passagem_id, grupo))
+        registro = {}
+        for chave in SECOES:
+            campos = campos_secao(chave)
+            if SECOES[chave]['lista']:
+                registro[chave] = {
+                    'naoPrevisto': carregadas[chave]['naoPrevisto'],
+                    'campos': campos,
+                    'linhas': [_valores_texto(linha, campos) for linha in carregadas[chave]['linhas']]
+                }
+            else:
+                registro[chave] = {'dados': _valores_texto(carregadas[chave], campos)}
+
+        return {
+            'passagemId': passagem_id,
+            'cabecalho': cabecalho,
+            'secoes': {
+                chave: {campo: (_texto(v) if v is not None else None) for campo, v in dados.items()}
+                for chave, dados in secoes.items() if chave in SECOES_PORTO
+            },
+            'listas': {
+                chave: {
+                    'naoPrevisto': lista['naoPrevisto'],
+                    'campos': LISTAS_PORTO[chave]['campos'],
+                    'linhas': [_valores_texto(l, LISTAS_PORTO[chave]['campos']) for l in lista['linhas']]
+                }
+                for chave, lista in listas.items()
+            },
+            'registro': registro
+        }
+
+    def nome_arquivo(self, documento: Dict[str, Any]) -> str:
+        """PS_<embarcação>_<início>-<fim>.pdf, como no legado"""
+        cab = documento['cabecalho']
+        inicio = (cab['PeriodoInicio'] or '').replace('-', '')
+        fim = (cab['PeriodoFim'] or '').replace('-', '')
+        return re.sub(r'[\\/:*?"<>|]+', '_', f"PS_{cab['EmbarcacaoNome']}_{inicio}-{fim}.pdf")
+
+    def diretorio_pdfs(self, passagem_id: int) -> Path:
+        return Path(settings.STORAGE_DIR) / "PS" / str(passagem_id) / "pdf"
+
+    def caminho_em_cache(self, passagem_id: int, documento: Dict[str, Any]) -> Path:
+        """Caminho do PDF para este conteúdo (pode ainda não existir)"""
+        return self.diretorio_pdfs(passagem_id) / f"{hash_documento(documento, caminho_logo())}.pdf"
+
+    async def gerar(self, passagem_id: int, documento: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Devolve o job do PDF deste conteúdo:
+        - já renderizado → job concluído na hora, sem passar pela fila
+        - mesmo conteúdo já na fila/processando → o mesmo job
+        - senão enfileira; com a fila cheia aguarda vaga (contrapressão)
+
+        Raises:
+            RuntimeError: fila não iniciada
+        """
+        destino = self.caminho_em_cache(passagem_id, documento)
+        conteudo = destino.stem
+
+        job_id = self._por_conteudo.get(conteudo)
+        if job_id in self._jobs and self._jobs[job_id]["status"] in (JOB_NA_FILA, JOB_PROCESSANDO):
+            return self.status_job(job_id)
+
+        job = self._novo_job(passagem_id, conteudo)
+        if destino.exists():
+            job["status"] = JOB_CONCLUIDO
+            job["pdfPath"] = str(destino)
+            job["concluidoEm"] = job["criadoEm"]
+            return self.status_job(job["jobId"])
+
+        if self._fila is None:
+            raise RuntimeError("Fila de PDF não iniciada")
+        self._por_conteudo[conteudo] = job["jobId"]
+        await self._fila.put((job, documento, str(destino)))
+        return self.status_job(job["jobId"])
+
+    async def obter_ou_gerar(self, passagem_id: int):
+        """
+        PDF atual da PS para download
+
+        Returns:
+            (caminho, nome_download, None) se já renderizado;
+            (None, nome_download, job) se precisou enfileirar
+        """
+        documento = await self.montar_documento(passagem_id)
+        nome = self.nome_arquivo(documento)
+        destino = self.caminho_em_cache(passagem_id, documento)
+        if destino.exists():
+            return destino, nome, None
+        return None, nome, await self.gerar(passagem_id, documento)
+
+    def _novo_job(self, passagem_id: int, conteudo: str) -> Dict[str, Any]:
+        self._sequencia += 1
+        job = {
+            "jobId": uuid.uuid4().hex,
+            "passagemId": passagem_id,
+            "hash": conteudo,
+            "status": JOB_NA_FILA,
+            "criadoEm": datetime.now().isoformat(timespec='seconds'),
+            "iniciadoEm": None,
+            "concluidoEm": None,
+            "pdfPath": None,
+            "erro": None,
+            "_seq": self._sequencia,
+        }
+        self._registrar(job)
+        return job
+
+    def _coletar_antigos(self, diretorio: Path, manter: Path) -> List[Path]:
+        """Remove renderizações de conteúdos anteriores da PS (o hash mudou)"""
+        removidos = []
+        for arquivo in diretorio.glob("*.pdf"):
+            if arquivo == manter:
+                continue
+            try:
+                arquivo.unlink()
+                removidos.append(arquivo)
+                logger.info(f"PDF antigo removido: {arquivo}")
+            except OSError as e:
+                logger.warning(f"Não foi possível remover {arquivo}: {e}")
+        return removidos
+
+    def _outro_job_da_ps(self, job: Dict[str, Any]) -> bool:
+        """Há outra renderização da mesma PS em andamento (não coletar ainda)"""
+        return any(
+            self._jobs[j]["passagemId"] == job["passagemId"]
+            for j in self._por_conteudo.values()
+            if j != job["jobId"] and j in self._jobs
+        )
+
+    def status_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Estado público do job (posicao = jobs à frente na fila)"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        publico = {k: v for k, v in job.items() if not k.startswith('_')}
+        publico["posicao"] = max(job["_seq"] - self._em_andamento - 1, 0) if job["status"] == JOB_NA_FILA else 0
+        return publico
+
+    def _registrar(self, job: Dict[str, Any]):
+        self._jobs[job["jobId"]] = job
+        # Descarta os jobs terminados mais antigos
+        while len(self._jobs) > JOBS_HISTORICO_MAX:
+            antigo = next(iter(self._jobs))
+            if self._jobs[antigo]["status"] in (JOB_NA_FILA, JOB_PROCESSANDO):
+                break
+            job = self._jobs.pop(antigo)
+            if self._por_conteudo.get(job["hash"]) == antigo:
+                self._por_conteudo.pop(job["hash"], None)
+
+    async def _worker(self, numero: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            job, documento, destino = await self._fila.get()
+            self._em_andamento = max(self._em_andamento, job["_seq"])
+            job["status"] = JOB_PROCESSANDO
+            job["iniciadoEm"] = datetime.now().isoformat(timespec='seconds')
+            try:
+                caminho = await loop.run_in_executor(
+                    self._executor, renderizar_pdf, documento, destino, caminho_logo()
+                )
+                await db.execute_query(
+                    "UPDATE PASSAGENS SET PdfPath = ? WHERE PassagemId = ?",
+                    [caminho, job["passagemId"]]
+                )
+                job["pdfPath"] = caminho
+                job["status"] = JOB_CONCLUIDO
+                logger.info(f"PDF da PS {job['passagemId']} gerado (worker {numero}): {caminho}")
+                await storage_service.registrar(
+                    caminho, os.path.getsize(caminho), TIPO_PDF, job["passagemId"], job["hash"]
+                )
+                if not self._outro_job_da_ps(job):
+                    removidos = self._coletar_antigos(Path(caminho).parent, Path(caminho))
+                    if removidos:
+                        async with db.transaction() as cursor:
+                            storage_service.remover_tx(cursor, removidos)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                job["status"] = JOB_ERRO
+                job["erro"] = str(e)
+                logger.error(f"Erro ao gerar PDF da PS {job['passagemId']}: {e}")
+            finally:
+                job["concluidoEm"] = datetime.now().isoformat(timespec='seconds')
+                self._por_conteudo.pop(job["hash"], None)
+                self._fila.task_done()
+
+# Instância global do serviço
+pdf_service = PdfService()
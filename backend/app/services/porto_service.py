@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/porto_service.py
+Service Layer para a Seção 1 - PORTO (singulares 1.1 a 1.6 e listas 1.7 a 1.10)
+Gravação por diferença: só escreve linhas/campos que realmente mudaram
+"""
+
+from decimal import Decimal
+from typing import Any, Dict, List, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Chave usada pelo frontend → tabela, campos editáveis, campos booleanos (0/1)
+# e valores padrão devolvidos enquanto a linha da seção ainda não existe
+SECOES_PORTO = {
+    'trocaturma': {
+        'tabela': 'porto_trocaturma',
+        'campos': ['Porto', 'Terminal', 'OrdemServico', 'AtracacaoHora', 'DuracaoMin', 'Observacoes'],
+        'booleanos': [],
+        'padroes': {}
+    },
+    'manutencaoPreventiva': {
+        'tabela': 'porto_manutencaopreventiva',
+        'campos': ['NaoSolicitada', 'FranquiaSolicitadaMin', 'NaoProgramada',
+                   'OrdemServico', 'SaldoFranquiaMin', 'RADEPath', 'Observacoes'],
+        'booleanos': ['NaoSolicitada', 'NaoProgramada'],
+        'padroes': {'NaoSolicitada': 0, 'NaoProgramada': 0}
+    },
+    'abastecimento': {
+        'tabela': 'porto_abastecimento',
+        'campos': ['NaoPrevisto', 'OrdemServico', 'Quantidade_m3', 'DuracaoMin', 'Observacoes', 'AnexoPath'],
+        'booleanos': ['NaoPrevisto'],
+        'padroes': {'NaoPrevisto': 1}
+    },
+    'anvisa': {
+        'tabela': 'porto_anvisa',
+        'campos': ['NaoPrevisto', 'OrdemServico', 'Descricao', 'Observacoes'],
+        'booleanos': ['NaoPrevisto'],
+        'padroes': {'NaoPrevisto': 1}
+    },
+    'classe': {
+        'tabela': 'porto_classe',
+        'campos': ['NaoPrevisto', 'OrdemServico', 'Descricao', 'Observacoes'],
+        'booleanos': ['NaoPrevisto'],
+        'padroes': {'NaoPrevisto': 1}
+    },
+    'inspecoesPetrobras': {
+        'tabela': 'porto_inspecoespetrobras',
+        'campos': ['NaoPrevisto', 'Auditor', 'Gerencia', 'Observacoes'],
+        'booleanos': ['NaoPrevisto'],
+        'padroes': {'NaoPrevisto': 1}
+    },
+}
+
+
+# Listas 1.7 a 1.10: chave do frontend → tabela, coluna de ID, campos editáveis
+# e coluna do flag "não previsto" em PORTO_LISTAS_FLAGS
+LISTAS_PORTO = {
+    'equipes': {
+        'tabela': 'porto_embarqueequipes',
+        'id': 'EmbEqId',
+        'flag': 'EquipesNaoPrevisto',
+        'campos': ['Tipo', 'Empresa', 'Nome', 'Observacoes']
+    },
+    'embarqueMateriais': {
+        'tabela': 'porto_embarquemateriais',
+        'id': 'EmbMatId',
+        'flag': 'EmbMatNaoPrevisto',
+        'campos': ['Origem', 'OS', 'Destino', 'RT', 'Observacoes', 'AnexoPath']
+    },
+    'desembarqueMateriais': {
+        'tabela': 'porto_desembarquemateriais',
+        'id': 'DesembMatId',
+        'flag': 'DesembMatNaoPrevisto',
+        'campos': ['OS', 'Origem', 'Destino', 'RT', 'Observacoes', 'AnexoPath']
+    },
+    'osMobilizacao': {
+        'tabela': 'porto_osmobilizacao',
+        'id': 'OSMobId',
+        'flag': 'OSMobNaoPrevisto',
+        'campos': ['OS', 'Descricao', 'Observacoes', 'AnexoPath']
+    },
+}
+
+# Flags "não previsto" das listas, uma linha por PS (criada no primeiro salvamento)
+TABELA_FLAGS_LISTAS = 'PORTO_LISTAS_FLAGS'
+
+
+def valores_iguais(atual: Any, novo: Any) -> bool:
+    """
+    Compara valor do banco com valor recebido em JSON
+    Na dúvida retorna False (no pior caso grava um campo que não mudou)
+    """
+    if atual in (None, '') and novo in (None, ''):
+        return True
+    if atual is None or novo is None:
+        return False
+
+    if isinstance(atual, (int, float, Decimal)) and not isinstance(atual, bool):
+        try:
+            return float(atual) == float(novo)
+        except (TypeError, ValueError):
+            return False
+
+    if hasattr(atual, 'isoformat'):
+        # date/time do Firebird x texto ISO do frontend ("08:30" == 08:30:00)
+        atual_txt = atual.isoformat()
+        novo_txt = str(novo)
+        return atual_txt == novo_txt or atual_txt.startswith(novo_txt + ':')
+
+    return str(atual) == str(novo)
+
+
+class PortoService:
+    """Service para leitura e gravação das seções do Porto"""
+
+    def normalizar_secao(self, chave: str, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """Filtra campos conhecidos da seção e converte booleanos para 0/1"""
+        secao = SECOES_PORTO[chave]
+        normalizado = {}
+        for campo in secao['campos']:
+            if campo not in dados:
+                continue
+            valor = dados[campo]
+            if campo in secao['booleanos']:
+                valor = 1 if valor else 0
+            normalizado[campo] = valor
+        return normalizado
+
+    def salvar_secoes_parcial(self, cursor, passagem_id: int, porto_data: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        """
+        Grava apenas as seções/campos enviados e que diferem do valor atual,
+        lendo o valor atual no mesmo cursor/transação
+
+        Returns:
+            {chave_secao: [campos gravados]} - vazio se nada mudou
+
+        Raises:
+            ValueError: seção desconhecida
+        """
+        desconhecidas = [chave for chave in porto_data if chave not in SECOES_PORTO]
+        if desconhecidas:
+            raise ValueError(f"Seções desconhecidas: {', '.join(desconhecidas)}")
+
+        alterados = {}
+        for chave, dados in porto_data.items():
+            if not isinstance(dados, dict):
+                raise ValueError(f"Seção '{chave}' deve ser um objeto")
+
+            novos = self.normalizar_secao(chave, dados)
+            if not novos:
+                continue
+
+            tabela = SECOES_PORTO[chave]['tabela']
+            campos = list(novos.keys())
+
+            cursor.execute(
+                f"SELECT {', '.join(campos)} FROM {tabela} WHERE PassagemId = ?",
+                [passagem_id]
+            )
+            row = cursor.fetchone()
+
+            if row is None:
+                # Primeira gravação da seção
+                cursor.execute(
+                    f"INSERT INTO {tabela} (PassagemId, {', '.join(campos)}) "
+                    f"VALUES ({', '.join(['?'] * (len(campos) + 1))})",
+                    [passagem_id] + [novos[c] for c in campos]
+                )
+                alterados[chave] = campos
+                continue
+
+            atuais = dict(zip(campos, row))
+            mudaram = [c for c in campos if not valores_iguais(atuais[c], novos[c])]
+            if not mudaram:
+                continue
+
+            cursor.execute(
+                f"UPDATE {tabela} SET {', '.join(f'{c} = ?' for c in mudaram)} WHERE PassagemId = ?",
+                [novos[c] for c in mudaram] + [passagem_id]
+            )
+            alterados[chave] = mudaram
+
+        if alterados:
+            logger.info(f"PS {passagem_id}: Porto parcial gravado {alterados}")
+        return alterados
+
+    def salvar_lista_diff(self, cursor, passagem_id: int, chave: str,
+                          data: Dict[str, Any]) -> Tuple[List[int], List[str]]:
+        """
+        Salva uma lista 1.7–1.10 comparando as linhas enviadas com as existentes pelo ID:
+        - linha com "Id" existente → UPDATE só dos campos alterados (ou nada)
+        - linha sem "Id" (ou com Id desconhecido) → INSERT ... RETURNING
+        - linha existente não enviada → DELETE (um único comando para todas)
+        naoPrevisto=True remove todas as linhas (o flag é gravado em salvar_flags_listas)
+
+        Returns:
+            (IDs estáveis das linhas na ordem recebida, campos alterados - linha
+            incluída/excluída conta todos; vazio = nada gravado)
+        """
+        lista = LISTAS_PORTO[chave]
+        tabela, col_id, campos = lista['tabela'], lista['id'], lista['campos']
+
+        cursor.execute(
+            f"SELECT {col_id}, {', '.join(campos)} FROM {tabela} WHERE PassagemId = ?",
+            [passagem_id]
+        )
+        existentes = {row[0]: dict(zip(campos, row[1:])) for row in cursor.fetchall()}
+
+        linhas = [] if data.get('naoPrevisto', False) else (data.get('linhas') or [])
+
+        ids = []
+        mantidos = set()
+        alterados = set()
+        sql_insert = (
+            f"INSERT INTO {tabela} (PassagemId, NaoPrevisto, {', '.join(campos)}) "
+            f"VALUES ({', '.join(['?'] * (len(campos) + 2))}) RETURNING {col_id}"
+        )
+        for linha in linhas:
+            linha_id = linha.get('Id')
+            if linha_id in existentes and linha_id not in mantidos:
+                atuais = existentes[linha_id]
+                mudaram = [c for c in campos if not valores_iguais(atuais[c], linha.get(c))]
+                if mudaram:
+                    cursor.execute(
+                        f"UPDATE {tabela} SET {', '.join(f'{c} = ?' for c in mudaram)} "
+                        f"WHERE {col_id} = ? AND PassagemId = ?",
+                        [linha.get(c) for c in mudaram] + [linha_id, passagem_id]
+                    )
+                    alterados.update(mudaram)
+                mantidos.add(linha_id)
+                ids.append(linha_id)
+            else:
+                cursor.execute(sql_insert, [passagem_id, 0] + [linha.get(c) for c in campos])
+                ids.append(cursor.fetchone()[0])
+                alterados.update(campos)
+
+        remover = [i for i in existentes if i not in mantidos]
+        self._excluir_linhas(cursor, tabela, col_id, passagem_id, remover)
+        if remover:
+            alterados.update(campos)
+        return ids, [c for c in campos if c in alterados]
+
+    def salvar_flags_listas(self, cursor, passagem_id: int, listas_data: Dict[str, Any]) -> List[str]:
+        """
+        Grava os flags "não previsto" das listas enviadas que mudaram, em um único
+        UPDATE OR INSERT (flags iguais aos gravados: nenhuma escrita)
+
+        Returns:
+            chaves das listas cujo flag mudou
+        """
+        novos = {
+            chave: 1 if (listas_data.get(chave) or {}).get('naoPrevisto') else 0
+            for chave in LISTAS_PORTO if chave in listas_data
+        }
+        if not novos:
+            return []
+
+        cursor.execute(
+            f"SELECT {', '.join(LISTAS_PORTO[c]['flag'] for c in novos)} "
+            f"FROM {TABELA_FLAGS_LISTAS} WHERE PassagemId = ?",
+            [passagem_id]
+        )
+        row = cursor.fetchone()
+        # Sem linha ainda: o primeiro salvamento grava todos os flags enviados
+        mudaram = [c for i, c in enumerate(novos) if row is None or row[i] != novos[c]]
+        if not mudaram:
+            return []
+
+        flags = {LISTAS_PORTO[c]['flag']: novos[c] for c in mudaram}
+        cursor.execute(
+            f"UPDATE OR INSERT INTO {TABELA_FLAGS_LISTAS} (PassagemId, {', '.join(flags)}) "
+            f"VALUES ({', '.join(['?'] * (len(flags) + 1))}) MATCHING (PassagemId)",
+            [passagem_id] + list(flags.values())
+        )
+        return mudaram
+
+    def carregar_secoes(self, cursor, passagem_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Lê as seções 1.1 a 1.6; seção sem linha (ainda não gravada) volta com
+        os valores padrão - a linha só é criada no primeiro salvamento
+        """
+        result = {}
+        for chave, secao in SECOES_PORTO.items():
+            campos = secao['campos']
+            cursor.execute(
+                f"SELECT {', '.join(campos)} FROM {secao['tabela']} WHERE PassagemId = ?",
+                [passagem_id]
+            )
+            row = cursor.fetchone()
+            if row is None:
+                dados = {campo: None for campo in campos}
+                dados.update(secao['padroes'])
+            else:
+                dados = dict(zip(campos, row))
+            dados['PassagemId'] = passagem_id
+            result[chave] = dados
+        return result
+
+    def carregar_listas(self, cursor, passagem_id: int) -> Dict[str, Dict[str, Any]]:
+        """
+        Lê as listas 1.7 a 1.10 com o ID de cada linha
+        naoPrevisto: flag gravado em PORTO_LISTAS_FLAGS; sem flag, lista vazia = não previsto
+        """
+        cursor.execute(
+            f"SELECT {', '.join(l['flag'] for l in LISTAS_PORTO.values())} "
+            f"FROM {TABELA_FLAGS_LISTAS} WHERE PassagemId = ?",
+            [passagem_id]
+        )
+        row_flags = cursor.fetchone()
+
+        result = {}
+        for i, (chave, lista) in enumerate(LISTAS_PORTO.items()):
+            campos = lista['campos']
+            cursor.execute(
+                f"SELECT {lista['id']}, {', '.join(campos)} FROM {lista['tabela']} "
+                f"WHERE PassagemId = ? ORDER BY {lista['id']}",
+                [passagem_id]
+            )
+            linhas = [dict(zip(['Id'] + campos, row)) for row in cursor.fetchall()]
+
+            flag = row_flags[i] if row_flags else None
+            nao_previsto = flag == 1 if flag is not None else not linhas
+            result[chave] = {"naoPrevisto": nao_previsto, "linhas": [] if nao_previsto else linhas}
+        return result
+
+    def _excluir_linhas(self, cursor, tabela: str, col_id: str, passagem_id: int, ids: List[int]):
+        """DELETE de várias linhas da lista em um único comando"""
+        if not ids:
+            return
+        cursor.execute(
+            f"DELETE FROM {tabela} WHERE PassagemId = ? AND {col_id} IN ({', '.join(['?'] * len(ids))})",
+            [passagem_id] + list(ids)
+        )
+
+# Instância global do serviço
+porto_service = PortoService()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/preview_service.py
+Service Layer para miniaturas e prévias de anexos de imagem
+
+Upload de imagem → original numa fila limitada → workers assíncronos →
+redimensionamento (Pillow) num pool de processos. Os derivados ficam ao lado
+do original (ver anexo_service.caminho_derivado) e, como o original é
+endereçado por hash, são gerados uma única vez por conteúdo.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+import asyncio
+import logging
+import mimetypes
+import os
+
+from app.config.settings import settings
+from app.services.anexo_service import TAMANHOS_PREVIEW, caminho_derivado
+from app.services.storage_service import storage_service, TIPO_DERIVADO
+
+logger = logging.getLogger(__name__)
+
+QUALIDADE_JPEG = 82
+
+# Quantas falhas (arquivo que não é imagem válida) ficam lembradas
+FALHAS_MAX = 500
+
+
+def gerar_derivados(original: str) -> List[str]:
+    """
+    Gera todos os tamanhos de TAMANHOS_PREVIEW em JPEG, do maior para o menor
+    (roda no pool de processos; Pillow importado aqui para não pesar na API)
+    """
+    from PIL import Image, ImageOps
+
+    gerados = []
+    with Image.open(original) as imagem:
+        # JPEG: decodifica já reduzido quando possível (foto de celular → bem mais rápido)
+        imagem.draft("RGB", (max(TAMANHOS_PREVIEW.values()),) * 2)
+        # Fotos de celular: aplica a rotação do EXIF antes de reduzir
+        reduzida = ImageOps.exif_transpose(imagem).convert("RGB")
+
+        for tamanho, lado in sorted(TAMANHOS_PREVIEW.items(), key=lambda t: -t[1]):
+            reduzida.thumbnail((lado, lado))
+            destino = caminho_derivado(Path(original), tamanho)
+            temporario = destino.with_name(f"{destino.name}.{os.getpid()}.tmp")
+            reduzida.save(temporario, "JPEG", quality=QUALIDADE_JPEG, optimize=True)
+            os.replace(temporario, destino)
+            gerados.append(str(destino))
+    return gerados
+
+
+class PreviewService:
+    """Fila de geração de miniaturas com workers e pool de processos"""
+
+    def __init__(self):
+        self._fila: Optional[asyncio.Queue] = None
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._workers: List[asyncio.Task] = []
+        self._pendentes: Set[str] = set()
+        self._falhas: Dict[str, str] = {}  # original → erro
+
+    def iniciar(self):
+        """Cria fila, pool de processos e workers - chamado no startup da aplicação"""
+        if self._fila is not None:
+            return
+        self._fila = asyncio.Queue(maxsize=settings.PREVIEW_FILA_MAX)
+        self._executor = ProcessPoolExecutor(max_workers=settings.PREVIEW_WORKERS)
+        self._workers = [
+            asyncio.create_task(self._worker(n)) for n in range(settings.PREVIEW_WORKERS)
+        ]
+        logger.info(f"Fila de miniaturas iniciada: {settings.PREVIEW_WORKERS} workers, "
+                    f"até {settings.PREVIEW_FILA_MAX} imagens")
+
+    async def parar(self):
+        """Encerra workers e pool - chamado no shutdown (o que faltou é gerado sob demanda)"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        self._fila = None
+        self._pendentes.clear()
+
+    def e_imagem(self, nome: str) -> bool:
+        """Só formatos raster que o Pillow abre (SVG fica de fora)"""
+        tipo = mimetypes.guess_type(nome)[0] or ""
+        return tipo.startswith("image/") and tipo != "image/svg+xml"
+
+    def pronto(self, original: Path, tamanho: str) -> bool:
+        return caminho_derivado(original, tamanho).exists()
+
+    def falha(self, original: Path) -> Optional[str]:
+        """Erro da última tentativa (arquivo corrompido ou que não é imagem)"""
+        return self._falhas.get(str(original))
+
+    def enfileirar(self, original: Path) -> bool:
+        """
+        Agenda a geração dos derivados sem esperar por ela
+
+        Returns:
+            False se a fila está cheia (nada agendado - tenta de novo sob demanda)
+        """
+        chave = str(original)
+        if chave in self._pendentes or chave in self._falhas:
+            return True
+        if all(self.pronto(original, tamanho) for tamanho in TAMANHOS_PREVIEW):
+            return True
+        if self._fila is None or self._fila.full():
+            return False
+        self._pendentes.add(chave)
+        self._fila.put_nowait(chave)
+        return True
+
+    async def _worker(self, numero: int):
+        loop = asyncio.get_running_loop()
+        while True:
+            original = await self._fila.get()
+            try:
+                gerados = await loop.run_in_executor(self._executor, gerar_derivados, original)
+                for derivado in gerados:
+                    await storage_service.registrar(derivado, os.path.getsize(derivado), TIPO_DERIVADO)
+                logger.info(f"Miniaturas geradas (worker {numero}): {original}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if len(self._falhas) >= FALHAS_MAX:
+                    self._falhas.pop(next(iter(self._falhas)))
+                self._falhas[original] = str(e)
+                logger.error(f"Erro ao gerar miniaturas de {original}: {e}")
+            finally:
+                self._pendentes.discard(original)
+                self._fila.task_done()
+
+# Instância global do serviço
+preview_service = PreviewService()
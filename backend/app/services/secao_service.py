@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/secao_service.py
+Service Layer genérico para as seções 4 (Rotina/SMS), 6 (Ordens de Serviço)
+e 7 (Informações Gerais), dirigido pelo registro SECOES
+
+Cada seção declara tabela, modelo Pydantic e se é singular (uma linha por PS)
+ou lista (várias linhas com ItemId). Colunas, tipos SQL (migração 011),
+validação, leitura e gravação por diferença saem do modelo - seção nova é
+uma entrada no registro, não mais um salvar_* escrito à mão.
+
+Leitura e gravação de um grupo acontecem numa transação, com uma consulta
+por tabela; o flag "não ocorreu/nenhuma" das listas fica em
+SECOES_LISTAS_FLAGS (uma linha por PS e seção), como em PORTO_LISTAS_FLAGS.
+"""
+
+from datetime import date, datetime
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple, Type, Union, get_args, get_origin
+import logging
+
+from pydantic import BaseModel
+
+from app.models.rotina import (
+    RotinaIAPO, SMSLVMangueiras, SMSLVSeguranca, SMSAuditoriaHoraSegura, SMSRACQSMS,
+    SMSAIS, SMSPendenciasBROA, SMSAlertas, SmartRDO, SmartRDOOrientacao
+)
+from app.models.os import OSPrevista, OSInterrompida, OSAnotacoesGerais
+from app.models.gerais import (
+    GerenciaContrato, DadosContratadas, MateriaisEquipamentos, TelefonesRamais,
+    ComputadoresHomologados, SenhasAcesso, Acomodacoes
+)
+from app.services.porto_service import valores_iguais
+
+logger = logging.getLogger(__name__)
+
+TABELA_FLAGS_SECOES = 'SECOES_LISTAS_FLAGS'
+
+# Campos do modelo que não são colunas de dados
+CAMPO_PS = 'passagem_id'
+CAMPO_ITEM = 'id'
+COLUNA_ITEM = 'ItemId'
+
+# Texto livre (VARCHAR longo e indexado na busca); senhas e contatos ficam fora da busca
+CAMPOS_TEXTO_LONGO = {'observacoes', 'descricao', 'cc', 'outras_informacoes', 'anotacoes_observacoes'}
+
+TAMANHO_TEXTO_LONGO = 4000
+TAMANHO_TEXTO = 255
+TAMANHO_CAMINHO = 400
+
+
+def _e_anexo(campo: str) -> bool:
+    """Colunas com caminho de arquivo no storage"""
+    return campo.startswith('anexo') or campo.endswith('_imagem')
+
+
+# Grupo (rota /secoes/{grupo}) → título para auditoria
+GRUPOS = {
+    'sms': '4.2 SMS',
+    'rotina': '4 Rotina (IAPO e Smart RDO)',
+    'ordens': '6 Ordens de Serviço',
+    'gerais': '7 Informações Gerais',
+}
+
+# chave do frontend → grupo, título, tabela, modelo, lista ou singular,
+# flag da lista (campo do modelo que vira "naoPrevisto" da seção) e se vai
+# para a PS seguinte na cópia por padrão (dados estáveis da embarcação,
+# orientações do Smart RDO e OS ainda abertas)
+SECOES: Dict[str, Dict[str, Any]] = {
+    'iapo': {'grupo': 'rotina', 'titulo': '4.1 IAPO', 'tabela': 'rotina_iapo',
+             'modelo': RotinaIAPO, 'lista': False},
+    'lvMangueiras': {'grupo': 'sms', 'titulo': '4.2.1 LV Mangueiras', 'tabela': 'sms_lvmangueiras',
+                     'modelo': SMSLVMangueiras, 'lista': False},
+    'lvSeguranca': {'grupo': 'sms', 'titulo': '4.2.2 LV Segurança', 'tabela': 'sms_lvseguranca',
+                    'modelo': SMSLVSeguranca, 'lista': False},
+    'auditoriaHoraSegura': {'grupo': 'sms', 'titulo': '4.2.3 Auditoria Hora Segura',
+                            'tabela': 'sms_auditoriahorasegura', 'modelo': SMSAuditoriaHoraSegura,
+                            'lista': True},
+    'racQsms': {'grupo': 'sms', 'titulo': '4.2.4 RAC QSMS', 'tabela': 'sms_racqsms',
+                'modelo': SMSRACQSMS, 'lista': False},
+    'ais': {'grupo': 'sms', 'titulo': '4.2.5 AIS', 'tabela': 'sms_ais',
+            'modelo': SMSAIS, 'lista': True, 'flag': 'nao_ocorreu_quinzena'},
+    'pendenciasBroa': {'grupo': 'sms', 'titulo': '4.2.6 Pendências BROA', 'tabela': 'sms_pendenciasbroa',
+                       'modelo': SMSPendenciasBROA, 'lista': False},
+    'alertas': {'grupo': 'sms', 'titulo': '4.2.8 Alertas', 'tabela': 'sms_alertas',
+                'modelo': SMSAlertas, 'lista': True, 'flag': 'nao_ocorreu_quinzena'},
+    'smartRdo': {'grupo': 'rotina', 'titulo': '4.3 Smart RDO', 'tabela': 'rotina_smartrdo',
+                 'modelo': SmartRDO, 'lista': False},
+    'smartRdoOrientacoes': {'grupo': 'rotina', 'titulo': '4.3 Smart RDO - Orientações',
+                            'tabela': 'rotina_smartrdo_orientacoes', 'modelo': SmartRDOOrientacao,
+                            'lista': True, 'copiar': True},
+    'osPrevistas': {'grupo': 'ordens', 'titulo': '6.1 OS Previstas', 'tabela': 'os_previstas',
+                    'modelo': OSPrevista, 'lista': True, 'flag': 'nenhuma_os_especifica', 'copiar': True},
+    'osInterrompidas': {'grupo': 'ordens', 'titulo': '6.2 OS Interrompidas', 'tabela': 'os_interrompidas',
+                        'modelo': OSInterrompida, 'lista': True, 'flag': 'nenhuma_os_interrompida',
+                        'copiar': True},
+    'osAnotacoes': {'grupo': 'ordens', 'titulo': '6.3 Anotações e Observações Gerais',
+                    'tabela': 'os_anotacoes', 'modelo': OSAnotacoesGerais, 'lista': False},
+    'gerenciaContrato': {'grupo': 'gerais', 'titulo': '7.1 Gerência de Contrato',
+                         'tabela': 'gerais_gerenciacontrato', 'modelo': GerenciaContrato,
+                         'lista': False, 'copiar': True},
+    'dadosContratadas': {'grupo': 'gerais', 'titulo': '7.2 Dados das Contratadas',
+                         'tabela': 'gerais_dadoscontratadas', 'modelo': DadosContratadas,
+                         'lista': False, 'copiar': True},
+    'materiaisEquipamentos': {'grupo': 'gerais', 'titulo': '7.3 Materiais e Equipamentos a Bordo',
+                              'tabela': 'gerais_materiaisequipamentos', 'modelo': MateriaisEquipamentos,
+                              'lista': True, 'flag': 'nao_ha_materiais', 'copiar': True},
+    'telefonesRamais': {'grupo': 'gerais', 'titulo': '7.4.1 Telefones e Ramais',
+                        'tabela': 'gerais_telefonesramais', 'modelo': TelefonesRamais,
+                        'lista': False, 'copiar': True},
+    'computadoresHomologados': {'grupo': 'gerais', 'titulo': '7.4.3 Computadores Homologados',
+                                'tabela': 'gerais_computadores', 'modelo': ComputadoresHomologados,
+                                'lista': True, 'copiar': True},
+    'senhasAcesso': {'grupo': 'gerais', 'titulo': '7.4.4 Senhas de Acesso',
+                     'tabela': 'gerais_senhasacesso', 'modelo': SenhasAcesso,
+                     'lista': False, 'copiar': True},
+    'acomodacoes': {'grupo': 'gerais', 'titulo': '7.4.5 Acomodações', 'tabela': 'gerais_acomodacoes',
+                    'modelo': Acomodacoes, 'lista': False, 'copiar': True},
+}
+
+
+def _tipo_base(anotacao: Any) -> Any:
+    """Optional[X] → X"""
+    if get_origin(anotacao) is Union:
+        argumentos = [a for a in get_args(anotacao) if a is not type(None)]
+        return argumentos[0] if argumentos else str
+    return anotacao
+
+
+def _e_booleano(modelo: Type[BaseModel], campo: str) -> bool:
+    return _tipo_base(modelo.model_fields[campo].annotation) is bool
+
+
+def campos_secao(chave: str) -> List[str]:
+    """Colunas de dados da seção, na ordem do modelo (sem PS, ID da linha e flag da lista)"""
+    secao = SECOES[chave]
+    return [
+        campo for campo in secao['modelo'].model_fields
+        if campo not in (CAMPO_PS, CAMPO_ITEM) and campo != secao.get('flag')
+    ]
+
+
+def campos_texto(chave: str) -> List[str]:
+    return [c for c in campos_secao(chave) if c in CAMPOS_TEXTO_LONGO]
+
+
+def campos_anexo(chave: str) -> List[str]:
+    return [c for c in campos_secao(chave) if _e_anexo(c)]
+
+
+def tipo_sql(modelo: Type[BaseModel], campo: str) -> str:
+    """Tipo Firebird da coluna a partir da anotação do campo no modelo"""
+    tipo = _tipo_base(modelo.model_fields[campo].annotation)
+    if isinstance(tipo, type) and issubclass(tipo, Enum):
+        return f"VARCHAR({max(len(m.value) for m in tipo)})"
+    if tipo is bool:
+        return "SMALLINT"
+    if tipo is int:
+        return "INTEGER"
+    if tipo is datetime:
+        return "TIMESTAMP"
+    if tipo is date:
+        return "DATE"
+    if campo in CAMPOS_TEXTO_LONGO:
+        return f"VARCHAR({TAMANHO_TEXTO_LONGO})"
+    if _e_anexo(campo):
+        return f"VARCHAR({TAMANHO_CAMINHO})"
+    return f"VARCHAR({TAMANHO_TEXTO})"
+
+
+def ddl_secoes() -> List[Tuple[str, str]]:
+    """CREATE TABLE de cada seção do registro: [(tabela, sql)] - usado pela migração 011"""
+    comandos = []
+    for chave, secao in SECOES.items():
+        tabela, modelo = secao['tabela'], secao['modelo']
+        colunas = [f"{campo} {tipo_sql(modelo, campo)}" for campo in campos_secao(chave)]
+        if secao['lista']:
+            chave_primaria = [
+                f"{COLUNA_ITEM} INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY",
+                "PassagemId INTEGER NOT NULL",
+            ]
+        else:
+            chave_primaria = ["PassagemId INTEGER NOT NULL PRIMARY KEY"]
+        definicoes = chave_primaria + colunas + [
+            f"CONSTRAINT FK_{tabela.upper()}_PAS FOREIGN KEY (PassagemId) "
+            f"REFERENCES PASSAGENS (PassagemId) ON DELETE CASCADE"
+        ]
+        comandos.append((tabela, f"CREATE TABLE {tabela} (\n    " + ",\n    ".join(definicoes) + "\n)"))
+    return comandos
+
+
+def _valor_banco(valor: Any) -> Any:
+    if isinstance(valor, Enum):
+        return valor.value
+    if isinstance(valor, bool):
+        return 1 if valor else 0
+    return valor
+
+
+class SecaoService:
+    """Leitura e gravação genéricas das seções do registro"""
+
+    def secoes_grupo(self, grupo: str) -> List[str]:
+        """
+        Raises:
+            ValueError: grupo desconhecido
+        """
+        if grupo not in GRUPOS:
+            raise ValueError(f"Grupo de seções desconhecido: {grupo}")
+        return [chave for chave, secao in SECOES.items() if secao['grupo'] == grupo]
+
+    def padroes(self, chave: str) -> Dict[str, Any]:
+        """Valores da seção ainda não gravada (padrões do modelo)"""
+        modelo = SECOES[chave]['modelo']
+        dados = {}
+        for campo in campos_secao(chave):
+            info = modelo.model_fields[campo]
+            valor = None if info.is_required() else info.default
+            dados[campo] = valor.value if isinstance(valor, Enum) else valor
+        return dados
+
+    def _da_linha(self, chave: str, campos: List[str], valores) -> Dict[str, Any]:
+        modelo = SECOES[chave]['modelo']
+        dados = {}
+        for campo, valor in zip(campos, valores):
+            if valor is not None and _e_booleano(modelo, campo):
+                valor = bool(valor)
+            dados[campo] = valor
+        return dados
+
+    def carregar_grupo(self, cursor, passagem_id: int, grupo: str) -> Dict[str, Any]:
+        """
+        Todas as seções do grupo: singular → objeto (padrões se ainda não gravada),
+        lista → {"naoPrevisto", "linhas"} com "id" em cada linha
+        Uma consulta por tabela + uma para os flags das listas
+        """
+        chaves = self.secoes_grupo(grupo)
+        flags = self._carregar_flags(cursor, passagem_id, [c for c in chaves if SECOES[c]['lista']])
+
+        result = {}
+        for chave in chaves:
+            secao = SECOES[chave]
+            campos = campos_secao(chave)
+            if secao['lista']:
+                cursor.execute(
+                    f"SELECT {COLUNA_ITEM}, {', '.join(campos)} FROM {secao['tabela']} "
+                    f"WHERE PassagemId = ? ORDER BY {COLUNA_ITEM}",
+                    [passagem_id]
+                )
+                linhas = [
+                    {CAMPO_ITEM: row[0], **self._da_linha(chave, campos, row[1:])}
+                    for row in cursor.fetchall()
+                ]
+                nao_previsto = flags.get(chave, False)
+                result[chave] = {"naoPrevisto": nao_previsto, "linhas": [] if nao_previsto else linhas}
+            else:
+                cursor.execute(
+                    f"SELECT {', '.join(campos)} FROM {secao['tabela']} WHERE PassagemId = ?",
+                    [passagem_id]
+                )
+                row = cursor.fetchone()
+                dados = self.padroes(chave) if row is None else self._da_linha(chave, campos, row)
+                dados[CAMPO_PS] = passagem_id
+                result[chave] = dados
+        return result
+
+    def _carregar_flags(self, cursor, passagem_id: int, chaves: List[str]) -> Dict[str, bool]:
+        if not chaves:
+            return {}
+        cursor.execute(
+            f"SELECT Secao, NaoPrevisto FROM {TABELA_FLAGS_SECOES} "
+            f"WHERE PassagemId = ? AND Secao IN ({', '.join(['?'] * len(chaves))})",
+            [passagem_id] + chaves
+        )
+        return {row[0].strip(): row[1] == 1 for row in cursor.fetchall()}
+
+    def validar(self, chave: str, passagem_id: int, dados: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Valida pelo modelo da seção e devolve os valores no formato do banco
+
+        Raises:
+            ValueError: dados inválidos (pydantic.ValidationError também é ValueError)
+        """
+        if not isinstance(dados, dict):
+            raise ValueError(f"Seção '{chave}': cada item deve ser um objeto")
+        secao = SECOES[chave]
+        entrada = {k: v for k, v in dados.items() if k != CAMPO_ITEM}
+        entrada[CAMPO_PS] = passagem_id
+        if secao.get('flag'):
+            entrada.setdefault(secao['flag'], False)
+        modelo = secao['modelo'](**entrada)
+        return {campo: _valor_banco(getattr(modelo, campo)) for campo in campos_secao(chave)}
+
+    def salvar_grupo(self, cursor, passagem_id: int, grupo: str,
+                     dados_grupo: Dict[str, Any]) -> Tuple[Dict[str, List[str]], Dict[str, List[int]]]:
+        """
+        Grava as seções enviadas do grupo por diferença, no cursor/transação recebido
+        Seção ausente no corpo não é tocada; seção enviada é gravada inteira
+
+        Returns:
+            ({chave: campos/linhas alterados}, {chave da lista: IDs das linhas na ordem recebida})
+
+        Raises:
+            ValueError: seção desconhecida ou dados inválidos
+        """
+        chaves = self.secoes_grupo(grupo)
+        desconhecidas = [c for c in dados_grupo if c not in chaves]
+        if desconhecidas:
+            raise ValueError(f"Seções desconhecidas no grupo {grupo}: {', '.join(desconhecidas)}")
+
+        # Valida tudo antes de escrever qualquer coisa
+        validados: Dict[str, Any] = {}
+        for chave, dados in dados_grupo.items():
+            if SECOES[chave]['lista']:
+                dados = dados or {}
+                nao_previsto = bool(dados.get('naoPrevisto', False))
+                linhas = [] if nao_previsto else (dados.get('linhas') or [])
+                validados[chave] = (
+                    nao_previsto,
+                    [(linha.get(CAMPO_ITEM) if isinstance(linha, dict) else None,
+                      self.validar(chave, passagem_id, linha)) for linha in linhas]
+                )
+            else:
+                validados[chave] = self.validar(chave, passagem_id, dados or {})
+
+        alterados: Dict[str, List[str]] = {}
+        ids: Dict[str, List[int]] = {}
+        flags = []
+        flags_atuais = self._carregar_flags(
+            cursor, passagem_id, [c for c in validados if SECOES[c]['lista']]
+        )
+        for chave, valores in validados.items():
+            if SECOES[chave]['lista']:
+                nao_previsto, linhas = valores
+                ids[chave], mudou = self._salvar_lista(cursor, passagem_id, chave, linhas)
+                mudancas = ['linhas'] if mudou else []
+                if nao_previsto != flags_atuais.get(chave, False):
+                    mudancas.append('naoPrevisto')
+                    flags.append((passagem_id, chave, 1 if nao_previsto else 0))
+                if mudancas:
+                    alterados[chave] = mudancas
+            else:
+                mudaram = self._salvar_singular(cursor, passagem_id, chave, valores)
+                if mudaram:
+                    alterados[chave] = mudaram
+
+        if flags:
+            cursor.executemany(
+                f"UPDATE OR INSERT INTO {TABELA_FLAGS_SECOES} (PassagemId, Secao, NaoPrevisto) "
+                "VALUES (?, ?, ?) MATCHING (PassagemId, Secao)",
+                flags
+            )
+
+        if alterados:
+            logger.info(f"PS {passagem_id}: seções {grupo} gravadas {alterados}")
+        return alterados, ids
+
+    def _salvar_singular(self, cursor, passagem_id: int, chave: str, novos: Dict[str, Any]) -> List[str]:
+        tabela = SECOES[chave]['tabela']
+        campos = list(novos)
+        cursor.execute(f"SELECT {', '.join(campos)} FROM {tabela} WHERE PassagemId = ?", [passagem_id])
+        row = cursor.fetchone()
+
+        if row is None:
+            cursor.execute(
+                f"INSERT INTO {tabela} (PassagemId, {', '.join(campos)}) "
+                f"VALUES ({', '.join(['?'] * (len(campos) + 1))})",
+                [passagem_id] + [novos[c] for c in campos]
+            )
+            return campos
+
+        mudaram = [c for c, atual in zip(campos, row) if not valores_iguais(atual, novos[c])]
+        if mudaram:
+            cursor.execute(
+                f"UPDATE {tabela} SET {', '.join(f'{c} = ?' for c in mudaram)} WHERE PassagemId = ?",
+                [novos[c] for c in mudaram] + [passagem_id]
+            )
+        return mudaram
+
+    def _salvar_lista(self, cursor, passagem_id: int, chave: str,
+                      linhas: List[Tuple[Optional[int], Dict[str, Any]]]) -> Tuple[List[int], bool]:
+        """
+        Diff por ItemId (mesma regra de porto_service.salvar_lista_diff): linhas
+        alteradas num único executemany, novas com INSERT ... RETURNING, as que
+        não vieram num único DELETE
+        """
+        tabela = SECOES[chave]['tabela']
+        campos = campos_secao(chave)
+
+        cursor.execute(
+            f"SELECT {COLUNA_ITEM}, {', '.join(campos)} FROM {tabela} WHERE PassagemId = ?",
+            [passagem_id]
+        )
+        existentes = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        ids = []
+        mantidos = set()
+        atualizar = []
+        sql_insert = (
+            f"INSERT INTO {tabela} (PassagemId, {', '.join(campos)}) "
+            f"VALUES ({', '.join(['?'] * (len(campos) + 1))}) RETURNING {COLUNA_ITEM}"
+        )
+        for item_id, novos in linhas:
+            if item_id in existentes and item_id not in mantidos:
+                atuais = existentes[item_id]
+                if any(not valores_iguais(a, novos[c]) for c, a in zip(campos, atuais)):
+                    atualizar.append([novos[c] for c in campos] + [item_id, passagem_id])
+                mantidos.add(item_id)
+                ids.append(item_id)
+            else:
+                cursor.execute(sql_insert, [passagem_id] + [novos[c] for c in campos])
+                ids.append(cursor.fetchone()[0])
+
+        if atualizar:
+            cursor.executemany(
+                f"UPDATE {tabela} SET {', '.join(f'{c} = ?' for c in campos)} "
+                f"WHERE {COLUNA_ITEM} = ? AND PassagemId = ?",
+                atualizar
+            )
+
+        remover = [i for i in existentes if i not in mantidos]
+        if remover:
+            cursor.execute(
+                f"DELETE FROM {tabela} WHERE PassagemId = ? AND {COLUNA_ITEM} IN ({', '.join(['?'] * len(remover))})",
+                [passagem_id] + remover
+            )
+
+        mudou = bool(atualizar or remover or len(ids) > len(mantidos))
+        return ids, mudou
+
+# Instância global do serviço
+secao_service = SecaoService()
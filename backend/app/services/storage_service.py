@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/services/storage_service.py
+Service Layer para o índice do storage (STORAGE_INDEX) e a varredura de órfãos
+
+Cada arquivo gravado em STORAGE_DIR (blob de anexo, miniatura, PDF, anexo
+legado da PS) tem uma linha em STORAGE_INDEX com caminho relativo, tamanho,
+hash e PS dona. O índice é mantido na gravação/exclusão e responde o
+relatório de espaço sem percorrer o disco.
+
+A varredura agendada (STORAGE_VARREDURA_HORAS) reconcilia índice, banco e
+disco em lotes de LOTE_VARREDURA:
+1. referências/anexos legados que nenhuma seção da PS aponta mais;
+2. blobs sem referência (anexo_service.coletar_orfaos);
+3. diretórios de PS excluídas, temporários abandonados, arquivos fora do
+   índice (entram no índice ou, se órfãos, são removidos) e linhas do índice
+   sem arquivo.
+Nada mais novo que STORAGE_CARENCIA_HORAS é removido (upload ainda não salvo na seção).
+"""
+
+from datetime import datetime
+from pathlib import Path, PureWindowsPath
+from typing import Any, Dict, Iterable, List, Optional, Set
+import asyncio
+import logging
+import os
+import shutil
+import time
+
+from app.config.database import db
+from app.config.settings import settings
+from app.services.porto_service import SECOES_PORTO, LISTAS_PORTO
+from app.services.secao_service import SECOES, campos_anexo
+
+logger = logging.getLogger(__name__)
+
+# Tipos de arquivo no índice
+TIPO_BLOB = "blob"          # conteúdo de anexo (STORAGE_DIR/blobs/ab/hash)
+TIPO_DERIVADO = "derivado"  # miniatura/prévia ao lado do original
+TIPO_PDF = "pdf"            # STORAGE_DIR/PS/{id}/pdf/{hash}.pdf
+TIPO_LEGADO = "legado"      # anexo anterior ao storage por hash (STORAGE_DIR/PS/{id}/...)
+
+LOTE_VARREDURA = 500
+
+# Atraso da primeira varredura após o startup (não disputa a inicialização)
+ATRASO_PRIMEIRA_VARREDURA_SEG = 300
+
+# Colunas das seções do Porto e do registro (4/6/7) que guardam o caminho de um anexo
+COLUNAS_ANEXO = [
+    (secao['tabela'], campo)
+    for secao in list(SECOES_PORTO.values()) + list(LISTAS_PORTO.values())
+    for campo in secao['campos']
+    if campo in ('AnexoPath', 'RADEPath')
+] + [
+    (secao['tabela'], campo) for chave, secao in SECOES.items() for campo in campos_anexo(chave)
+]
+
+
+def _marcadores(quantidade: int) -> str:
+    return ", ".join("?" * quantidade)
+
+
+def _lotes(itens: List[Any], tamanho: int = LOTE_VARREDURA) -> Iterable[List[Any]]:
+    for i in range(0, len(itens), tamanho):
+        yield itens[i:i + tamanho]
+
+
+def _percorrer(raiz: str) -> List[tuple]:
+    """Lista (caminho relativo, tamanho, mtime) de todos os arquivos - roda fora do loop"""
+    arquivos = []
+    for diretorio, _, nomes in os.walk(raiz):
+        for nome in nomes:
+            caminho = os.path.join(diretorio, nome)
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                continue
+            relativo = os.path.relpath(caminho, raiz).replace(os.sep, "/")
+            arquivos.append((relativo, info.st_size, info.st_mtime))
+    return arquivos
+
+
+class StorageService:
+    """Índice do storage, varredura de órfãos e relatório de espaço"""
+
+    def __init__(self):
+        self._tarefa: Optional[asyncio.Task] = None
+        self._varrendo = asyncio.Lock()
+        self.ultima_varredura: Optional[Dict[str, Any]] = None
+
+    # === ÍNDICE ===
+
+    def raiz(self) -> Path:
+        return Path(settings.STORAGE_DIR).resolve()
+
+    def caminho_relativo(self, caminho) -> str:
+        """Chave do índice: caminho relativo a STORAGE_DIR, sempre com '/'"""
+        caminho = Path(caminho).resolve()
+        try:
+            return caminho.relative_to(self.raiz()).as_posix()
+        except ValueError:
+            return caminho.as_posix()
+
+    def registrar_tx(self, cursor, caminho, tamanho: int, tipo: str,
+                     passagem_id: Optional[int] = None, sha256: Optional[str] = None):
+        """Inclui/atualiza o arquivo no índice, na transação do chamador"""
+        cursor.execute(
+            "UPDATE OR INSERT INTO STORAGE_INDEX (Caminho, Tipo, Tamanho, Hash, PassagemId, AtualizadoEm) "
+            "VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP) MATCHING (Caminho)",
+            [self.caminho_relativo(caminho), tipo, tamanho, sha256, passagem_id]
+        )
+
+    async def registrar(self, caminho, tamanho: int, tipo: str,
+                        passagem_id: Optional[int] = None, sha256: Optional[str] = None):
+        """Mesmo que registrar_tx, numa transação própria (falha só é logada)"""
+        try:
+            async with db.transaction() as cursor:
+                self.registrar_tx(cursor, caminho, tamanho, tipo, passagem_id, sha256)
+        except Exception as e:
+            logger.error(f"Erro ao indexar {caminho}: {e}")
+
+    def remover_tx(self, cursor, caminhos: Iterable):
+        """Tira os arquivos do índice, na transação do chamador"""
+        for lote in _lotes([self.caminho_relativo(c) for c in caminhos]):
+            cursor.execute(
+                f"DELETE FROM STORAGE_INDEX WHERE Caminho IN ({_marcadores(len(lote))})", lote
+            )
+
+    async def limpar_passagem(self, passagem_id: int):
+        """
+        PS excluída (BackgroundTask, depois do DELETE confirmado): remove o diretório
+        da PS, as linhas do índice da PS e os blobs que ficaram sem referência
+        """
+        from app.services.anexo_service import anexo_service
+        from app.services.passagem_service import passagem_service
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, passagem_service.remover_diretorio_anexos, passagem_id)
+        try:
+            await db.execute_query("DELETE FROM STORAGE_INDEX WHERE PassagemId = ?", [passagem_id])
+        except Exception as e:
+            logger.error(f"Erro ao limpar índice da PS {passagem_id}: {e}")
+        await anexo_service.coletar_orfaos()
+
+    # === VARREDURA ===
+
+    def iniciar(self):
+        """Agenda a varredura periódica - chamado no startup da aplicação"""
+        if self._tarefa is None and settings.STORAGE_VARREDURA_HORAS > 0:
+            self._tarefa = asyncio.create_task(self._agendar())
+
+    async def parar(self):
+        if self._tarefa:
+            self._tarefa.cancel()
+            await asyncio.gather(self._tarefa, return_exceptions=True)
+            self._tarefa = None
+
+    async def _agendar(self):
+        await asyncio.sleep(ATRASO_PRIMEIRA_VARREDURA_SEG)
+        while True:
+            try:
+                await self.varrer()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na varredura do storage: {e}")
+            await asyncio.sleep(settings.STORAGE_VARREDURA_HORAS * 3600)
+
+    async def varrer(self) -> Dict[str, Any]:
+        """
+        Reconcilia índice, banco e disco (uma varredura por vez)
+
+        Returns:
+            resumo com contagens e bytes liberados
+        """
+        from app.services.anexo_service import anexo_service
+
+        async with self._varrendo:
+            inicio = time.monotonic()
+            limite = time.time() - settings.STORAGE_CARENCIA_HORAS * 3600
+            resumo = {"referenciasRemovidas": 0, "legadosRemovidos": 0, "blobsRemovidos": 0,
+                      "diretoriosRemovidos": 0, "arquivosRemovidos": 0, "indexados": 0,
+                      "indiceLimpo": 0, "bytesLiberados": 0}
+
+            await self._podar_nao_referenciados(limite, resumo)
+            resumo["blobsRemovidos"] = len(await anexo_service.coletar_orfaos())
+            await self._reconciliar_disco(limite, resumo)
+
+            resumo["duracaoSeg"] = round(time.monotonic() - inicio, 2)
+            resumo["concluidaEm"] = datetime.now().isoformat(timespec='seconds')
+            self.ultima_varredura = resumo
+            logger.info(f"Varredura do storage concluída: {resumo}")
+            return resumo
+
+    async def _nomes_referenciados(self, passagem_ids: List[int]) -> Dict[int, Set[str]]:
+        """Nome final (arquivo/hash) de todo caminho de anexo gravado nas seções das PS"""
+        nomes: Dict[int, Set[str]] = {pid: set() for pid in passagem_ids}
+        for tabela, coluna in COLUNAS_ANEXO:
+            rows = await db.execute_query(
+                f"SELECT PassagemId, {coluna} FROM {tabela} "
+                f"WHERE PassagemId IN ({_marcadores(len(passagem_ids))}) AND {coluna} IS NOT NULL",
+                passagem_ids
+            )
+            for passagem_id, caminho in rows:
+                # Caminhos gravados pelo cliente podem ter '\\' (Windows) ou '/'
+                nomes[passagem_id].add(PureWindowsPath(caminho.strip()).name)
+        return nomes
+
+    async def _podar_nao_referenciados(self, limite: float, resumo: Dict[str, Any]):
+        """Anexos (referência a blob ou arquivo legado) que nenhuma seção da PS usa mais"""
+        corte = datetime.fromtimestamp(limite)
+        ultimo_id = 0
+        while True:
+            rows = await db.execute_query(
+                f"SELECT FIRST {LOTE_VARREDURA} PassagemId FROM PASSAGENS "
+                "WHERE PassagemId > ? ORDER BY PassagemId",
+                [ultimo_id]
+            )
+            if not rows:
+                break
+            passagem_ids = [row[0] for row in rows]
+            ultimo_id = passagem_ids[-1]
+            marcadores = _marcadores(len(passagem_ids))
+
+            refs = await db.execute_query(
+                f"SELECT AnexoId, PassagemId, Hash, Filename FROM ANEXOS_REFS "
+                f"WHERE PassagemId IN ({marcadores}) AND CriadoEm < ?",
+                passagem_ids + [corte]
+            )
+            legados = await db.execute_query(
+                f"SELECT Caminho, PassagemId, Tamanho FROM STORAGE_INDEX "
+                f"WHERE PassagemId IN ({marcadores}) AND Tipo = ? AND AtualizadoEm < ?",
+                passagem_ids + [TIPO_LEGADO, corte]
+            )
+            if not refs and not legados:
+                continue
+
+            usados = await self._nomes_referenciados(passagem_ids)
+
+            refs_mortas = [
+                anexo_id for anexo_id, passagem_id, sha256, filename in refs
+                if sha256.strip() not in usados[passagem_id] and filename not in usados[passagem_id]
+            ]
+            legados_mortos = [
+                (caminho, tamanho) for caminho, passagem_id, tamanho in legados
+                if PureWindowsPath(caminho).name not in usados[passagem_id]
+            ]
+
+            if refs_mortas:
+                # Triggers de ANEXOS_REFS decrementam Refs; blob zerado sai na coleta de órfãos
+                async with db.transaction() as cursor:
+                    for lote in _lotes(refs_mortas):
+                        cursor.execute(
+                            f"DELETE FROM ANEXOS_REFS WHERE AnexoId IN ({_marcadores(len(lote))})", lote
+                        )
+                resumo["referenciasRemovidas"] += len(refs_mortas)
+
+            if legados_mortos:
+                for caminho, tamanho in legados_mortos:
+                    await self._remover_arquivo(self.raiz() / caminho)
+                    resumo["bytesLiberados"] += tamanho or 0
+                async with db.transaction() as cursor:
+                    self.remover_tx(cursor, [self.raiz() / c for c, _ in legados_mortos])
+                resumo["legadosRemovidos"] += len(legados_mortos)
+
+    async def _reconciliar_disco(self, limite: float, resumo: Dict[str, Any]):
+        """Disco × índice × banco: um único percurso do storage, decisões em lote"""
+        raiz = self.raiz()
+        if not raiz.exists():
+            return
+
+        loop = asyncio.get_running_loop()
+        arquivos = await loop.run_in_executor(None, _percorrer, str(raiz))
+        no_disco = {caminho: (tamanho, mtime) for caminho, tamanho, mtime in arquivos}
+
+        indexados = {row[0].strip() for row in await db.execute_query("SELECT Caminho FROM STORAGE_INDEX")}
+
+        # Diretórios de PS que não existem mais no banco (exclusões antigas)
+        ids_no_disco = sorted({
+            int(partes[1]) for partes in (c.split("/") for c in no_disco)
+            if len(partes) > 2 and partes[0] == "PS" and partes[1].isdigit()
+        })
+        ps_existentes: Set[int] = set()
+        for lote in _lotes(ids_no_disco):
+            rows = await db.execute_query(
+                f"SELECT PassagemId FROM PASSAGENS WHERE PassagemId IN ({_marcadores(len(lote))})", lote
+            )
+            ps_existentes.update(row[0] for row in rows)
+        for passagem_id in ids_no_disco:
+            if passagem_id not in ps_existentes:
+                diretorio = raiz / "PS" / str(passagem_id)
+                resumo["bytesLiberados"] += sum(
+                    t for c, (t, _) in no_disco.items() if c.startswith(f"PS/{passagem_id}/")
+                )
+                await loop.run_in_executor(None, shutil.rmtree, diretorio, True)
+                resumo["diretoriosRemovidos"] += 1
+                no_disco = {c: v for c, v in no_disco.items() if not c.startswith(f"PS/{passagem_id}/")}
+
+        # Blobs e derivados: conteúdo sem linha em ANEXOS_BLOBS é órfão
+        hashes_no_disco = sorted({
+            Path(c).name for c in no_disco
+            if c.startswith("blobs/") and not c.startswith("blobs/tmp/") and not Path(c).name.startswith(".")
+        })
+        hashes_validos: Set[str] = set()
+        for lote in _lotes(hashes_no_disco):
+            rows = await db.execute_query(
+                f"SELECT Hash FROM ANEXOS_BLOBS WHERE Hash IN ({_marcadores(len(lote))})", lote
+            )
+            hashes_validos.update(row[0].strip() for row in rows)
+
+        novos = []
+        for caminho, (tamanho, mtime) in no_disco.items():
+            tipo, passagem_id, sha256 = self._classificar(caminho)
+            orfao = caminho.startswith("blobs/tmp/") or (
+                caminho.startswith("blobs/") and sha256 not in hashes_validos
+            )
+            if orfao:
+                if mtime < limite:
+                    await self._remover_arquivo(raiz / caminho)
+                    resumo["arquivosRemovidos"] += 1
+                    resumo["bytesLiberados"] += tamanho
+                continue
+            if caminho not in indexados:
+                novos.append((raiz / caminho, tamanho, tipo, passagem_id, sha256))
+
+        for lote in _lotes(novos):
+            async with db.transaction() as cursor:
+                for caminho, tamanho, tipo, passagem_id, sha256 in lote:
+                    self.registrar_tx(cursor, caminho, tamanho, tipo, passagem_id, sha256)
+            resumo["indexados"] += len(lote)
+
+        # Linhas do índice cujo arquivo sumiu do disco
+        sumidos = [raiz / c for c in indexados if c not in no_disco]
+        if sumidos:
+            async with db.transaction() as cursor:
+                self.remover_tx(cursor, sumidos)
+            resumo["indiceLimpo"] += len(sumidos)
+
+    def _classificar(self, caminho: str):
+        """(tipo, PassagemId, hash) a partir do caminho relativo"""
+        partes = caminho.split("/")
+        nome = partes[-1]
+        if partes[0] == "blobs":
+            if nome.startswith("."):
+                # .{hash}.{tamanho}.jpg
+                return TIPO_DERIVADO, None, nome[1:].split(".")[0]
+            return TIPO_BLOB, None, nome
+        if partes[0] == "PS" and len(partes) > 2 and partes[1].isdigit():
+            passagem_id = int(partes[1])
+            if nome.startswith("."):
+                return TIPO_DERIVADO, passagem_id, None
+            if len(partes) > 3 and partes[2] == "pdf":
+                return TIPO_PDF, passagem_id, Path(nome).stem
+            return TIPO_LEGADO, passagem_id, None
+        return TIPO_LEGADO, None, None
+
+    async def _remover_arquivo(self, caminho: Path):
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, os.remove, caminho)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"Erro ao remover {caminho}: {e}")
+
+    # === RELATÓRIO ===
+
+    async def relatorio(self) -> Dict[str, Any]:
+        """Espaço ocupado por tipo, maiores PS e economia da deduplicação (só consulta o índice)"""
+        por_tipo = await db.execute_query(
+            "SELECT Tipo, COUNT(*), COALESCE(SUM(Tamanho), 0) FROM STORAGE_INDEX GROUP BY Tipo"
+        )
+        maiores = await db.execute_query("""
+            SELECT FIRST 20 PassagemId, SUM(Arquivos), SUM(Bytes) FROM (
+                SELECT PassagemId, COUNT(*) AS Arquivos, SUM(Tamanho) AS Bytes
+                FROM STORAGE_INDEX WHERE PassagemId IS NOT NULL GROUP BY PassagemId
+                UNION ALL
+                SELECT r.PassagemId, COUNT(*), SUM(b.Tamanho)
+                FROM ANEXOS_REFS r JOIN ANEXOS_BLOBS b ON b.Hash = r.Hash GROUP BY r.PassagemId
+            ) t GROUP BY PassagemId ORDER BY 3 DESC
+        """)
+        dedup = await db.execute_query("""
+            SELECT (SELECT COALESCE(SUM(b.Tamanho), 0) FROM ANEXOS_REFS r JOIN ANEXOS_BLOBS b ON b.Hash = r.Hash),
+                   (SELECT COALESCE(SUM(Tamanho), 0) FROM ANEXOS_BLOBS)
+            FROM RDB$DATABASE
+        """)
+        logico, fisico = dedup[0]
+
+        tipos = {tipo.strip(): {"arquivos": arquivos, "bytes": int(total)} for tipo, arquivos, total in por_tipo}
+        return {
+            "totalBytes": sum(t["bytes"] for t in tipos.values()),
+            "porTipo": tipos,
+            "maioresPassagens": [
+                {"PassagemId": pid, "arquivos": int(arquivos), "bytes": int(total or 0)}
+                for pid, arquivos, total in maiores
+            ],
+            "deduplicacao": {
+                "bytesReferenciados": int(logico),
+                "bytesArmazenados": int(fisico),
+                "bytesEconomizados": int(logico) - int(fisico)
+            },
+            "ultimaVarredura": self.ultima_varredura
+        }
+
+# Instância global do serviço
+storage_service = StorageService()
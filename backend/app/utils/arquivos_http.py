@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/arquivos_http.py
+Utilitários para servir arquivos do storage - Range (206), ETag forte e
+Content-Disposition
+
+Só um intervalo por requisição (bytes=a-b, bytes=a-, bytes=-n); pedidos com
+vários intervalos recebem o arquivo inteiro, como o RFC 9110 permite.
+"""
+
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote
+
+import aiofiles
+from fastapi import Request, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+
+from app.utils.cache_http import cabecalhos_cache, etag_confere, resposta_nao_modificada
+
+BLOCO_LEITURA = 256 * 1024
+
+
+class IntervaloInvalido(ValueError):
+    """Range fora do tamanho do arquivo (416)"""
+
+
+def intervalo_range(cabecalho: Optional[str], tamanho: int) -> Optional[Tuple[int, int]]:
+    """
+    Interpreta o cabeçalho Range
+
+    Returns:
+        (inicio, fim) inclusivos, ou None para servir o arquivo inteiro
+
+    Raises:
+        IntervaloInvalido: intervalo sintaticamente válido mas não satisfazível
+    """
+    if not cabecalho or not cabecalho.startswith("bytes=") or "," in cabecalho:
+        return None
+
+    inicio_txt, _, fim_txt = cabecalho[len("bytes="):].strip().partition("-")
+    try:
+        if inicio_txt == "":
+            # Sufixo: últimos n bytes
+            sufixo = int(fim_txt)
+            if sufixo <= 0 or tamanho == 0:
+                raise IntervaloInvalido(cabecalho)
+            return max(tamanho - sufixo, 0), tamanho - 1
+        inicio = int(inicio_txt)
+        fim = int(fim_txt) if fim_txt else tamanho - 1
+    except IntervaloInvalido:
+        raise
+    except ValueError:
+        return None
+
+    if fim_txt and inicio > fim:
+        return None
+    if inicio >= tamanho:
+        raise IntervaloInvalido(cabecalho)
+    return inicio, min(fim, tamanho - 1)
+
+
+def content_disposition(nome: str) -> str:
+    """inline com nome ASCII de reserva e filename* UTF-8 (RFC 6266)"""
+    reserva = nome.encode("ascii", "replace").decode("ascii").replace('"', "_").replace("?", "_")
+    return f"inline; filename=\"{reserva}\"; filename*=utf-8''{quote(nome)}"
+
+
+async def _ler_intervalo(caminho: Path, inicio: int, fim: int):
+    async with aiofiles.open(caminho, "rb") as f:
+        await f.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = await f.read(min(BLOCO_LEITURA, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def resposta_arquivo(request: Request, caminho: Path, tamanho: int, etag: str,
+                     nome: str, media_type: str = "application/octet-stream") -> Response:
+    """
+    Resposta para download com cache e retomada:
+    If-None-Match → 304, Range (+ If-Range) → 206, senão arquivo inteiro
+    O conteúdo é imutável (endereçado por hash ou nome com timestamp)
+    """
+    if etag_confere(request, etag):
+        return resposta_nao_modificada(etag, imutavel=True)
+
+    cabecalhos = {
+        **cabecalhos_cache(etag, imutavel=True),
+        "Accept-Ranges": "bytes",
+        "Content-Disposition": content_disposition(nome),
+    }
+
+    # If-Range exige comparação forte: ETag diferente → arquivo inteiro
+    if_range = request.headers.get("if-range")
+    cabecalho_range = request.headers.get("range")
+    if if_range and if_range.strip() != etag:
+        cabecalho_range = None
+
+    try:
+        intervalo = intervalo_range(cabecalho_range, tamanho)
+    except IntervaloInvalido:
+        return Response(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{tamanho}", "Accept-Ranges": "bytes"}
+        )
+
+    if intervalo is None:
+        return FileResponse(caminho, media_type=media_type, headers=cabecalhos)
+
+    inicio, fim = intervalo
+    cabecalhos["Content-Range"] = f"bytes {inicio}-{fim}/{tamanho}"
+    cabecalhos["Content-Length"] = str(fim - inicio + 1)
+    return StreamingResponse(
+        _ler_intervalo(caminho, inicio, fim),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=media_type,
+        headers=cabecalhos
+    )
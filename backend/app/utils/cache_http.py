@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/cache_http.py
+Utilitários de cache HTTP - ETag / If-None-Match / Cache-Control
+"""
+
+from typing import Any, Optional
+import hashlib
+
+from fastapi import Request, Response, status
+
+# PS finalizada não muda pela API, mas nomes de embarcação/fiscal podem ser
+# renomeados e o ADMIN pode excluí-la: cache curto e depois revalida pelo ETag
+CACHE_FINALIZADA = "private, max-age=300, must-revalidate"
+# PS em rascunho: sempre revalidar (If-None-Match → 304 se nada mudou)
+CACHE_REVALIDAR = "private, no-cache"
+
+
+def etag_passagem(passagem_id: int, versao: int, recurso: str, *referencias: Any) -> str:
+    """
+    ETag fraca por PS/recurso, derivada da coluna PASSAGENS.Versao
+    referencias: valores de outras tabelas presentes na resposta (ex.: nomes do JOIN),
+    que mudam sem alterar a versão da PS
+    """
+    etag = f"ps{passagem_id}-{recurso}-v{versao or 0}"
+    if referencias:
+        resumo = hashlib.sha1("\x1f".join(str(r) for r in referencias).encode("utf-8")).hexdigest()[:12]
+        etag += f"-r{resumo}"
+    return f'W/"{etag}"'
+
+
+def etag_confere(request: Optional[Request], etag: str) -> bool:
+    """Compara If-None-Match (comparação fraca, aceita lista e '*')"""
+    if request is None:
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    alvo = etag[2:] if etag.startswith("W/") else etag
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*":
+            return True
+        if candidato.startswith("W/"):
+            candidato = candidato[2:]
+        if candidato == alvo:
+            return True
+    return False
+
+
+def cabecalhos_cache(etag: str, imutavel: bool = False) -> dict:
+    """Cabeçalhos de cache para respostas 200 e 304"""
+    return {
+        "ETag": etag,
+        "Cache-Control": CACHE_FINALIZADA if imutavel else CACHE_REVALIDAR
+    }
+
+
+def resposta_nao_modificada(etag: str, imutavel: bool = False) -> Response:
+    """Resposta 304 sem corpo"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cabecalhos_cache(etag, imutavel)
+    )
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/intervalos.py
+Árvore de intervalos e varredura de lacunas/sobreposições - períodos das PS
+
+Intervalos fechados [inicio, fim] (datas ou qualquer valor ordenável): PS que
+termina no dia 10 e PS que começa no dia 10 se sobrepõem; a cópia da PS já
+começa no dia seguinte ao fim da origem.
+"""
+
+from typing import Any, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class Intervalo(NamedTuple):
+    inicio: Any
+    fim: Any
+    chave: Any = None
+
+
+class ArvoreIntervalos:
+    """
+    Árvore de intervalos estática: intervalos ordenados pelo início num array,
+    árvore binária balanceada implícita (meio de cada faixa) e, em cada nó, o
+    maior fim da sua subárvore. Montagem O(n log n); consulta O(log n + k)
+    """
+
+    def __init__(self, intervalos: Iterable[Tuple[Any, Any, Any]]):
+        self._itens: List[Intervalo] = sorted(
+            (Intervalo(*i) for i in intervalos), key=lambda i: (i.inicio, i.fim)
+        )
+        self._maior_fim: List[Any] = [None] * len(self._itens)
+        if self._itens:
+            self._montar(0, len(self._itens) - 1)
+
+    def __len__(self) -> int:
+        return len(self._itens)
+
+    def _montar(self, inicio: int, fim: int) -> Any:
+        meio = (inicio + fim) // 2
+        maior = self._itens[meio].fim
+        if inicio < meio:
+            maior = max(maior, self._montar(inicio, meio - 1))
+        if meio < fim:
+            maior = max(maior, self._montar(meio + 1, fim))
+        self._maior_fim[meio] = maior
+        return maior
+
+    def sobrepostos(self, inicio: Any, fim: Any, ignorar: Any = None) -> List[Intervalo]:
+        """Intervalos que têm algum ponto em comum com [inicio, fim], em ordem de início"""
+        encontrados = []
+        pilha = [(0, len(self._itens) - 1)] if self._itens else []
+        while pilha:
+            lo, hi = pilha.pop()
+            if lo > hi:
+                continue
+            meio = (lo + hi) // 2
+            # Nada nesta subárvore termina depois do início procurado
+            if self._maior_fim[meio] < inicio:
+                continue
+            item = self._itens[meio]
+            # Subárvore direita só começa depois deste item: só vale se ele começa a tempo
+            if item.inicio <= fim:
+                pilha.append((meio + 1, hi))
+                if item.fim >= inicio and (ignorar is None or item.chave != ignorar):
+                    encontrados.append(item)
+            pilha.append((lo, meio - 1))
+        encontrados.sort(key=lambda i: (i.inicio, i.fim))
+        return encontrados
+
+
+class Varredura:
+    """
+    Lacunas e sobreposições numa única passada sobre intervalos já ordenados
+    pelo início (ex.: ORDER BY EmbarcacaoId, PeriodoInicio) - memória limitada
+    aos intervalos ainda "abertos" na posição da varredura
+    """
+
+    def __init__(self, unidade: Any = None):
+        """unidade: menor passo do domínio (timedelta(days=1) para datas) - [1,5] e [6,9] não têm lacuna"""
+        self._unidade = unidade
+        self._abertos: List[Intervalo] = []
+        self._maior_fim: Optional[Intervalo] = None
+
+    def adicionar(self, intervalo: Intervalo) -> Tuple[List[Tuple[Intervalo, Intervalo]], Optional[Tuple[Intervalo, Intervalo]]]:
+        """
+        Returns:
+            (pares sobrepostos com intervalos anteriores, lacuna (anterior, próximo) ou None)
+        """
+        lacuna = None
+        anterior = self._maior_fim
+        if anterior is not None:
+            limite = anterior.fim + self._unidade if self._unidade is not None else anterior.fim
+            if intervalo.inicio > limite:
+                lacuna = (anterior, intervalo)
+
+        self._abertos = [a for a in self._abertos if a.fim >= intervalo.inicio]
+        pares = [(a, intervalo) for a in self._abertos]
+        self._abertos.append(intervalo)
+
+        if anterior is None or intervalo.fim > anterior.fim:
+            self._maior_fim = intervalo
+        return pares, lacuna
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/limite_upload.py
+Middleware ASGI que aplica UPLOAD_MAX_BYTES antes do parse do multipart
+
+Sem ele, o Starlette lê o corpo inteiro para um SpooledTemporaryFile (em disco
+acima de 1 MB) antes de o handler rodar - o limite só seria checado depois.
+Aqui o 413 sai pelo Content-Length declarado, sem ler o corpo; corpo sem
+Content-Length (chunked) é contado enquanto chega e interrompido ao passar
+do limite.
+"""
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+
+from app.config.settings import settings
+
+# Folga para boundaries e cabeçalhos das partes do multipart
+MARGEM_MULTIPART = 64 * 1024
+
+DETALHE = "Arquivo excede o tamanho máximo permitido"
+
+
+class LimiteUploadMiddleware:
+    """Rejeita (413) requisições multipart/form-data acima de UPLOAD_MAX_BYTES"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        if not headers.get(b"content-type", b"").startswith(b"multipart/form-data"):
+            await self.app(scope, receive, send)
+            return
+
+        limite = settings.UPLOAD_MAX_BYTES + MARGEM_MULTIPART
+        declarado = headers.get(b"content-length")
+        if declarado is not None and declarado.isdigit() and int(declarado) > limite:
+            resposta = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": DETALHE}
+            )
+            await resposta(scope, receive, send)
+            return
+
+        recebidos = 0
+
+        async def receive_limitado():
+            nonlocal recebidos
+            mensagem = await receive()
+            if mensagem["type"] == "http.request":
+                recebidos += len(mensagem.get("body", b""))
+                if recebidos > limite:
+                    # FastAPI repassa HTTPException levantada durante a leitura do form
+                    raise HTTPException(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        detail=DETALHE
+                    )
+            return mensagem
+
+        await self.app(scope, receive_limitado, send)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/paginacao.py
+Utilitários de paginação por keyset (cursor opaco)
+"""
+
+import base64
+import json
+from datetime import date, datetime
+from typing import Any, List, Optional
+
+from fastapi import HTTPException, status
+
+# Limites padrão das listagens paginadas
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+
+def encode_cursor(valores: List[Any]) -> str:
+    """Codifica os valores da última linha da página em um cursor opaco"""
+    normalizados = [v.isoformat() if isinstance(v, (date, datetime)) else v for v in valores]
+    payload = json.dumps(normalizados, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], tamanho: int) -> Optional[List[Any]]:
+    """
+    Decodifica cursor recebido do cliente
+    Levanta 400 se o cursor estiver malformado ou não tiver o número esperado de valores
+    """
+    if not cursor:
+        return None
+
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        valores = json.loads(base64.urlsafe_b64decode(cursor + padding).decode('utf-8'))
+    except Exception:
+        valores = None
+
+    if not isinstance(valores, list) or len(valores) != tamanho:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
+
+    return valores
+
+
+def cursor_datetime(valor: Any) -> datetime:
+    """Timestamp vindo do cursor (serializado em ISO por encode_cursor)"""
+    try:
+        return datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cursor de paginação inválido"
+        )
+
+
+def cabecalhos_paginacao(proximo_cursor: Optional[str], total: Optional[int] = None) -> dict:
+    """Monta cabeçalhos HTTP de paginação (corpo da resposta continua sendo a lista)"""
+    headers = {}
+    if proximo_cursor:
+        headers["X-Next-Cursor"] = proximo_cursor
+    if total is not None:
+        headers["X-Total-Count"] = str(total)
+    return headers
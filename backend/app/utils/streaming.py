@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ARQUIVO: backend/app/utils/streaming.py
+Utilitários para listagens em streaming - CSV e NDJSON direto do cursor
+
+Com Accept: text/csv ou application/x-ndjson a listagem não monta a lista de
+modelos: as linhas saem do banco em lotes (db.iter_query_sync, fetchmany numa
+thread) e cada lote é serializado e enviado. Primeiro byte em tempo constante
+e memória limitada a um lote, qualquer que seja o total.
+"""
+
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import asyncio
+import csv
+import io
+import json
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+
+from app.config.database import db
+
+LOTE_STREAMING = 500
+
+FORMATOS_STREAMING = {
+    "text/csv": "csv",
+    "application/x-ndjson": "ndjson",
+}
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def formato_streaming(request: Request) -> Optional[str]:
+    """
+    'csv' / 'ndjson' conforme o Accept; None → resposta JSON paginada de sempre
+    (*/* e application/json continuam em JSON)
+    """
+    for item in request.headers.get("accept", "").split(","):
+        tipo = item.split(";")[0].strip().lower()
+        if tipo in FORMATOS_STREAMING:
+            return FORMATOS_STREAMING[tipo]
+    return None
+
+
+def _proximo_lote(linhas: Iterator, tamanho: int) -> List[Any]:
+    return list(islice(linhas, tamanho))
+
+
+async def linhas_em_lotes(sql: str, params: Optional[List] = None, lote: int = LOTE_STREAMING):
+    """
+    Lotes de linhas do SELECT sem bloquear o event loop (cada fetchmany roda no executor)
+    Cliente desconectou → o gerador é fechado e a conexão liberada
+    """
+    loop = asyncio.get_running_loop()
+    linhas = db.iter_query_sync(sql, params, lote)
+    try:
+        while True:
+            bloco = await loop.run_in_executor(None, _proximo_lote, linhas, lote)
+            if not bloco:
+                break
+            yield bloco
+    finally:
+        await loop.run_in_executor(None, linhas.close)
+
+
+def _valor_csv(valor: Any) -> Any:
+    return "" if valor is None else valor
+
+
+async def _gerar_csv(colunas: List[str], lotes, montar: Callable[[Any], Dict[str, Any]]):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    # BOM: Excel abre acentuação corretamente
+    buffer.write("\ufeff")
+    escritor.writerow(colunas)
+    yield buffer.getvalue()
+
+    async for bloco in lotes:
+        buffer.seek(0)
+        buffer.truncate()
+        for row in bloco:
+            item = montar(row)
+            escritor.writerow([_valor_csv(item.get(c)) for c in colunas])
+        yield buffer.getvalue()
+
+
+async def _gerar_ndjson(lotes, montar: Callable[[Any], Dict[str, Any]]):
+    async for bloco in lotes:
+        yield "".join(
+            json.dumps(montar(row), ensure_ascii=False, default=str) + "\n" for row in bloco
+        )
+
+
+def resposta_streaming(formato: str, colunas: List[str], sql: str, params: Optional[List],
+                       montar: Callable[[Any], Dict[str, Any]], nome: str) -> StreamingResponse:
+    """
+    StreamingResponse CSV/NDJSON para o SELECT (sem paginação - todas as linhas do filtro)
+
+    Args:
+        colunas: campos na ordem do CSV (chaves do dict devolvido por montar)
+        montar: linha do cursor → dict com os mesmos campos da resposta JSON
+        nome: base do nome do arquivo no Content-Disposition
+    """
+    lotes = linhas_em_lotes(sql, params)
+    if formato == "csv":
+        corpo = _gerar_csv(colunas, lotes, montar)
+    else:
+        corpo = _gerar_ndjson(lotes, montar)
+
+    return StreamingResponse(
+        corpo,
+        media_type=MEDIA_TYPES[formato],
+        headers={"Content-Disposition": f'attachment; filename="{nome}.{formato}"'}
+    )
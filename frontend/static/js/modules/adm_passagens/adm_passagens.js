@@ -17,25 +17,47 @@ const AdmPassagensModule = (function() {
     // ===================================================================================================
     let passagensList = [];
     let isLoading = false;
+    let filtrosAtuais = {};
+    let proximoCursor = null;
 
     // ===================================================================================================
     // CONSTANTES
     // ===================================================================================================
     const MODULE_NAME = 'adm_passagens';
     
+    const TAMANHO_PAGINA = 50;
+
     const ELEMENTS = {
         select: 'admin_ps_list',
         deleteButton: 'btnAdminPSDelete',
-        hint: 'admin_ps_hint'
+        hint: 'admin_ps_hint',
+        moreButton: 'btnAdminPSMais',
+        filterButton: 'btnAdminPSFiltrar',
+        filtroEmbarcacao: 'admin_ps_f_emb',
+        filtroFiscal: 'admin_ps_f_fiscal',
+        filtroStatus: 'admin_ps_f_status',
+        filtroInicio: 'admin_ps_f_inicio',
+        filtroFim: 'admin_ps_f_fim'
     };
 
     // ===================================================================================================
     // APIs ESPECÍFICAS DO MÓDULO
     // ===================================================================================================
     const api = {
-        async listarTodasPS() {
-            const response = await fetch('/api/admin/passagens');
-            return response.json();
+        async listarPaginaPS(filtros = {}, cursor = null) {
+            // Filtros aplicados no servidor; uma página por chamada (próxima via X-Next-Cursor)
+            const params = new URLSearchParams({ limit: String(TAMANHO_PAGINA) });
+            Object.entries(filtros).forEach(([nome, valor]) => {
+                if (valor) params.append(nome, valor);
+            });
+            if (cursor) params.append('cursor', cursor);
+
+            const response = await fetch('/api/admin/passagens?' + params.toString());
+            const pagina = await response.json();
+            if (!response.ok) {
+                throw new Error(pagina?.detail || 'Falha ao listar passagens');
+            }
+            return { passagens: pagina, proximoCursor: response.headers.get('X-Next-Cursor') };
         },
 
         async excluirPS(id) {
@@ -81,6 +103,50 @@ const AdmPassagensModule = (function() {
         }
     }
 
+    /**
+     * Preenche os selects de filtro (embarcações e fiscais já carregados pelos módulos)
+     */
+    function populateFilters() {
+        const embarcacao = getElement(ELEMENTS.filtroEmbarcacao);
+        if (embarcacao && window.EmbarcacoesModule) {
+            const atual = embarcacao.value;
+            window.EmbarcacoesModule.populateSelect(embarcacao);
+            embarcacao.options[0].textContent = '— todas —';
+            embarcacao.value = atual;
+        }
+
+        const fiscal = getElement(ELEMENTS.filtroFiscal);
+        if (fiscal && window.FiscaisModule) {
+            const atual = fiscal.value;
+            window.FiscaisModule.populateSelect(fiscal);
+            fiscal.insertBefore(new Option('— todos —', ''), fiscal.firstChild);
+            fiscal.value = atual;
+        }
+    }
+
+    /**
+     * Filtros da tela no formato da API (/api/admin/passagens)
+     */
+    function readFilters() {
+        return {
+            embarcacao_id: getElement(ELEMENTS.filtroEmbarcacao)?.value,
+            fiscal_id: getElement(ELEMENTS.filtroFiscal)?.value,
+            status: getElement(ELEMENTS.filtroStatus)?.value,
+            inicio: getElement(ELEMENTS.filtroInicio)?.value,
+            fim: getElement(ELEMENTS.filtroFim)?.value
+        };
+    }
+
+    /**
+     * Mostra "Carregar mais" só enquanto houver próxima página
+     */
+    function updateMoreButton() {
+        const moreButton = getElement(ELEMENTS.moreButton);
+        if (moreButton) {
+            moreButton.style.display = proximoCursor ? '' : 'none';
+        }
+    }
+
     /**
      * Renderiza lista de PS no select
      */
@@ -118,18 +184,17 @@ const AdmPassagensModule = (function() {
     }
 
     /**
-     * Carrega lista de PS do servidor
+     * Carrega a primeira página de PS do servidor com os filtros da tela
      */
     async function loadPassagens() {
         if (isLoading) return;
         
         try {
             isLoading = true;
-            passagensList = await api.listarTodasPS();
-            
-            if (!Array.isArray(passagensList)) {
-                passagensList = [];
-            }
+            filtrosAtuais = readFilters();
+            const pagina = await api.listarPaginaPS(filtrosAtuais);
+            passagensList = Array.isArray(pagina.passagens) ? pagina.passagens : [];
+            proximoCursor = pagina.proximoCursor;
             
             renderPassagensList();
             console.log(`📋 ${MODULE_NAME}: ${passagensList.length} PS carregadas`);
@@ -137,10 +202,36 @@ const AdmPassagensModule = (function() {
         } catch (error) {
             console.error(`❌ ${MODULE_NAME}: Erro ao carregar PS:`, error);
             passagensList = [];
+            proximoCursor = null;
             renderPassagensList();
             showError('Erro ao carregar lista de passagens: ' + error.message);
         } finally {
             isLoading = false;
+            updateMoreButton();
+        }
+    }
+
+    /**
+     * Acrescenta a próxima página (mesmos filtros da primeira)
+     */
+    async function loadMorePassagens() {
+        if (isLoading || !proximoCursor) return;
+
+        try {
+            isLoading = true;
+            const pagina = await api.listarPaginaPS(filtrosAtuais, proximoCursor);
+            passagensList = passagensList.concat(Array.isArray(pagina.passagens) ? pagina.passagens : []);
+            proximoCursor = pagina.proximoCursor;
+
+            renderPassagensList();
+            console.log(`📋 ${MODULE_NAME}: ${passagensList.length} PS carregadas`);
+
+        } catch (error) {
+            console.error(`❌ ${MODULE_NAME}: Erro ao carregar mais PS:`, error);
+            showError('Erro ao carregar mais passagens: ' + error.message);
+        } finally {
+            isLoading = false;
+            updateMoreButton();
         }
     }
 
@@ -228,6 +319,19 @@ const AdmPassagensModule = (function() {
             deleteButton.removeEventListener('click', excluirPassagem);
             deleteButton.addEventListener('click', excluirPassagem);
         }
+
+        // Filtros e paginação
+        const filterButton = getElement(ELEMENTS.filterButton);
+        if (filterButton) {
+            filterButton.removeEventListener('click', loadPassagens);
+            filterButton.addEventListener('click', loadPassagens);
+        }
+
+        const moreButton = getElement(ELEMENTS.moreButton);
+        if (moreButton) {
+            moreButton.removeEventListener('click', loadMorePassagens);
+            moreButton.addEventListener('click', loadMorePassagens);
+        }
     }
 
     // ===================================================================================================
@@ -246,6 +350,7 @@ const AdmPassagensModule = (function() {
      * Ativa o módulo (chamado quando aba de cadastros é ativada)
      */
     async function onActivate() {
+        populateFilters();
         await loadPassagens();
         console.log(`🔄 ${MODULE_NAME}: Módulo ativado`);
     }
@@ -286,6 +391,7 @@ const AdmPassagensModule = (function() {
         // Operações
         refresh,
         loadPassagens,
+        loadMorePassagens,
         excluirPassagem,
 
         // Estado
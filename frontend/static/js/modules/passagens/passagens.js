@@ -112,17 +112,34 @@
     let currentPS = null;
     let activeSubModule = 'porto';
 
+    // Listagem paginada: filtros da última busca e cursor da próxima página
+    const TAMANHO_PAGINA = 50;
+    let filtrosLista = {};
+    let proximoCursorPS = null;
+
     // ===================================================================================================
     // APIs ESPECÍFICAS DO MÓDULO
     // ===================================================================================================
     const api = {
-        async listarPS(inicio, fim) {
+        async listarPaginaPS(filtros = {}, cursor = null) {
             const params = new URLSearchParams();
-            if (inicio) params.append('inicio', inicio);
-            if (fim) params.append('fim', fim);
-            
+            if (filtros.inicio) params.append('inicio', filtros.inicio);
+            if (filtros.fim) params.append('fim', filtros.fim);
+            if (filtros.status) params.append('status', filtros.status);
+            params.append('limit', String(TAMANHO_PAGINA));
+            if (cursor) params.append('cursor', cursor);
+
+            // Uma página da listagem por keyset; a seguinte é pedida com X-Next-Cursor
             const response = await fetch('/api/passagens?' + params.toString());
-            return response.json();
+            const pagina = await response.json();
+            if (!response.ok) return { erro: pagina, passagens: [], proximoCursor: null };
+            return { passagens: pagina, proximoCursor: response.headers.get('X-Next-Cursor') };
+        },
+
+        async listarPS(inicio, fim) {
+            // Só a primeira página (PS mais recentes)
+            const { erro, passagens } = await api.listarPaginaPS({ inicio, fim });
+            return erro || passagens;
         },
 
         async getPS(id) {
@@ -211,25 +228,54 @@
     // ===================================================================================================
     async function searchPassagens() {
         try {
-            const inicio = getElement('fInicio')?.value;
-            const fim = getElement('fFim')?.value;
-            
-            const passagens = await api.listarPS(inicio, fim);
-            updatePassagensList(passagens);
+            filtrosLista = {
+                inicio: getElement('fInicio')?.value,
+                fim: getElement('fFim')?.value
+            };
+
+            const { erro, passagens, proximoCursor } = await api.listarPaginaPS(filtrosLista);
+            updatePassagensList(erro || passagens);
+            atualizarCarregarMais(proximoCursor);
             
         } catch (error) {
             showError('Erro ao buscar passagens: ' + error.message);
         }
     }
 
-    function updatePassagensList(passagens) {
+    async function carregarMaisPassagens() {
+        if (!proximoCursorPS) return;
+
+        const btnMais = getElement('btnMaisPS');
+        if (btnMais) btnMais.disabled = true;
+        try {
+            const { erro, passagens, proximoCursor } = await api.listarPaginaPS(filtrosLista, proximoCursorPS);
+            if (erro) {
+                showError(erro.detail || 'Erro ao carregar mais passagens');
+                return;
+            }
+            updatePassagensList(passagens, true);
+            atualizarCarregarMais(proximoCursor);
+        } catch (error) {
+            showError('Erro ao carregar mais passagens: ' + error.message);
+        } finally {
+            if (btnMais) btnMais.disabled = false;
+        }
+    }
+
+    function atualizarCarregarMais(proximoCursor) {
+        proximoCursorPS = proximoCursor || null;
+        const btnMais = getElement('btnMaisPS');
+        if (btnMais) btnMais.style.display = proximoCursorPS ? '' : 'none';
+    }
+
+    function updatePassagensList(passagens, acrescentar = false) {
         const lista = getElement('listaPS');
         if (!lista) return;
         
-        lista.innerHTML = '';
+        if (!acrescentar) lista.innerHTML = '';
         
         if (!Array.isArray(passagens) || passagens.length === 0) {
-            lista.innerHTML = '<li class="empty">❌ Não há PS cadastrada</li>';
+            if (!acrescentar) lista.innerHTML = '<li class="empty">❌ Não há PS cadastrada</li>';
             return;
         }
         
@@ -434,7 +480,8 @@
             const userContext = window.AuthModule?.getCurrentUser();
             if (!userContext) return false;
 
-            const lista = await api.listarPS();
+            // Filtro no servidor: o rascunho pode não estar na primeira página da listagem
+            const { passagens: lista } = await api.listarPaginaPS({ status: 'RASCUNHO' });
             const hasRasc = Array.isArray(lista) && lista.some(ps =>
                 ps && ps.Status === 'RASCUNHO' && ps.FiscalDesembarcandoId === userContext.fiscalId
             );
@@ -743,7 +790,8 @@ async function onNovaPS_Guard() {
             if (result.error) {
                 showError(result.error);
             } else {
-                showSuccess('PS finalizada com sucesso');
+                // PDF não enfileirado: a PS fica finalizada e o PDF é pedido de novo pelo download
+                showSuccess(result.erroPdf ? result.erroPdf : 'PS finalizada com sucesso');
                 await loadPassagem(currentPS.PassagemId); // Recarrega
             }
             
@@ -820,6 +868,13 @@ async function onNovaPS_Guard() {
             console.log(`✅ ${MODULE_NAME}: Event listener 'btnBuscar' configurado`);
         }
 
+        // Próxima página da listagem
+        const btnMaisPS = getElement('btnMaisPS');
+        if (btnMaisPS) {
+            btnMaisPS.removeEventListener('click', carregarMaisPassagens);
+            btnMaisPS.addEventListener('click', carregarMaisPassagens);
+        }
+
         // Operações de PS
         const btnSalvar = getElement('btnSalvar');
         const btnFinalizar = getElement('btnFinalizar');
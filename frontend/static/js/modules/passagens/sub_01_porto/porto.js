@@ -57,6 +57,17 @@ const PortoSubModule = (function() {
         },
 
         async uploadAnexo(psId, file) {
+            // Servidor já tem o conteúdo (mesmo SHA-256): só registra o anexo na PS
+            const sha256 = await sha256Hex(file);
+            if (sha256) {
+                const existente = await fetch(`/api/passagens/${psId}/anexos/por-hash`, {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify({ sha256: sha256, filename: file.name })
+                });
+                if (existente.ok) return existente.json();
+            }
+
             const formData = new FormData();
             formData.append('file', file);
             
@@ -71,6 +82,17 @@ const PortoSubModule = (function() {
     // ===================================================================================================
     // UTILITÁRIOS
     // ===================================================================================================
+    async function sha256Hex(file) {
+        // crypto.subtle só existe em contexto seguro (localhost/https); sem ele, upload normal
+        if (!window.crypto || !window.crypto.subtle) return null;
+        try {
+            const digest = await window.crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+            return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+        } catch (e) {
+            return null;
+        }
+    }
+
     function getElement(id) {
         return document.getElementById(id);
     }
@@ -226,6 +248,7 @@ const PortoSubModule = (function() {
         tr.querySelector('.eq-empresa').value = data.Empresa || '';
         tr.querySelector('.eq-nome').value = data.Nome || '';
         tr.querySelector('.eq-obs').value = data.Observacoes || '';
+        tr.dataset.id = data.Id || '';
     }
 
     // 1.8 Embarque de Materiais
@@ -252,6 +275,7 @@ const PortoSubModule = (function() {
         tr.querySelector('.em-rt').value = data.RT || '';
         tr.querySelector('.em-obs').value = data.Observacoes || '';
         tr.dataset.anexopath = data.AnexoPath || '';
+        tr.dataset.id = data.Id || '';
     }
 
     // 1.9 Desembarque de Materiais
@@ -278,6 +302,7 @@ const PortoSubModule = (function() {
         tr.querySelector('.dm-rt').value = data.RT || '';
         tr.querySelector('.dm-obs').value = data.Observacoes || '';
         tr.dataset.anexopath = data.AnexoPath || '';
+        tr.dataset.id = data.Id || '';
     }
 
     // 1.10 OS Mobilização/Desmobilização
@@ -300,6 +325,7 @@ const PortoSubModule = (function() {
         tr.querySelector('.om-desc').value = data.Descricao || '';
         tr.querySelector('.om-obs').value = data.Observacoes || '';
         tr.dataset.anexopath = data.AnexoPath || '';
+        tr.dataset.id = data.Id || '';
     }
 
     // Event listener para botões de remoção das tabelas
@@ -505,6 +531,7 @@ const PortoSubModule = (function() {
 
         // Monta arrays de dados
         const eq = Array.from(document.querySelectorAll('#tblEq tbody tr')).map(tr => ({
+            Id: _rowId(tr),
             Tipo: tr.querySelector('.eq-tipo')?.value || null,
             Empresa: tr.querySelector('.eq-empresa')?.value || null,
             Nome: tr.querySelector('.eq-nome')?.value || null,
@@ -515,6 +542,7 @@ const PortoSubModule = (function() {
         for (const tr of Array.from(document.querySelectorAll('#tblEM tbody tr'))) {
             const path = await maybeUploadRow(tr.querySelector('.em-file')) || (tr.dataset.anexopath || null);
             em.push({
+                Id: _rowId(tr),
                 Origem: tr.querySelector('.em-origem')?.value || null,
                 OS: tr.querySelector('.em-os')?.value || null,
                 Destino: tr.querySelector('.em-dest')?.value || null,
@@ -528,6 +556,7 @@ const PortoSubModule = (function() {
         for (const tr of Array.from(document.querySelectorAll('#tblDM tbody tr'))) {
             const path = await maybeUploadRow(tr.querySelector('.dm-file')) || (tr.dataset.anexopath || null);
             dm.push({
+                Id: _rowId(tr),
                 OS: tr.querySelector('.dm-os')?.value || null,
                 Origem: tr.querySelector('.dm-origem')?.value || null,
                 Destino: tr.querySelector('.dm-dest')?.value || null,
@@ -541,6 +570,7 @@ const PortoSubModule = (function() {
         for (const tr of Array.from(document.querySelectorAll('#tblOM tbody tr'))) {
             const path = await maybeUploadRow(tr.querySelector('.om-file')) || (tr.dataset.anexopath || null);
             om.push({
+                Id: _rowId(tr),
                 OS: tr.querySelector('.om-os')?.value || null,
                 Descricao: tr.querySelector('.om-desc')?.value || null,
                 Observacoes: tr.querySelector('.om-obs')?.value || null,
@@ -555,7 +585,29 @@ const PortoSubModule = (function() {
             osMobilizacao: { naoPrevisto: getElement('omNaoPrevisto')?.checked, linhas: om }
         };
 
-        return api.saveListData(psId, payload);
+        const result = await api.saveListData(psId, payload);
+        if (result && result.ids) _applyRowIds(result.ids);
+        return result;
+    }
+
+    // ID estável da linha (devolvido pelo backend) - permite gravação por diferença
+    function _rowId(tr) {
+        return tr.dataset.id ? Number(tr.dataset.id) : null;
+    }
+
+    // Atualiza os IDs das linhas após salvar (linhas novas recebem o ID gerado)
+    function _applyRowIds(ids) {
+        const tabelas = {
+            equipes: 'tblEq',
+            embarqueMateriais: 'tblEM',
+            desembarqueMateriais: 'tblDM',
+            osMobilizacao: 'tblOM'
+        };
+        Object.entries(tabelas).forEach(([chave, tableId]) => {
+            const lista = ids[chave] || [];
+            const rows = document.querySelectorAll(`#${tableId} tbody tr`);
+            rows.forEach((tr, i) => { tr.dataset.id = lista[i] != null ? lista[i] : ''; });
+        });
     }
 
     async function saveAllPortoData() {